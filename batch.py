@@ -0,0 +1,453 @@
+"""Headless batch processing: run the judgment pipeline over directories of PDFs.
+
+    python batch.py archive/2023 "incoming/**/*.pdf" -o out/ --json -j 8
+
+Each PDF is processed in a worker process with the same functions the
+Streamlit app uses (tool.process_judgment); Streamlit itself is never
+imported. Output mirrors the input tree under the output directory.
+"""
+
+import argparse
+import glob
+import gzip
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import tool
+from budgets import FULL, Budget
+from cancellation import Cancelled, CancellationToken
+from instrumentation import Report, collect_report
+from batch_manifest import DEFAULT_MAX_ATTEMPTS, MANIFEST_NAME, BatchManifest, file_signature
+
+# Tasks queued per worker, enough to keep the pool busy without holding every input
+TASKS_PER_WORKER = 2
+
+# Per-process state for pool workers
+_worker_cache = None
+_worker_revisions = None
+_worker_options = None
+_worker_cancellation = None
+
+def iter_inputs(patterns):
+    """Yield (path, relative_output_path) for every PDF named by files, directories or globs.
+
+    Directories are walked recursively; for a glob, paths are made relative
+    to its leading non-wildcard directory so the output mirrors the input tree.
+    """
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            root = pattern
+            paths = (os.path.join(dirpath, name)
+                     for dirpath, _, names in os.walk(pattern)
+                     for name in sorted(names) if name.lower().endswith('.pdf'))
+        elif glob.has_magic(pattern):
+            parts = []
+            for part in pattern.split(os.sep):
+                if glob.has_magic(part):
+                    break
+                parts.append(part)
+            root = os.sep.join(parts) or os.curdir
+            paths = sorted(glob.glob(pattern, recursive=True))
+        else:
+            root = os.path.dirname(pattern) or os.curdir
+            paths = [pattern]
+        for path in paths:
+            real = os.path.realpath(path)
+            if real in seen or not os.path.isfile(path):
+                continue
+            seen.add(real)
+            yield path, os.path.relpath(path, root)
+
+def output_path(relative, options):
+    """Where an input's main output goes: <name>.html, or <name>.metadata.json in catalogue mode."""
+    suffix = '.metadata.json' if options['metadata_only'] else '.html'
+    return os.path.join(options['output_dir'], os.path.splitext(relative)[0]) + suffix
+
+def output_mode(options):
+    """The options deciding what is written, e.g. "html+json+max_pages=5"; kept in the manifest."""
+    if options['metadata_only']:
+        return 'metadata'
+    flags = (('json', options['write_json']), ('gzip', options['gzip']), ('minify', options['minify']),
+             ('link-css', options['stylesheet'] is not None))
+    mode = ['html'] + [name for name, enabled in flags if enabled]
+    # A run under other limits may cut or simplify documents differently
+    if options['budget'] is not None and options['budget'].key:
+        mode.append(options['budget'].key)
+    return '+'.join(mode)
+
+def _init_batch_worker(options):
+    """Pool initializer: open the shared result and revision caches once per process.
+
+    Ctrl-C reaches the workers too; they ignore it and stop through the
+    parent's cancel event instead, so the PDF in hand is abandoned cleanly.
+    """
+    global _worker_cache, _worker_revisions, _worker_options, _worker_cancellation
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_options = options
+    _worker_cancellation = CancellationToken(options['cancel_event'])
+    _worker_cache = tool.open_result_cache(options['cache_dir']) if options['cache_dir'] else None
+    _worker_revisions = tool.open_revision_cache(options['revision_dir']) if options['revision_dir'] else None
+
+class _Tee:
+    """Binary writer that copies everything to several files."""
+
+    def __init__(self, *files):
+        self.files = files
+
+    def write(self, data):
+        for fh in self.files:
+            fh.write(data)
+        return len(data)
+
+def _write_file(path, write, gzip_copy=False):
+    """Create path (and optionally path.gz) atomically; `write` receives an open binary writer."""
+    os.makedirs(os.path.dirname(path) or os.curdir, exist_ok=True)
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'wb') as fh:
+            if not gzip_copy:
+                write(fh)
+            else:
+                # mtime=0 keeps the .gz identical across runs for identical HTML
+                with open(tmp_path + '.gz', 'wb') as raw, \
+                        gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=9, mtime=0) as gz:
+                    write(_Tee(fh, gz))
+                os.replace(tmp_path + '.gz', path + '.gz')
+    except BaseException:
+        # A failed or cancelled write leaves no partial files behind
+        for leftover in (tmp_path, tmp_path + '.gz'):
+            try:
+                os.remove(leftover)
+            except FileNotFoundError:
+                pass
+        raise
+    os.replace(tmp_path, path)
+
+def process_one(path, relative):
+    """Process one PDF inside a worker; never raises, failures are returned as records.
+
+    With the profile option the record carries the document's instrumentation
+    report, which is also written next to the output as <name>.profile.json.
+    """
+    if not _worker_options['profile']:
+        return _process_one(path, relative)
+    with collect_report() as report:
+        record = _process_one(path, relative)
+    record['profile'] = profile = dict(report.to_dict(), input=path)
+    try:
+        _write_file(os.path.join(_worker_options['output_dir'], os.path.splitext(relative)[0]) + '.profile.json',
+                    lambda fh: fh.write(json.dumps(profile).encode('utf-8')))
+    except OSError:
+        pass
+    return record
+
+def _process_one(path, relative):
+    options = _worker_options
+    base = os.path.join(options['output_dir'], os.path.splitext(relative)[0])
+    record = {'input': path, 'output': output_path(relative, options), 'status': 'ok', 'pages': 0, 'error': None}
+    started = time.perf_counter()
+    try:
+        record['size'], record['mtime_ns'] = file_signature(path)
+        if options['metadata_only']:
+            # Catalogue mode: first and last pages only, no body parsing or rendering
+            metadata = dict(tool.extract_pdf_metadata(path), source=path, parser_version=tool.PARSER_VERSION)
+            _write_file(record['output'], lambda fh: fh.write(json.dumps(metadata, ensure_ascii=False).encode('utf-8')))
+            record['seconds'] = time.perf_counter() - started
+            return record
+        # The HTML is streamed to disk below rather than rendered into one string
+        result = tool.process_judgment(path, cache=_worker_cache, render=False, revisions=_worker_revisions,
+                                       budget=options['budget'], cancellation=_worker_cancellation)
+        judgment = result['judgment']
+        revision = result['revision']
+        budget = result['budget']
+        record['digest'] = result['digest']
+        record['pages'] = result.get('page_count', 0)
+        if not result['text'].strip():
+            raise ValueError("no extractable text")
+        stylesheet_href = None
+        if options['stylesheet']:
+            stylesheet_href = os.path.relpath(options['stylesheet'], os.path.dirname(record['output']))
+            stylesheet_href = stylesheet_href.replace(os.sep, '/')
+        _write_file(
+            record['output'],
+            lambda fh: tool.write_judgment_html(judgment, fh, stylesheet_href, options['minify'], revision, budget,
+                                                _worker_cancellation),
+            gzip_copy=options['gzip']
+        )
+        if budget is not None and budget.degraded:
+            record['degradations'] = budget.summary()
+            if budget.level != FULL:
+                # Simplified under time or memory pressure: the manifest has it redone by later runs
+                record['status'] = 'degraded'
+        elif revision is not None:
+            revision.save()
+            record['revision'] = revision.summary
+        if options['write_json']:
+            document = dict(judgment.to_dict(), digest=result['digest'], source=path,
+                            parser_version=tool.PARSER_VERSION, revision=record.get('revision'),
+                            degradations=record.get('degradations', []))
+            _write_file(base + '.json', lambda fh: fh.write(json.dumps(document, ensure_ascii=False).encode('utf-8')))
+        if options['index_citations']:
+            # Citations travel back to the parent, the only writer of the index
+            record['citations'] = [citation.to_dict() for citation in judgment.citations]
+            record['metadata'] = judgment.metadata
+    except Cancelled:
+        # Not an attempt: the manifest leaves it for the next run
+        record['status'] = 'cancelled'
+    except Exception as exc:
+        record['status'] = 'error'
+        record['error'] = f"{type(exc).__name__}: {exc}"
+        record['traceback'] = traceback.format_exc()
+    record['seconds'] = time.perf_counter() - started
+    return record
+
+def _crash_record(path, relative, options):
+    try:
+        size, mtime_ns = file_signature(path)
+    except OSError:
+        size = mtime_ns = None
+    return {
+        'input': path,
+        'size': size,
+        'mtime_ns': mtime_ns,
+        'output': output_path(relative, options),
+        'status': 'error',
+        'pages': 0,
+        'seconds': 0.0,
+        'error': "worker process died while processing this PDF",
+    }
+
+def run_batch(inputs, options, jobs):
+    """Process (path, relative) inputs on a pool of `jobs` processes; yield one record per input.
+
+    Only jobs * TASKS_PER_WORKER inputs are in flight at a time. If a worker
+    process dies (e.g. a PDF crashes PyMuPDF), the pool is restarted and the
+    inputs that were in flight are re-run one at a time, so only the PDF that
+    actually kills a worker is recorded as failed. Once options['cancel_event']
+    is set no new input is started, and those in flight come back 'cancelled'.
+    """
+    inputs = iter(inputs)
+    suspects = deque()
+    window = max(1, jobs * TASKS_PER_WORKER)
+    exhausted = False
+    while True:
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_batch_worker,
+                                 initargs=(options,)) as pool:
+            while True:
+                # Suspects from a crash run alone until they have been cleared
+                while len(pending) < (1 if suspects else window):
+                    if options['cancel_event'].is_set():
+                        suspects.clear()
+                        exhausted = True
+                        break
+                    if suspects:
+                        item = suspects.popleft()
+                    else:
+                        item = next(inputs, None)
+                        if item is None:
+                            exhausted = True
+                            break
+                    pending.append((item, pool.submit(process_one, *item)))
+                if not pending:
+                    break
+                item, future = pending[0]
+                try:
+                    record = future.result()
+                except BrokenProcessPool:
+                    break
+                pending.popleft()
+                yield record
+
+        if not pending:
+            if exhausted:
+                return
+            continue
+        # The pool broke: keep what finished, then requeue or condemn the rest
+        crashed = []
+        for item, future in pending:
+            if future.exception() is None:
+                yield future.result()
+            else:
+                crashed.append(item)
+        if len(crashed) == 1:
+            yield _crash_record(*crashed[0], options)
+        else:
+            suspects.extend(crashed)
+
+def describe_revision(record):
+    """", revises <digest>: changed 4, 7; added 12" for a corrected judgment, else ""."""
+    summary = record.get('revision')
+    if not summary:
+        return ""
+    changes = [f"{kind} {', '.join(summary[kind])}" for kind in ('changed', 'added', 'removed') if summary[kind]]
+    return f", revises {summary['previous_digest'][:12]}: {'; '.join(changes) or 'no paragraph changes'}"
+
+def describe_degradations(record):
+    """", degraded: parse: no_citation_styling (time)" for a document cut short by its budget, else ""."""
+    degradations = record.get('degradations')
+    if not degradations:
+        return ""
+    return f", degraded: {'; '.join(degradations)}"
+
+def summarize(records, elapsed):
+    ok = sum(1 for record in records if record['status'] in ('ok', 'degraded'))
+    cancelled = sum(1 for record in records if record['status'] == 'cancelled')
+    pages = sum(record['pages'] for record in records)
+    elapsed = max(elapsed, 1e-9)
+    return {
+        'documents': len(records),
+        'succeeded': ok,
+        'failed': len(records) - ok - cancelled,
+        'cancelled': cancelled,
+        'pages': pages,
+        'seconds': elapsed,
+        'docs_per_sec': len(records) / elapsed,
+        'pages_per_sec': pages / elapsed,
+    }
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Format Supreme Court judgment PDFs without the Streamlit UI.")
+    parser.add_argument('inputs', nargs='+', help="PDF files, directories (searched recursively) or glob patterns")
+    parser.add_argument('-o', '--output', required=True, help="output directory; mirrors the input tree")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--json', action='store_true', help="also write the parsed judgment as JSON")
+    parser.add_argument('--metadata-only', action='store_true',
+                        help="catalogue mode: write only <name>.metadata.json, read from the first and last pages")
+    parser.add_argument('--link-css', action='store_true',
+                        help="write one versioned stylesheet at the output root and link to it "
+                             "instead of inlining the CSS in every file")
+    parser.add_argument('--minify', action='store_true', help="minify the HTML (and linked CSS)")
+    parser.add_argument('--gzip', action='store_true', help="also write pre-compressed .html.gz siblings")
+    parser.add_argument('--cache-dir', default=tool.CACHE_DIR, help="result cache directory")
+    parser.add_argument('--no-cache', action='store_true', help="do not read or write the result cache")
+    parser.add_argument('--revision-dir', default=tool.REVISION_DIR,
+                        help="section HTML of earlier versions, reused for corrected judgments")
+    parser.add_argument('--no-revisions', action='store_true',
+                        help="always format every paragraph, recording no versions")
+    parser.add_argument('--index', default=tool.INDEX_PATH, help="citation index database")
+    parser.add_argument('--no-index', action='store_true', help="do not update the citation index")
+    parser.add_argument('--manifest', help=f"resumable run record (default: OUTPUT/{MANIFEST_NAME})")
+    parser.add_argument('--no-manifest', action='store_true', help="process every input, recording nothing")
+    parser.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS,
+                        help="give up on a failing PDF after this many runs")
+    parser.add_argument('--max-pages', type=int, help="process only the first N pages of longer PDFs")
+    parser.add_argument('--stage-seconds', type=float,
+                        help="time allowed to extraction, parsing and rendering of one PDF; past it, "
+                             "formatting is simplified step by step")
+    parser.add_argument('--max-memory-mb', type=int,
+                        help="memory a worker may grow by per PDF before formatting is simplified")
+    parser.add_argument('--profile', action='store_true',
+                        help="time each pipeline stage: write <name>.profile.json and print the totals")
+    parser.add_argument('-q', '--quiet', action='store_true', help="only print failures and the summary")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    options = {
+        'output_dir': args.output,
+        'write_json': args.json,
+        'cache_dir': None if args.no_cache else args.cache_dir,
+        'revision_dir': None if args.no_revisions or args.metadata_only else args.revision_dir,
+        'index_citations': not args.no_index and not args.metadata_only,
+        'metadata_only': args.metadata_only,
+        'minify': args.minify,
+        'gzip': args.gzip,
+        'profile': args.profile,
+        'stylesheet': None,
+        'budget': None,
+        'cancel_event': multiprocessing.Event(),
+    }
+    if args.max_pages is not None or args.stage_seconds is not None or args.max_memory_mb is not None:
+        options['budget'] = Budget(args.max_pages, args.stage_seconds,
+                                   args.max_memory_mb * 2**20 if args.max_memory_mb is not None else None)
+    if args.link_css and not args.metadata_only:
+        options['stylesheet'] = tool.write_stylesheet(args.output, minify=args.minify)
+        if args.gzip:
+            _write_file(options['stylesheet'],
+                        lambda fh: fh.write(tool.stylesheet_text(args.minify).encode('utf-8')), gzip_copy=True)
+    citation_index = tool.open_citation_index(args.index) if options['index_citations'] else None
+    manifest = None
+    if not args.no_manifest:
+        manifest = BatchManifest(args.manifest or os.path.join(args.output, MANIFEST_NAME),
+                                 tool.PARSER_VERSION, mode=output_mode(options), max_attempts=args.max_attempts)
+
+    # A restarted run skips inputs finished in the same mode and those out of attempts
+    skipped = {'done': 0, 'failed': 0}
+    def todo(inputs):
+        for item in inputs:
+            reason = None
+            if manifest is not None:
+                reason = manifest.skip_reason(item[0], output_path(item[1], options))
+            if reason is None:
+                yield item
+            else:
+                skipped[reason] += 1
+
+    # The first Ctrl-C cancels: nothing new starts and the PDFs in hand stop at
+    # their next page or paragraph. A second one interrupts at once.
+    def cancel(signum, frame):
+        print("cancelling; press Ctrl-C again to stop immediately", file=sys.stderr)
+        options['cancel_event'].set()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+    previous_handler = signal.signal(signal.SIGINT, cancel)
+
+    records = []
+    profile = Report()
+    started = time.perf_counter()
+    try:
+        for record in run_batch(todo(iter_inputs(args.inputs)), options, max(1, args.jobs)):
+            records.append(record)
+            if 'profile' in record:
+                profile.merge(record.pop('profile'))
+            if record['status'] == 'cancelled':
+                continue
+            if manifest is not None:
+                manifest.record(record)
+            if record['status'] not in ('ok', 'degraded'):
+                print(f"FAILED {record['input']}: {record['error']}", file=sys.stderr)
+            elif not args.quiet:
+                pages = f"{record['pages']} pages, " if record['pages'] else ""
+                print(f"ok     {record['input']} ({pages}{record['seconds']:.2f}s){describe_revision(record)}"
+                      f"{describe_degradations(record)}")
+            if citation_index is not None and 'citations' in record:
+                citation_index.add_judgment(
+                    record['digest'],
+                    [tool.Citation.from_dict(citation) for citation in record.pop('citations')],
+                    record.pop('metadata'),
+                    source=record['input'],
+                    version=tool.PARSER_VERSION
+                )
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+        if manifest is not None:
+            manifest.close()
+        if citation_index is not None:
+            citation_index.close()
+
+    summary = summarize(records, time.perf_counter() - started)
+    print(f"{summary['documents']} documents ({summary['succeeded']} ok, {summary['failed']} failed), "
+          f"{summary['pages']} pages in {summary['seconds']:.1f}s: "
+          f"{summary['docs_per_sec']:.2f} docs/sec, {summary['pages_per_sec']:.1f} pages/sec")
+    if any(skipped.values()):
+        print(f"skipped {skipped['done']} already done, {skipped['failed']} out of attempts")
+    if options['cancel_event'].is_set():
+        print(f"cancelled: {summary['cancelled']} PDFs stopped part-way; unfinished inputs are left for the next run")
+    if args.profile:
+        print("per-stage totals (summed over documents and workers):")
+        print(profile.format())
+    if options['cancel_event'].is_set():
+        return 130
+    return 1 if summary['failed'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
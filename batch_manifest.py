@@ -0,0 +1,135 @@
+"""Resumable record of a batch run: one SQLite row per input PDF."""
+
+import os
+import sqlite3
+import time
+
+MANIFEST_NAME = 'batch-manifest.sqlite3'
+DEFAULT_MAX_ATTEMPTS = 3
+# Buffered records are written in one transaction when either limit is reached
+FLUSH_RECORDS = 500
+FLUSH_SECONDS = 5.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    input TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime_ns INTEGER,
+    digest TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    pages INTEGER,
+    seconds REAL,
+    output TEXT,
+    mode TEXT,
+    error TEXT,
+    parser_version TEXT,
+    finished_at REAL
+);
+"""
+
+# Insert a new row or update an existing one, counting every attempt in the same mode
+UPSERT = """
+INSERT INTO documents (input, size, mtime_ns, digest, status, attempts, pages, seconds,
+                       output, mode, error, parser_version, finished_at)
+VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (input) DO UPDATE SET
+    size = excluded.size, mtime_ns = excluded.mtime_ns, digest = excluded.digest,
+    status = excluded.status, pages = excluded.pages,
+    attempts = CASE WHEN documents.mode IS excluded.mode THEN documents.attempts + 1 ELSE 1 END,
+    seconds = excluded.seconds, output = excluded.output, mode = excluded.mode, error = excluded.error,
+    parser_version = excluded.parser_version, finished_at = excluded.finished_at
+"""
+
+def file_signature(path):
+    """(size, mtime_ns) of a file, used to notice inputs that changed since they were processed."""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+class BatchManifest:
+    """Which inputs of a batch have finished, failed or are still to do.
+
+    `mode` names the options that decide what a run writes, budget limits
+    included (see batch.output_mode); an input finished in another mode, or
+    into another output path, is processed again. So is one recorded as
+    'degraded' (formatting simplified under time or memory pressure), until
+    it has had max_attempts runs.
+
+    The whole manifest is loaded when opened, so deciding whether to skip an
+    input costs a dict lookup and a stat. Finished records are buffered and
+    written in batches (every FLUSH_RECORDS records or FLUSH_SECONDS), so a
+    run killed mid-way loses at most one batch, which is simply redone.
+    """
+
+    def __init__(self, path, version, mode=None, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 flush_records=FLUSH_RECORDS, flush_seconds=FLUSH_SECONDS):
+        self.path = path
+        self.version = str(version)
+        self.mode = mode
+        self.max_attempts = max_attempts
+        self.flush_records = flush_records
+        self.flush_seconds = flush_seconds
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = NORMAL")
+        self._db.executescript(SCHEMA)
+        if 'mode' not in {row[1] for row in self._db.execute("PRAGMA table_info(documents)")}:
+            # Written before runs recorded their mode; every input is redone once
+            self._db.execute("ALTER TABLE documents ADD COLUMN mode TEXT")
+        self._db.row_factory = sqlite3.Row
+        self.entries = {row['input']: dict(row) for row in self._db.execute("SELECT * FROM documents")}
+        self._buffer = []
+        self._last_flush = time.monotonic()
+
+    def skip_reason(self, path, output):
+        """Why an input need not be processed again ('done' or 'failed'), or None to process it.
+
+        `output` is where this run would write the input's result.
+        """
+        entry = self.entries.get(path)
+        if entry is None or entry['mode'] != self.mode:
+            return None
+        try:
+            if (entry['size'], entry['mtime_ns']) != file_signature(path):
+                return None
+        except OSError:
+            return None
+        if entry['status'] in ('ok', 'degraded'):
+            current = (entry['parser_version'] == self.version and entry['output'] == output
+                       and os.path.exists(output))
+            if current and (entry['status'] == 'ok' or entry['attempts'] >= self.max_attempts):
+                return 'done'
+            return None
+        if entry['attempts'] >= self.max_attempts:
+            return 'failed'
+        return None
+
+    def record(self, record):
+        """Buffer one finished record from the batch runner; flushes when a batch is full."""
+        self._buffer.append((
+            record['input'], record.get('size'), record.get('mtime_ns'), record.get('digest'),
+            record['status'], record.get('pages'), record.get('seconds'), record.get('output'),
+            self.mode, record.get('error'), self.version, time.time()
+        ))
+        if (len(self._buffer) >= self.flush_records
+                or time.monotonic() - self._last_flush >= self.flush_seconds):
+            self.flush()
+
+    def flush(self):
+        """Write buffered records in a single transaction."""
+        if self._buffer:
+            with self._db:
+                self._db.executemany(UPSERT, self._buffer)
+            self._buffer = []
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,77 @@
+"""Micro-benchmark: is_citation_paragraph against the original 16-regex version.
+
+Run from the repository root:  python benchmarks/bench_citation.py [paragraphs] [repeat]
+"""
+
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tool import is_citation_paragraph  # noqa: E402
+
+LEGACY_PATTERNS = [
+    r'\b\d{4}\s+\d+\s+SCC\s+\d+\b',
+    r'\bMANU/SC/\d+/\d+\b',
+    r'\b\(\d{4}\)\s*\d+\s+SCC\s+\d+\b',
+    r'\bAIR\s+\d{4}\s+SC\s+\d+\b',
+    r'\b\d{4}\s+\d+\s+SCR\s+\d+\b',
+    r'\bJT\s+\d{4}\s+\(\d+\)\s+SC\s+\d+\b',
+    r'\b\d{4}\s+Supp\s+\(\d+\)\s+SCC\s+\d+\b',
+    r'\bvs?\.\s+[A-Z][a-zA-Z\s&]+\b',
+    r'\b[A-Z][a-zA-Z\s&]+ vs?\. [A-Z][a-zA-Z\s&]+\b',
+    r'\bsupra\b',
+    r'\binfra\b',
+    r'\bibid\b',
+    r'\bpara\s*\d+\b',
+    r'\bparas?\.\s*\d+\b',
+    r'\bSee also\b',
+    r'\bReferred to in\b',
+]
+
+def legacy_is_citation_paragraph(content):
+    """The original implementation: every pattern searched separately."""
+    citation_count = 0
+    for pattern in LEGACY_PATTERNS:
+        if re.search(pattern, content, re.IGNORECASE):
+            citation_count += 1
+    return citation_count >= 2 or (citation_count >= 1 and len(content) < 200)
+
+WORDS = ("the appellant respondent court held that statutory provision under section "
+         "of act was not applicable in facts and circumstances present case evidence "
+         "learned counsel submitted High Court State Union India order dated").split()
+CITATIONS = ["(2017) 10 SCC 1", "AIR 1973 SC 1461", "MANU/SC/0445/2019", "2019 3 SCR 12",
+             "JT 2001 (4) SC 12", "1991 Supp (1) SCC 600", "supra", "para 14",
+             "State of Punjab v. Union of India", "Kesavananda Bharati vs. State of Kerala"]
+
+def make_paragraph(rng, words):
+    """A judgment-like paragraph of roughly `words` words, sometimes citing cases."""
+    out = [rng.choice(WORDS) for _ in range(words)]
+    for _ in range(rng.choice((0, 0, 1, 2, 3))):
+        out.insert(rng.randrange(len(out) + 1), rng.choice(CITATIONS))
+    return ' '.join(out).capitalize() + '.'
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else 2000
+    repeat = int(argv[2]) if len(argv) > 2 else 5
+    rng = random.Random(7)
+    paragraphs = [make_paragraph(rng, rng.randint(15, 400)) for _ in range(count)]
+
+    disagreements = sum(legacy_is_citation_paragraph(p) != is_citation_paragraph(p) for p in paragraphs)
+    citing = sum(map(is_citation_paragraph, paragraphs))
+    mean_len = sum(map(len, paragraphs)) // len(paragraphs)
+    print(f"{count} paragraphs, mean {mean_len} chars, {citing} citing, {disagreements} disagreements")
+
+    results = {}
+    for name, func in (("legacy", legacy_is_citation_paragraph), ("combined", is_citation_paragraph)):
+        best = min(timeit.repeat(lambda: [func(p) for p in paragraphs], number=1, repeat=repeat))
+        results[name] = best
+        print(f"{name:>9}: {best * 1000:8.1f} ms  ({best / count * 1e6:6.1f} us/paragraph)")
+    print(f"  speedup: {results['legacy'] / results['combined']:.1f}x")
+    return 1 if disagreements else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
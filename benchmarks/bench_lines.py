@@ -0,0 +1,61 @@
+"""Benchmark: memory held by the line table of one judgment.
+
+Run from the repository root:  python benchmarks/bench_lines.py
+
+The old table kept a stripped copy of every line as its own str object, on
+top of the full text. The offset table keeps the text once and two 4-byte
+offsets plus a kind byte per line; the figures below are the bytes allocated
+beyond the text itself.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tool  # noqa: E402
+
+PARAGRAPH = """{number}. The learned counsel for the appellant submitted that the High Court
+erred in holding that the agreement dated 12.03.2009 was not binding, relying on
+(2017) 10 SCC 1 and AIR 1990 SC 1234.
+(i) the first condition was never fulfilled;
+(ii) the second condition was waived by conduct.
+"""
+
+def make_text(paragraphs):
+    return "".join(PARAGRAPH.format(number=n) for n in range(1, paragraphs + 1))
+
+def legacy_table(text):
+    """The previous LineTable: a list of stripped line copies and their kinds."""
+    lines = list(tool.iter_text_lines((text,)))
+    return lines, array('B', map(tool.classify_line, lines))
+
+def measure(build, text):
+    """(bytes still allocated after building, best build time in seconds)."""
+    seconds = float('inf')
+    for _ in range(3):
+        started = time.perf_counter()
+        build(text)
+        seconds = min(seconds, time.perf_counter() - started)
+    tracemalloc.start()
+    table = build(text)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del table
+    return size, seconds
+
+def main():
+    print(f"{'lines':>8} {'text KB':>8} {'legacy KB':>10} {'offsets KB':>11} {'B/line':>7} {'legacy ms':>10} {'offsets ms':>11}")
+    for paragraphs in (1000, 10000, 50000):
+        text = make_text(paragraphs)
+        lines = len(tool.tokenize_judgment(text))
+        legacy, legacy_seconds = measure(legacy_table, text)
+        offsets, offsets_seconds = measure(tool.tokenize_judgment, text)
+        print(f"{lines:>8} {len(text) // 1024:>8} {legacy // 1024:>10} {offsets // 1024:>11} "
+              f"{offsets / lines:>7.1f} {legacy_seconds * 1000:>10.1f} {offsets_seconds * 1000:>11.1f}")
+
+if __name__ == '__main__':
+    main()
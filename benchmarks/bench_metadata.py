@@ -0,0 +1,114 @@
+"""Benchmark: bench and author judge extraction stays O(header + tail).
+
+Run from the repository root:  python benchmarks/bench_metadata.py
+
+The judgment has a single author line and no HON'BLE bench lines, so the old
+scan searched every line for judges. Bodies of growing length mention
+"Hon'ble ... Justice" many times without a closing "J.", the worst case for
+the old lazy patterns. The old scan grows with the body; the region-aware
+scanner looks at the same number of lines whatever the body length.
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tool  # noqa: E402
+
+LEGACY_JUDGE_PATTERNS = [
+    re.compile(r'HON\'BLE.*?JUSTICE.*?J\.', re.IGNORECASE),
+    re.compile(r'HON\'BLE MR\. JUSTICE.*?J\.', re.IGNORECASE),
+    re.compile(r'HON\'BLE MS\. JUSTICE.*?J\.', re.IGNORECASE)
+]
+LEGACY_JUDGE_NAME_RE = re.compile(r'([A-Z][A-Z\.\s]+J\.)')
+
+HEADER = """2025 INSC 1001
+REPORTABLE
+IN THE SUPREME COURT OF INDIA
+CIVIL APPELLATE JURISDICTION
+CIVIL APPEAL NO. 1234 OF 2024
+M/S ACME TRADERS PVT LTD
+AND ANOTHER …PETITIONER
+VERSUS
+STATE OF SOMEWHERE …RESPONDENT(S)
+J U D G M E N T
+J.B. PARDIWALA, J."""
+QUOTE = ("As observed by the Hon'ble Justice in the earlier reference, and as the Hon'ble "
+         "Justices of the Constitution Bench repeatedly noted, the Hon'ble Court and Justice ")
+SIGNATURE = """..........................J.
+(J.B. PARDIWALA)
+..........................J.
+(R. MAHADEVAN)
+New Delhi;
+14th August, 2025"""
+
+def make_judgment(paragraphs):
+    body = [f"{n}. {QUOTE * 4}" for n in range(1, paragraphs + 1)]
+    return "\n".join([HEADER] + body + [SIGNATURE])
+
+def legacy_bench_scan(lines):
+    """The old behaviour: every line is searched until three judges and an author are found."""
+    judges, judge = [], ""
+    for line in lines:
+        if len(judges) < 3:
+            for pattern in LEGACY_JUDGE_PATTERNS:
+                judges.extend(pattern.findall(line))
+        if not judge and len(line) < 50 and "HON" not in line:
+            match = LEGACY_JUDGE_NAME_RE.search(line)
+            if match:
+                judge = match.group(0).strip()
+    return judges, judge
+
+class CountingScanner(tool.MetadataScanner):
+    """MetadataScanner that counts and times the lines handed to the bench scan."""
+
+    def __init__(self):
+        super().__init__()
+        self.bench_lines = 0
+        self.bench_seconds = 0.0
+
+    def _scan_bench(self, line):
+        started = time.perf_counter()
+        super()._scan_bench(line)
+        self.bench_seconds += time.perf_counter() - started
+        self.bench_lines += 1
+
+def best_of(func, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main():
+    print(f"{'paragraphs':>10} {'lines':>7} {'legacy ms':>10} {'region ms':>10} {'bench lines':>12}")
+    print("(time spent finding the bench and author judge only)")
+    scanned = set()
+    for paragraphs in (100, 400, 1600, 6400):
+        table = tool.tokenize_judgment(make_judgment(paragraphs))
+        lines = [line for _, line in table]
+        legacy = best_of(lambda: legacy_bench_scan(lines))
+
+        def region_scan():
+            scanner = CountingScanner()
+            for kind, line in table:
+                scanner.feed(line, kind)
+            return scanner
+
+        scanner = min((region_scan() for _ in range(3)), key=lambda s: s.bench_seconds)
+        region, bench_lines = scanner.bench_seconds, scanner.bench_lines
+        scanned.add(bench_lines)
+        print(f"{paragraphs:>10} {len(lines):>7} {legacy * 1000:>10.1f} {region * 1000:>10.1f} {bench_lines:>12}")
+
+    # The bench scan must not depend on the body length
+    if len(scanned) != 1:
+        print("FAIL: lines scanned for the bench grow with the body")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
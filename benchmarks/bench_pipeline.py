@@ -0,0 +1,151 @@
+"""Benchmark suite: the whole pipeline over synthetic judgments of growing size.
+
+Run from the repository root:
+
+    python benchmarks/bench_pipeline.py -o before.json
+    python benchmarks/bench_pipeline.py -o after.json --baseline before.json --threshold 0.15
+
+Synthetic PDFs (benchmarks/synthetic.py) are generated once per size and
+seed and kept in the corpus directory. Each document is processed several
+times with instrumentation on; the fastest run is reported, per stage, as
+seconds, pages/sec and paragraphs/sec. Peak memory is the Python heap peak
+(tracemalloc) of one extra run. With --baseline, any stage slower than the
+baseline by more than the threshold (or a higher memory peak) is reported
+and the exit status is 1.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # noqa: E402
+import tool  # noqa: E402
+from instrumentation import collect_report  # noqa: E402
+from synthetic import GENERATOR_VERSION, corpus_path  # noqa: E402
+
+DEFAULT_SIZES = (5, 50, 500, 2000)
+DEFAULT_CORPUS = os.path.join(tempfile.gettempdir(), "legal-parser-bench")
+# Stages shown and compared, in pipeline order
+STAGES = ('extract', 'pymupdf', 'cleanup', 'tokenize', 'metadata', 'index', 'parse',
+          'citation_detection', 'format', 'render')
+# Stages faster than this are too noisy to flag as regressions
+MIN_COMPARE_SECONDS = 0.02
+
+def run_once(path):
+    with collect_report() as report:
+        tool.process_judgment(path)
+    return report
+
+def peak_memory(path):
+    tracemalloc.start()
+    try:
+        tool.process_judgment(path)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def bench_document(path, repeat):
+    """Best-of-`repeat` instrumented run of one PDF, as a JSON-ready dict."""
+    report = min((run_once(path) for _ in range(repeat)), key=lambda report: report.wall_seconds)
+    counters = report.counters
+    pages, paragraphs = counters.get('pages', 0), counters.get('paragraphs', 0)
+    stages = {}
+    for name in ('total',) + STAGES:
+        if name == 'total':
+            seconds = report.wall_seconds
+        elif name in report.stages:
+            seconds = report.stages[name][1]
+        else:
+            continue
+        rate = 1 / seconds if seconds > 0 else 0.0
+        stages[name] = {'seconds': seconds, 'pages_per_sec': pages * rate, 'paragraphs_per_sec': paragraphs * rate}
+    return {
+        'pages': pages,
+        'lines': counters.get('lines', 0),
+        'paragraphs': paragraphs,
+        'bytes_out': counters.get('bytes_out', 0),
+        'stages': stages,
+        'peak_memory_bytes': peak_memory(path)
+    }
+
+def compare(results, baseline, threshold, min_seconds=MIN_COMPARE_SECONDS):
+    """Lines describing every regression of results against baseline beyond threshold."""
+    regressions = []
+    previous = {str(entry['size']): entry for entry in baseline['results']}
+    for entry in results['results']:
+        old = previous.get(str(entry['size']))
+        if old is None:
+            continue
+        for name, stage in entry['stages'].items():
+            old_stage = old['stages'].get(name)
+            if old_stage is None or max(stage['seconds'], old_stage['seconds']) < min_seconds:
+                continue
+            if stage['seconds'] > old_stage['seconds'] * (1 + threshold):
+                regressions.append(f"{entry['size']:>5} pages  {name:<20} {old_stage['seconds'] * 1000:9.1f} ms"
+                                   f" -> {stage['seconds'] * 1000:9.1f} ms")
+        if entry['peak_memory_bytes'] > old['peak_memory_bytes'] * (1 + threshold):
+            regressions.append(f"{entry['size']:>5} pages  {'peak memory':<20} "
+                               f"{old['peak_memory_bytes'] / 2**20:9.1f} MB -> {entry['peak_memory_bytes'] / 2**20:9.1f} MB")
+    return regressions
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the judgment pipeline on synthetic PDFs.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="document sizes in pages")
+    parser.add_argument('--seed', type=int, default=0, help="synthetic corpus seed")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per document; the fastest is kept")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help="where generated PDFs are kept")
+    parser.add_argument('-o', '--output', help="write the results as JSON")
+    parser.add_argument('--baseline', help="earlier JSON results to compare with")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="allowed slowdown (or memory growth) against the baseline, e.g. 0.10 = 10%%")
+    parser.add_argument('--min-seconds', type=float, default=MIN_COMPARE_SECONDS,
+                        help="ignore stages faster than this in both runs")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    results = {
+        'generator_version': GENERATOR_VERSION,
+        'parser_version': tool.PARSER_VERSION,
+        'seed': args.seed,
+        'python': platform.python_version(),
+        'pymupdf': fitz.VersionBind,
+        'created_at': time.time(),
+        'results': []
+    }
+    print(f"{'pages':>6} {'paras':>7} {'total s':>8} {'pages/s':>8} {'paras/s':>8} {'peak MB':>8}  slowest stages")
+    for size in args.sizes:
+        path = corpus_path(args.corpus, size, args.seed)
+        entry = dict(size=size, **bench_document(path, args.repeat))
+        results['results'].append(entry)
+        total = entry['stages']['total']
+        slowest = sorted((name for name in entry['stages'] if name != 'total'),
+                         key=lambda name: -entry['stages'][name]['seconds'])[:3]
+        print(f"{size:>6} {entry['paragraphs']:>7} {total['seconds']:>8.2f} {total['pages_per_sec']:>8.1f} "
+              f"{total['paragraphs_per_sec']:>8.0f} {entry['peak_memory_bytes'] / 2**20:>8.1f}  "
+              + ', '.join(f"{name} {entry['stages'][name]['seconds']:.2f}s" for name in slowest))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as fh:
+            baseline = json.load(fh)
+        regressions = compare(results, baseline, args.threshold, args.min_seconds)
+        if regressions:
+            print(f"REGRESSIONS (more than {args.threshold:.0%} worse than {args.baseline}):")
+            print("\n".join(regressions))
+            return 1
+        print(f"no regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,275 @@
+"""Regex denial-of-service check: fuzz every compiled pattern of the parser.
+
+Run from the repository root:  python benchmarks/regex_fuzz.py [-v] [NAME_FILTER]
+(tests/test_regex_fuzz.py runs the same check under pytest, one test per pattern)
+
+Every re.Pattern at module level in tool and citation_index (alone or in a
+list, tuple or dict) is collected. Adversarial inputs are built from the
+pattern's own pieces: long runs of one piece, alternations of two, and
+repeated near-matches that fail at each successive piece. Each input is
+scanned the way the parser applies the pattern (finditer, or match for the
+patterns in USAGE) at two lengths and timed in CPU time, so other load on
+the machine does not count. An input whose time grows clearly faster than
+its length (GROWTH_LIMIT for 4x the length) is only a suspect: it is timed
+again, as the median of several runs, at 16x the length, and fails if the
+time grows by more than CONFIRM_GROWTH_LIMIT there (linear scanning grows
+~16x, quadratic ~256x), so one noisy sample never fails the check. A
+pattern also fails when the median call exceeds CALL_BUDGET_SECONDS, or
+when one call does not return within CALL_TIMEOUT_SECONDS at all
+(catastrophic backtracking). Patterns the parser only ever gives short
+input are checked at that length only. The exit status is 1 if any
+pattern outside TRUSTED_INPUT fails.
+"""
+
+import itertools
+import multiprocessing
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import citation_index  # noqa: E402
+import tool  # noqa: E402
+
+try:
+    import re._parser as sre_parse
+    from re._constants import (ANY, AT, BRANCH, CATEGORY, IN, LITERAL, MAX_REPEAT, MIN_REPEAT,
+                               NOT_LITERAL, POSSESSIVE_REPEAT, SUBPATTERN, ATOMIC_GROUP, RANGE)
+except ImportError:  # Python < 3.11
+    import sre_parse
+    from sre_constants import (ANY, AT, BRANCH, CATEGORY, IN, LITERAL, MAX_REPEAT, MIN_REPEAT,
+                               NOT_LITERAL, SUBPATTERN, RANGE)
+    POSSESSIVE_REPEAT = ATOMIC_GROUP = None
+
+MODULES = (tool, citation_index)
+# Patterns only ever applied to text shipped with the code (the HTML template
+# and CSS), never to PDF text; they are reported but do not fail the check
+TRUSTED_INPUT = {
+    'tool.LAYOUT_WHITESPACE_RE': "template layout only",
+    'tool.CSS_COMMENT_RE': "bundled CSS only",
+    'tool.CSS_PUNCTUATION_RE': "bundled CSS only",
+    'tool.CSS_COLON_RE': "bundled CSS only",
+}
+# Patterns not applied with search/finditer to arbitrary text: 'match' ones are
+# only tried at the start of a line, a number is the longest input they get
+USAGE = {
+    'tool.LINE_CLASS_RE': 'match',
+    'tool.CORAM_RE': 'match',
+    'tool.JUDGE_NAME_RE': 49,  # only searched on lines shorter than 50 characters
+}
+
+SHORT_LENGTH = 2000
+LONG_LENGTH = 4 * SHORT_LENGTH
+# Linear scanning grows ~4x for 4x the input; quadratic grows ~16x
+GROWTH_LIMIT = 8.0
+# Suspects are re-timed at this length, where linear grows ~16x and quadratic ~256x
+CONFIRM_LENGTH = 16 * SHORT_LENGTH
+CONFIRM_GROWTH_LIMIT = 64.0
+# Timings are the median of this many runs (the screening run at LONG_LENGTH is a single one)
+RUNS = 3
+CONFIRM_RUNS = 5
+# Timings below this are noise and never reported as growth
+NOISE_SECONDS = 0.002
+CALL_BUDGET_SECONDS = 0.1
+CALL_TIMEOUT_SECONDS = 5.0
+MAX_PIECES = 10
+# Enough to show the problem; fuzzing on would only repeat it
+MAX_FINDINGS = 3
+
+CATEGORY_SAMPLES = {
+    'CATEGORY_DIGIT': '7', 'CATEGORY_NOT_DIGIT': 'x', 'CATEGORY_SPACE': ' ',
+    'CATEGORY_NOT_SPACE': 'x', 'CATEGORY_WORD': 'a', 'CATEGORY_NOT_WORD': '.',
+}
+GENERIC_UNITS = [' ', '\n', ' \n', '\t ', 'a', 'A', '7', '.', 'A.', 'J. ', '(', ')', '…', 'a b ', '1. ']
+
+def collect_patterns(modules=MODULES):
+    """[(name, pattern)] for every compiled pattern at module level."""
+    patterns = []
+    for module in modules:
+        for name, value in sorted(vars(module).items()):
+            label = f"{module.__name__}.{name}"
+            if isinstance(value, re.Pattern):
+                patterns.append((label, value))
+            elif isinstance(value, (list, tuple)):
+                patterns.extend((f"{label}[{i}]", item) for i, item in enumerate(value)
+                                if isinstance(item, re.Pattern))
+            elif isinstance(value, dict):
+                patterns.extend((f"{label}[{key!r}]", item) for key, item in value.items()
+                                if isinstance(item, re.Pattern))
+    return patterns
+
+def _sample_class(items):
+    """One character matched by an IN (character class) node."""
+    for op, arg in items:
+        if op == LITERAL:
+            return chr(arg)
+        if op == RANGE:
+            return chr(arg[0])
+        if op == CATEGORY:
+            return CATEGORY_SAMPLES.get(str(arg), 'a')
+    return 'x'
+
+def pattern_pieces(pattern):
+    """The literal runs and sample characters of a pattern, in the order they appear."""
+    pieces = []
+    literal = []
+
+    def flush():
+        if literal:
+            pieces.append(''.join(literal))
+            literal.clear()
+
+    def walk(nodes):
+        for op, arg in nodes:
+            if op == LITERAL:
+                literal.append(chr(arg))
+                continue
+            flush()
+            if op == NOT_LITERAL or op == ANY:
+                pieces.append('x')
+            elif op == IN:
+                pieces.append(_sample_class(arg))
+            elif op == CATEGORY:
+                pieces.append(CATEGORY_SAMPLES.get(str(arg), 'a'))
+            elif op in (MAX_REPEAT, MIN_REPEAT, POSSESSIVE_REPEAT):
+                walk(arg[2])
+            elif op == SUBPATTERN:
+                walk(arg[-1])
+            elif op == ATOMIC_GROUP:
+                walk(arg)
+            elif op == BRANCH:
+                for branch in arg[1]:
+                    walk(branch)
+                    flush()
+            elif op == AT:
+                continue
+        flush()
+
+    walk(sre_parse.parse(pattern.pattern, pattern.flags))
+    unique = list(dict.fromkeys(piece for piece in pieces if piece))
+    return unique[:MAX_PIECES]
+
+def attack_units(pattern):
+    """Repeating units whose long repetitions are likely to make the pattern backtrack."""
+    pieces = pattern_pieces(pattern)
+    units = list(GENERIC_UNITS) + pieces
+    units += [a + b for a, b in itertools.permutations(pieces, 2)]
+    # Near-matches: the pattern's pieces in order, cut short before each one
+    units += [''.join(pieces[:i]) for i in range(2, len(pieces) + 1)]
+    units += [''.join(pieces[:i]) + ' ' for i in range(1, len(pieces) + 1)]
+    return list(dict.fromkeys(unit for unit in units if unit))
+
+def repeat_to(unit, length):
+    return unit * max(1, length // len(unit))
+
+def scan_seconds(pattern, text, usage=None, runs=RUNS):
+    """Median CPU time of `runs` calls; a 'match' pattern is tried at every line start, as the parser does."""
+    if usage == 'match':
+        lines = text.split('\n')
+        call = lambda: [pattern.match(line) for line in lines]  # noqa: E731
+    else:
+        call = lambda: list(pattern.finditer(text))  # noqa: E731
+    timings = []
+    for _ in range(runs):
+        started = time.thread_time()
+        call()
+        timings.append(time.thread_time() - started)
+    return statistics.median(timings)
+
+def _grew(short, long, limit=GROWTH_LIMIT):
+    return long > CALL_BUDGET_SECONDS or (long > NOISE_SECONDS and long > limit * max(short, 1e-6))
+
+def fuzz_pattern(pattern, usage=None, report=None):
+    """[(text_unit, short_seconds, confirm_seconds)] for the inputs that grew super-linearly or blew the budget.
+
+    `report` is called before each scan with its input, so a caller can tell
+    which one hung.
+    """
+    findings = []
+    short_length = usage if isinstance(usage, int) else SHORT_LENGTH
+    for unit in attack_units(pattern):
+        for tail in ('', '\x00'):
+            short_text = repeat_to(unit, short_length)[:short_length - len(tail)] + tail
+            if report:
+                report(unit + tail)
+            short = scan_seconds(pattern, short_text, usage)
+            if short > CALL_BUDGET_SECONDS:
+                findings.append((unit + tail, short, None))
+            elif not isinstance(usage, int):
+                if _grew(short, scan_seconds(pattern, repeat_to(unit, LONG_LENGTH) + tail, usage, runs=1)):
+                    # A suspect: confirm at a wider ratio, so a scheduling hiccup cannot fail it
+                    if report:
+                        report(unit + tail)
+                    short = scan_seconds(pattern, short_text, usage, runs=CONFIRM_RUNS)
+                    long = scan_seconds(pattern, repeat_to(unit, CONFIRM_LENGTH) + tail, usage, runs=CONFIRM_RUNS)
+                    if _grew(short, long, CONFIRM_GROWTH_LIMIT):
+                        findings.append((unit + tail, short, long))
+            if len(findings) >= MAX_FINDINGS:
+                return findings
+    return findings
+
+def _fuzz_worker(pattern, usage, conn):
+    findings = fuzz_pattern(pattern, usage, report=lambda unit: conn.send(('scan', unit)))
+    conn.send(('done', findings))
+    conn.close()
+
+def fuzz_with_timeout(pattern, usage=None, timeout=CALL_TIMEOUT_SECONDS):
+    """fuzz_pattern in a child process, killed when one call hangs.
+
+    Returns (findings, hung_unit): hung_unit is the repeating unit of the
+    input that did not return within `timeout`, or None.
+    """
+    parent, child = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_fuzz_worker, args=(pattern, usage, child), daemon=True)
+    process.start()
+    child.close()
+    unit = None
+    try:
+        while parent.poll(timeout):
+            kind, value = parent.recv()
+            if kind == 'done':
+                return value, None
+            unit = value
+        return [], unit
+    except EOFError:  # the worker died
+        return [], unit
+    finally:
+        process.kill()
+        process.join()
+
+def main(argv):
+    verbose = '-v' in argv
+    filters = [arg for arg in argv[1:] if arg != '-v']
+    failed = []
+    patterns = [(name, pattern) for name, pattern in collect_patterns()
+                if not filters or any(f in name for f in filters)]
+    for name, pattern in patterns:
+        started = time.perf_counter()
+        findings, hung = fuzz_with_timeout(pattern, USAGE.get(name))
+        elapsed = time.perf_counter() - started
+        trusted = TRUSTED_INPUT.get(name)
+        if hung is not None:
+            status = "TIMEOUT"
+            findings = [(hung, CALL_TIMEOUT_SECONDS, None)] + findings
+        elif findings:
+            status = "SUPER-LINEAR"
+        else:
+            status = "ok"
+        if status != "ok" and trusted:
+            status += f" (trusted: {trusted})"
+        elif status != "ok":
+            failed.append(name)
+        if verbose or status != "ok":
+            print(f"{status:<12} {name}  [{elapsed:.1f}s]", flush=True)
+        for unit, short, long in findings:
+            long_text = f"{long * 1000:.1f} ms" if long is not None else "skipped"
+            print(f"    {unit[:40]!r} x{SHORT_LENGTH // len(unit)}: {short * 1000:.1f} ms, "
+                  f"x{CONFIRM_LENGTH // len(unit)}: {long_text}", flush=True)
+    print(f"{len(patterns)} patterns fuzzed, {len(failed)} failing")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,149 @@
+"""Reproducible synthetic Supreme Court judgments, written as PDFs with PyMuPDF.
+
+    python benchmarks/synthetic.py 500 out.pdf [seed]
+
+Each document has the usual header (neutral citation, case number, parties
+with "…PETITIONER"/"…RESPONDENT" lines, bench), an INDEX block, numbered
+paragraphs with I./a./i. sub-points and section headers, SCC/AIR/MANU/SCR
+citations, a signature block, and on every page the "Printed For:" line and
+"Page x of y" marker that extraction strips. The same (pages, seed) always
+gives the same text.
+"""
+
+import os
+import random
+import sys
+import textwrap
+
+import fitz  # PyMuPDF
+
+# Bump when the generated text changes, so cached corpora are regenerated
+GENERATOR_VERSION = 1
+
+LINES_PER_PAGE = 46
+LINE_WIDTH = 96
+FONT_SIZE = 8
+LINE_HEIGHT = 16
+
+WORDS = ("the appellant respondent court held that statutory provision under section of act "
+         "was not applicable in facts and circumstances present case evidence learned counsel "
+         "submitted High Court State order dated tribunal jurisdiction limitation notice "
+         "contract decree writ petition finding reasons material record authority").split()
+CITATIONS = ["(2017) 10 SCC 1", "(2019) 4 SCC 17", "2004 3 SCC 553", "AIR 1973 SC 1461",
+             "AIR 1950 SC 27", "MANU/SC/0445/1973", "MANU/SC/1234/2019", "[1994] 3 SCR 1",
+             "1991 Supp (1) SCC 600", "JT 2001 (4) SC 12", "2023 INSC 712"]
+REFERENCES = ["supra", "ibid", "para 14", "paras. 22", "See also", "Section 34", "Article 14",
+              "Section 9A(2)", "Kesavananda Bharati v. State of Kerala"]
+HEADINGS = ["FACTUAL MATRIX", "SUBMISSIONS", "ISSUES", "ANALYSIS", "DISCUSSION", "CONCLUSION"]
+
+def sentence(rng, words=None, capital=True):
+    """A judgment-like sentence, sometimes citing a report or referring back."""
+    out = [rng.choice(WORDS) for _ in range(words or rng.randint(8, 40))]
+    for _ in range(rng.choice((0, 0, 0, 1, 1, 2))):
+        out.insert(rng.randrange(len(out) + 1), rng.choice(CITATIONS))
+    if rng.random() < 0.2:
+        out.insert(rng.randrange(len(out) + 1), rng.choice(REFERENCES))
+    text = ' '.join(out) + '.'
+    return text[0].upper() + text[1:] if capital else text
+
+def wrapped(text, indent=''):
+    return textwrap.wrap(text, LINE_WIDTH, subsequent_indent=indent) or ['']
+
+def header_lines(rng):
+    year = rng.randint(2015, 2024)
+    return [
+        f"{year + 1} INSC {rng.randint(100, 999)}",
+        "REPORTABLE",
+        "IN THE SUPREME COURT OF INDIA",
+        rng.choice(["CIVIL APPELLATE JURISDICTION", "CRIMINAL APPELLATE JURISDICTION"]),
+        f"CIVIL APPEAL NO. {rng.randint(100, 9999)} OF {year}",
+        "(Arising out of SLP (C) No. 1234 of 2022)",
+        "M/S ACME INFRASTRUCTURE PVT LTD",
+        "AND ANOTHER …PETITIONER(S)",
+        "VERSUS",
+        "STATE OF SOMEWHERE AND OTHERS …RESPONDENT(S)",
+        "J U D G M E N T",
+        "J.B. PARDIWALA, J.",
+        "For the convenience of exposition, this judgment is divided into the following parts:",
+        "INDEX",
+        "A. FACTUAL MATRIX ........................................ 2",
+        "B. SUBMISSIONS ON BEHALF OF THE PARTIES ................... 5",
+        "I. Submissions of the appellant ........................... 5",
+        "II. Submissions of the respondent ......................... 8",
+        "C. ANALYSIS ............................................... 11",
+        "a. Scope of the statutory provision ....................... 12",
+        "i. Legislative history ..................................... 13",
+        "D. CONCLUSION ............................................. 40",
+    ]
+
+def paragraph_lines(rng, number):
+    """One numbered paragraph, wrapped like PDF text, with occasional sub-points."""
+    lines = wrapped(f"{number}. " + ' '.join(sentence(rng) for _ in range(rng.randint(1, 4))))
+    # Sub-points run on from the paragraph in lower case ("I. that ..."),
+    # otherwise "I. The" would read as a section header
+    if rng.random() < 0.25:
+        for roman in ("I.", "II.", "III.")[:rng.randint(1, 3)]:
+            lines += wrapped(f"{roman} that {sentence(rng, capital=False)}")
+            if rng.random() < 0.4:
+                for letter in ("a.", "b.")[:rng.randint(1, 2)]:
+                    lines += wrapped(f"{letter} where {sentence(rng, capital=False)}")
+                    if rng.random() < 0.3:
+                        lines += wrapped(f"i. as {sentence(rng, capital=False)}")
+    return lines
+
+def signature_lines():
+    return ["..........................................J.", "(J.B. PARDIWALA)",
+            "..........................................J.", "(R. MAHADEVAN)",
+            "New Delhi;", "January 15, 2025."]
+
+def judgment_pages(pages, seed=0):
+    """The text lines of a `pages`-page judgment, split into pages (without page furniture)."""
+    rng = random.Random(f"{seed}:{pages}")
+    body_lines = pages * LINES_PER_PAGE - len(signature_lines())
+    lines = header_lines(rng)
+    number = 0
+    headings = iter(HEADINGS)
+    while len(lines) < body_lines:
+        if number and rng.random() < 0.03:
+            heading = next(headings, None)
+            if heading is not None:
+                lines.append(f"{'ABCDEFG'[HEADINGS.index(heading)]}. {heading}")
+        number += 1
+        lines += paragraph_lines(rng, number)
+    lines = lines[:body_lines] + signature_lines()
+    return [lines[start:start + LINES_PER_PAGE] for start in range(0, len(lines), LINES_PER_PAGE)]
+
+def write_judgment_pdf(path, pages, seed=0):
+    """Write a synthetic judgment of exactly `pages` pages to path."""
+    font = fitz.Font('helv')
+    doc = fitz.open()
+    page_texts = judgment_pages(pages, seed)
+    for page_no, lines in enumerate(page_texts, 1):
+        page = doc.new_page()
+        writer = fitz.TextWriter(page.rect)
+        writer.append((40, 24), "Printed For: Benchmark Suite On: 15-01-2025", font=font, fontsize=6)
+        y = 48
+        for line in lines:
+            writer.append((40, y), line, font=font, fontsize=FONT_SIZE)
+            y += LINE_HEIGHT
+        writer.append((280, 820), f"Page {page_no} of {len(page_texts)}", font=font, fontsize=6)
+        writer.write_text(page)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    doc.save(tmp_path, garbage=3, deflate=True)
+    doc.close()
+    os.replace(tmp_path, path)
+    return path
+
+def corpus_path(directory, pages, seed=0):
+    """Path of the cached synthetic PDF for (pages, seed), generating it on first use."""
+    path = os.path.join(directory, f"synthetic-v{GENERATOR_VERSION}-s{seed}-{pages}p.pdf")
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        write_judgment_pdf(path, pages, seed)
+    return path
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (3, 4):
+        print("usage: synthetic.py PAGES OUTPUT.pdf [SEED]", file=sys.stderr)
+        sys.exit(2)
+    write_judgment_pdf(sys.argv[2], int(sys.argv[1]), int(sys.argv[3]) if len(sys.argv) == 4 else 0)
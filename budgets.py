@@ -0,0 +1,191 @@
+"""Per-document page, time and memory budgets, with staged degradation.
+
+A Budget holds the limits; tool.process_judgment(..., budget=Budget(...))
+starts a DocumentBudget for each document and makes it current on the
+thread while the pipeline runs:
+
+    result = tool.process_judgment(path, budget=Budget(max_pages=2000, stage_seconds=30))
+    result['degradations']   # [] when every limit was respected
+
+Nothing fails when a limit is hit. Past max_pages the rest of the pages
+are left out, and the rendered judgment says so at the top. Running past
+the time or memory allowance never drops content: from then on, parsing
+and formatting step down one level at a time, each step giving the stage
+a fresh time allowance (a slow extraction reads every page and steps down
+the formatting that follows):
+
+    NO_CITATION_STYLING  citation paragraphs are not detected or highlighted
+    NO_SUB_POINTS        sub-point lines are kept as paragraph text
+    PLAIN_PARAGRAPHS     paragraphs are emitted as escaped plain text
+
+Every step is recorded in `degradations`. Memory is the growth of the
+process's resident set since the document started, so documents processed
+concurrently in one process count against each other.
+"""
+
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+FULL = 0
+NO_CITATION_STYLING = 1
+NO_SUB_POINTS = 2
+PLAIN_PARAGRAPHS = 3
+LEVEL_NAMES = {
+    NO_CITATION_STYLING: 'no_citation_styling',
+    NO_SUB_POINTS: 'no_sub_points',
+    PLAIN_PARAGRAPHS: 'plain_paragraphs',
+}
+
+# Reading the resident set costs a system call; it is sampled at most this often
+MEMORY_SAMPLE_SECONDS = 0.05
+
+try:
+    PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    PAGE_SIZE = 4096
+
+_state = threading.local()
+
+def memory_in_use():
+    """Resident set size of this process in bytes, or None where it cannot be read.
+
+    Without /proc the peak resident set is used, which only ever grows.
+    """
+    try:
+        with open('/proc/self/statm', 'rb') as fh:
+            return int(fh.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+class Budget:
+    """Limits for one document; None means unlimited.
+
+    max_pages: pages extracted at most. stage_seconds: wall time allowed to
+    each of extraction, parsing and rendering (and again after each
+    degradation step). max_memory: bytes the process may grow by.
+    """
+
+    def __init__(self, max_pages=None, stage_seconds=None, max_memory=None):
+        self.max_pages = max_pages
+        self.stage_seconds = stage_seconds
+        self.max_memory = max_memory
+
+    @property
+    def key(self):
+        """The limits as text, e.g. "max_pages=5,stage_seconds=30"; "" when nothing is limited.
+
+        Results made under different keys may differ, so they are never shared.
+        """
+        limits = (('max_pages', self.max_pages), ('stage_seconds', self.stage_seconds),
+                  ('max_memory', self.max_memory))
+        return ','.join(f"{name}={value}" for name, value in limits if value is not None)
+
+    def start(self):
+        return DocumentBudget(self)
+
+class DocumentBudget:
+    """A Budget being spent on one document: the current stage, level and the degradations so far."""
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.level = FULL
+        self.degradations = []
+        self.stage = None
+        self.stage_started = time.perf_counter()
+        self.memory_start = memory_in_use() if budget.max_memory is not None else None
+        self.memory_checked = 0.0
+        self.memory_over = False
+
+    @property
+    def degraded(self):
+        return bool(self.degradations)
+
+    def enter(self, stage):
+        self.stage = stage
+        self.stage_started = time.perf_counter()
+
+    def exceeded(self):
+        """'time' or 'memory' if the current stage is over budget, else None."""
+        now = time.perf_counter()
+        limit = self.budget.stage_seconds
+        if limit is not None and now - self.stage_started > limit:
+            return 'time'
+        if self.memory_start is not None and not self.memory_over and now - self.memory_checked >= MEMORY_SAMPLE_SECONDS:
+            self.memory_checked = now
+            used = memory_in_use()
+            self.memory_over = used is not None and used - self.memory_start > self.budget.max_memory
+        return 'memory' if self.memory_over else None
+
+    def over_page_limit(self, page_count):
+        return self.budget.max_pages is not None and page_count > self.budget.max_pages
+
+    def page_limit(self, page_count):
+        """How many of page_count pages to extract, recording the cut if there is one."""
+        if not self.over_page_limit(page_count):
+            return page_count
+        self.truncate(self.budget.max_pages, page_count, 'max_pages')
+        return self.budget.max_pages
+
+    @property
+    def truncation(self):
+        """The 'truncated' degradation entry if pages were left out, else None."""
+        return next((entry for entry in self.degradations if entry['degradation'] == 'truncated'), None)
+
+    def truncate(self, pages, page_count, reason):
+        self.degradations.append({'stage': 'extract', 'degradation': 'truncated', 'reason': reason,
+                                  'pages': pages, 'page_count': page_count})
+
+    def checkpoint(self):
+        """Step down one level if the current stage is over budget; returns the level to work at."""
+        if self.level < PLAIN_PARAGRAPHS:
+            reason = self.exceeded()
+            if reason is not None:
+                self.level += 1
+                self.degradations.append({'stage': self.stage, 'degradation': LEVEL_NAMES[self.level],
+                                          'reason': reason})
+                self.stage_started = time.perf_counter()
+        return self.level
+
+    def summary(self):
+        """One line per degradation, e.g. "parse: no_citation_styling (time)"."""
+        lines = []
+        for entry in self.degradations:
+            if entry['degradation'] == 'truncated':
+                lines.append(f"extract: first {entry['pages']} of {entry['page_count']} pages ({entry['reason']})")
+            else:
+                lines.append(f"{entry['stage']}: {entry['degradation']} ({entry['reason']})")
+        return lines
+
+def current_budget():
+    """The DocumentBudget being spent on this thread, or None when there are no limits."""
+    return getattr(_state, 'budget', None)
+
+@contextmanager
+def spending(document_budget):
+    """Make document_budget (a DocumentBudget, or None) current on this thread."""
+    previous = getattr(_state, 'budget', None)
+    _state.budget = document_budget
+    try:
+        yield document_budget
+    finally:
+        _state.budget = previous
+
+@contextmanager
+def budget_stage(name):
+    """Give the current document's stage `name` its time allowance (a no-op without a budget)."""
+    document_budget = getattr(_state, 'budget', None)
+    if document_budget is not None:
+        document_budget.enter(name)
+    yield document_budget
@@ -0,0 +1,93 @@
+"""Cooperative cancellation of a judgment being processed.
+
+    token = CancellationToken()
+    # in another thread, or a signal handler:  token.cancel()
+    result = tool.process_judgment(path, cancellation=token)   # raises Cancelled
+
+The pipeline checks the current thread's token between pages, between
+paragraphs and between rendered sections, so abandoned work stops at the
+next checkpoint and its memory is released as the exception unwinds.
+Without a token the checkpoints are a thread-local lookup.
+
+A token can be backed by a multiprocessing.Event, to cancel work in pool
+workers from the parent, and can be given a `poll` callable that the
+checkpoints run every POLL_SECONDS; the Streamlit app polls a UI element,
+which is where Streamlit interrupts a script whose session moved on.
+"""
+
+import threading
+import time
+from concurrent import futures
+from contextlib import contextmanager
+
+# How often checkpoints run a token's `poll`
+POLL_SECONDS = 0.1
+# How often a checkpoint blocked on a result (a page range, another session's run) looks again
+WAIT_SECONDS = 0.01
+
+_state = threading.local()
+
+class Cancelled(Exception):
+    """Raised at a pipeline checkpoint once the CancellationToken has been cancelled."""
+
+class CancellationToken:
+    """Set once, from any thread (or process, with a multiprocessing.Event); checked by the pipeline."""
+
+    def __init__(self, event=None, poll=None):
+        self.event = event if event is not None else threading.Event()
+        self.poll = poll
+        self.reason = None
+        self.polled = time.monotonic()
+
+    def cancel(self, reason="cancelled"):
+        self.reason = reason
+        self.event.set()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def check(self):
+        """Raise Cancelled if cancelled; runs `poll` first when it is due."""
+        if self.poll is not None:
+            now = time.monotonic()
+            if now - self.polled >= POLL_SECONDS:
+                self.polled = now
+                self.poll()
+        if self.event.is_set():
+            raise Cancelled(self.reason or "cancelled")
+
+def current_cancellation():
+    """The CancellationToken checked on this thread, or None."""
+    return getattr(_state, 'token', None)
+
+def check_cancelled():
+    """Pipeline checkpoint: raise Cancelled if this thread's token has been cancelled."""
+    token = getattr(_state, 'token', None)
+    if token is not None:
+        token.check()
+
+@contextmanager
+def cancellable(token):
+    """Check `token` at the checkpoints run on this thread; with None, any outer token stays in force."""
+    if token is None:
+        yield getattr(_state, 'token', None)
+        return
+    previous = getattr(_state, 'token', None)
+    _state.token = token
+    try:
+        token.check()
+        yield token
+    finally:
+        _state.token = previous
+
+def wait_result(future, token=None):
+    """future.result(), checking `token` (or this thread's token) while it is pending."""
+    token = token if token is not None else getattr(_state, 'token', None)
+    if token is None:
+        return future.result()
+    while True:
+        try:
+            return future.result(timeout=WAIT_SECONDS)
+        except futures.TimeoutError:
+            token.check()
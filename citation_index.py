@@ -0,0 +1,223 @@
+"""Normalized law-report citations and a SQLite index of who cites what.
+
+Run as a script to query the index:
+
+    python citation_index.py cited-by "2017 10 SCC 1"
+    python citation_index.py citations-in "2024 INSC 123"
+"""
+
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+INDEX_PATH = os.environ.get(
+    "LEGAL_PARSER_INDEX",
+    os.path.join(os.path.expanduser("~"), ".local", "share", "legal-parser", "citations.sqlite3")
+)
+
+# One alternative per reporter; group names are <prefix>_year/_volume/_page.
+# A year in brackets may be written (2017) or [2017]; volumes are optional
+# where the series has unnumbered volumes. Only Supreme Court reports are
+# recognised: High Court series, and SCC OnLine citations of other courts
+# ("2019 SCC OnLine Del 1234"), are left out of the index.
+CITATION_FORMS = [
+    ('scc_supp', 'SCC Supp',
+     r'[(\[]?(?P<scc_supp_year>\d{4})\b[)\]]?\s*Supp\.?\s*(?:\(?\s*(?P<scc_supp_volume>\d+)\s*\)?\s*)?'
+     r'SCC\s+(?P<scc_supp_page>\d+)'),
+    ('scc_online', 'SCC OnLine', r'(?P<scc_online_year>\d{4})\s+SCC\s+OnLine\s+SC\s+(?P<scc_online_page>\d+)'),
+    ('scc', 'SCC',
+     r'[(\[]?(?P<scc_year>\d{4})\b[)\]]?\s*\(?(?P<scc_volume>\d+)\)?\s+SCC\s+(?P<scc_page>\d+)'),
+    ('scr', 'SCR',
+     r'[(\[]?(?P<scr_year>\d{4})\b[)\]]?\s*(?:(?P<scr_volume>\d+)\s+)?SCR\s+(?P<scr_page>\d+)'),
+    ('air', 'AIR', r'AIR\s+(?P<air_year>\d{4})\s+SC\s+(?P<air_page>\d+)'),
+    ('jt', 'JT', r'JT\s+(?P<jt_year>\d{4})\s*\(\s*(?P<jt_volume>\d+)\s*\)\s*SC\s+(?P<jt_page>\d+)'),
+    ('manu', 'MANU', r'MANU/SC/(?P<manu_page>\d+)/(?P<manu_year>\d{4})'),
+    ('insc', 'INSC', r'(?P<insc_year>\d{4})\s+INSC\s+(?P<insc_page>\d+)'),
+]
+CITATION_RE = re.compile(
+    r'(?<![\w/])(?:'
+    + '|'.join(f'(?P<{prefix}>{pattern})' for prefix, _, pattern in CITATION_FORMS)
+    + r')\b'
+)
+REPORTERS = {prefix: reporter for prefix, reporter, _ in CITATION_FORMS}
+
+# Canonical spelling of each reporter's citations, used as the index key
+CITATION_KEY_FORMATS = {
+    'SCC': '({year}) {volume} SCC {page}',
+    'SCC Supp': '({year}) Supp ({volume}) SCC {page}',
+    'SCC OnLine': '{year} SCC OnLine SC {page}',
+    'SCR': '[{year}] {volume} SCR {page}',
+    'AIR': 'AIR {year} SC {page}',
+    'JT': 'JT {year} ({volume}) SC {page}',
+    'MANU': 'MANU/SC/{page:04d}/{year}',
+    'INSC': '{year} INSC {page}',
+}
+# Reporters whose volume may be absent, and their key without one
+UNNUMBERED_KEY_FORMATS = {
+    'SCC Supp': '({year}) Supp SCC {page}',
+    'SCR': '[{year}] SCR {page}',
+}
+
+def citation_key(reporter, year, volume, page):
+    """The canonical citation string, e.g. "(2017) 10 SCC 1"."""
+    if volume is None and reporter in UNNUMBERED_KEY_FORMATS:
+        return UNNUMBERED_KEY_FORMATS[reporter].format(year=year, page=page)
+    return CITATION_KEY_FORMATS[reporter].format(year=year, volume=volume, page=page)
+
+def iter_citations(text):
+    """Yield (reporter, year, volume, page) for every citation in text, in order."""
+    for match in CITATION_RE.finditer(text):
+        prefix = match.lastgroup
+        volume = match.group(f'{prefix}_volume') if f'{prefix}_volume' in CITATION_RE.groupindex else None
+        yield (
+            REPORTERS[prefix],
+            int(match.group(f'{prefix}_year')),
+            int(volume) if volume is not None else None,
+            int(match.group(f'{prefix}_page'))
+        )
+
+def parse_citation(text):
+    """Canonical key of the first citation in text, or None."""
+    for citation in iter_citations(text):
+        return citation_key(*citation)
+    return None
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS judgments (
+    digest TEXT PRIMARY KEY,
+    neutral_citation TEXT,
+    petitioner TEXT,
+    respondent TEXT,
+    judgment_date TEXT,
+    source TEXT,
+    parser_version TEXT,
+    indexed_at REAL
+);
+CREATE INDEX IF NOT EXISTS judgments_by_neutral_citation ON judgments (neutral_citation);
+CREATE TABLE IF NOT EXISTS citations (
+    digest TEXT NOT NULL REFERENCES judgments (digest) ON DELETE CASCADE,
+    citation TEXT NOT NULL,
+    reporter TEXT NOT NULL,
+    year INTEGER,
+    volume INTEGER,
+    page INTEGER,
+    paragraph TEXT
+);
+CREATE INDEX IF NOT EXISTS citations_by_citation ON citations (citation);
+CREATE INDEX IF NOT EXISTS citations_by_digest ON citations (digest);
+"""
+
+class CitationIndex:
+    """Corpus-wide SQLite index of the citations made by each processed judgment.
+
+    Judgments are keyed by the SHA-256 of their PDF, so re-indexing the same
+    file replaces its rows. Both directions are indexed lookups: who cites a
+    given citation, and what a given judgment cites.
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA foreign_keys = ON")
+        if path != ':memory:':
+            self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.executescript(SCHEMA)
+
+    def add_judgment(self, digest, citations, metadata=None, source=None, version=None):
+        """Replace the index rows for one judgment.
+
+        `citations` are records with reporter, year, volume, page, paragraph
+        and key attributes; `metadata` is the parser's metadata dict.
+        """
+        metadata = metadata or {}
+        neutral = parse_citation(metadata.get('citation_number', ''))
+        rows = [(digest, citation.key, citation.reporter, citation.year, citation.volume,
+                 citation.page, citation.paragraph) for citation in citations]
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM judgments WHERE digest = ?", (digest,))
+            self._db.execute(
+                "INSERT INTO judgments VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (digest, neutral, metadata.get('petitioner', ''), metadata.get('respondent', ''),
+                 metadata.get('judgment_date', ''), source, version, time.time())
+            )
+            self._db.executemany("INSERT INTO citations VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def _query(self, sql, params):
+        with self._lock:
+            return [dict(row) for row in self._db.execute(sql, params)]
+
+    def cited_by(self, citation):
+        """Judgments (and paragraphs) citing the given citation, in any spelling."""
+        key = parse_citation(citation)
+        if key is None:
+            raise ValueError(f"Not a recognised citation: {citation!r}")
+        return self._query(
+            "SELECT j.digest, j.neutral_citation, j.petitioner, j.respondent, j.judgment_date,"
+            " j.source, c.paragraph FROM citations c JOIN judgments j USING (digest)"
+            " WHERE c.citation = ? ORDER BY j.judgment_date, j.digest, c.rowid",
+            (key,)
+        )
+
+    def citations_in(self, judgment):
+        """Citations made by a judgment, given its PDF digest or its neutral citation."""
+        digest = judgment
+        neutral = parse_citation(judgment)
+        if neutral is not None:
+            rows = self._query("SELECT digest FROM judgments WHERE neutral_citation = ?", (neutral,))
+            if not rows:
+                return []
+            digest = rows[0]['digest']
+        return self._query(
+            "SELECT citation, reporter, year, volume, page, paragraph FROM citations"
+            " WHERE digest = ? ORDER BY rowid",
+            (digest,)
+        )
+
+    def judgment_count(self):
+        return self._query("SELECT COUNT(*) AS n FROM judgments", ())[0]['n']
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def main(argv):
+    usage = "usage: citation_index.py [--index PATH] (cited-by CITATION | citations-in JUDGMENT)"
+    args = list(argv[1:])
+    path = INDEX_PATH
+    if args[:1] == ['--index'] and len(args) > 1:
+        path = args[1]
+        args = args[2:]
+    if len(args) != 2 or args[0] not in ('cited-by', 'citations-in'):
+        print(usage, file=sys.stderr)
+        return 2
+
+    command, query = args
+    with CitationIndex(path) as index:
+        if command == 'cited-by':
+            try:
+                rows = index.cited_by(query)
+            except ValueError as exc:
+                print(exc, file=sys.stderr)
+                return 2
+            for row in rows:
+                title = f"{row['petitioner']} v. {row['respondent']}"
+                print(f"{row['neutral_citation'] or row['digest'][:12]}\t{title}\tpara {row['paragraph']}")
+        else:
+            for row in index.citations_in(query):
+                print(f"{row['citation']}\tpara {row['paragraph']}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,125 @@
+"""Optional per-document timers and counters for the judgment pipeline.
+
+Instrumentation is off unless a report is being collected on the current
+thread:
+
+    with collect_report() as report:
+        result = tool.process_judgment(path)
+    print(report.to_dict())
+
+While it is off, stage_timer() hands out one shared no-op context manager
+and add_count() returns at once, so instrumented code pays a thread-local
+lookup per call. Stage times are inclusive: a stage run inside another
+(formatting inside rendering, say) is counted in both. CPU time is that of
+the collecting thread; work done in extraction worker processes shows up
+as wall time only.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+_state = threading.local()
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_TIMER = _NullTimer()
+
+class _StageTimer:
+    __slots__ = ('report', 'name', 'wall', 'cpu')
+
+    def __init__(self, report, name):
+        self.report = report
+        self.name = name
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.report.add_stage(self.name, time.perf_counter() - self.wall, time.thread_time() - self.cpu)
+        return False
+
+class Report:
+    """Wall and CPU time per stage, plus named counters, for one document (or a merged batch)."""
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+
+    def add_stage(self, name, wall, cpu, calls=1):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = [0, 0.0, 0.0]
+        stage[0] += calls
+        stage[1] += wall
+        stage[2] += cpu
+
+    def add_count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def merge(self, data):
+        """Add another report (in its to_dict() form) into this one."""
+        self.wall_seconds += data['wall_seconds']
+        self.cpu_seconds += data['cpu_seconds']
+        for name, stage in data['stages'].items():
+            self.add_stage(name, stage['wall_seconds'], stage['cpu_seconds'], stage['calls'])
+        for name, amount in data['counters'].items():
+            self.add_count(name, amount)
+
+    def to_dict(self):
+        return {
+            'wall_seconds': self.wall_seconds,
+            'cpu_seconds': self.cpu_seconds,
+            'stages': {name: {'calls': calls, 'wall_seconds': wall, 'cpu_seconds': cpu}
+                       for name, (calls, wall, cpu) in self.stages.items()},
+            'counters': dict(self.counters)
+        }
+
+    def format(self):
+        """The report as a plain-text table, slowest stage first."""
+        lines = [f"total {self.wall_seconds * 1000:.1f} ms wall, {self.cpu_seconds * 1000:.1f} ms cpu",
+                 f"{'stage':<20} {'calls':>7} {'wall ms':>10} {'cpu ms':>10}"]
+        for name, (calls, wall, cpu) in sorted(self.stages.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{name:<20} {calls:>7} {wall * 1000:>10.1f} {cpu * 1000:>10.1f}")
+        lines.extend(f"{name:<20} {amount:>7}" for name, amount in sorted(self.counters.items()))
+        return "\n".join(lines)
+
+def current_report():
+    """The report being collected on this thread, or None when instrumentation is off."""
+    return getattr(_state, 'report', None)
+
+def stage_timer(name):
+    """Context manager timing one run of a stage (a no-op unless a report is being collected)."""
+    report = getattr(_state, 'report', None)
+    if report is None:
+        return NULL_TIMER
+    return _StageTimer(report, name)
+
+def add_count(name, amount=1):
+    report = getattr(_state, 'report', None)
+    if report is not None:
+        report.add_count(name, amount)
+
+@contextmanager
+def collect_report():
+    """Turn instrumentation on for this thread and yield the Report it fills."""
+    previous = getattr(_state, 'report', None)
+    report = _state.report = Report()
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield report
+    finally:
+        report.wall_seconds = time.perf_counter() - wall
+        report.cpu_seconds = time.thread_time() - cpu
+        _state.report = previous
@@ -0,0 +1,197 @@
+"""On-disk cache of processed judgments, keyed by the SHA-256 of the PDF bytes."""
+
+import hashlib
+import json
+import lzma
+import os
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Compression name -> (file suffix, compress, decompress)
+COMPRESSORS = {
+    None: ('.json', lambda data: data, lambda data: data),
+    'zlib': ('.json.z', lambda data: zlib.compress(data, 6), zlib.decompress),
+    'lzma': ('.json.xz', lzma.compress, lzma.decompress),
+}
+
+HASH_CHUNK_SIZE = 1024 * 1024
+# Temp files older than this are left over from a crashed writer
+STALE_TMP_SECONDS = 3600
+# Every process using a cache directory (e.g. batch.py -j N workers) keeps
+# the total size of its entries in SIZE_NAME, updated under a lock on LOCK_NAME
+SIZE_NAME = '.size'
+LOCK_NAME = '.lock'
+
+def sha256_of(source):
+    """Hex SHA-256 of raw bytes or of the file at a path (read in chunks)."""
+    digest = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+    else:
+        with open(source, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+class JudgmentCache:
+    """Content-addressed store of pipeline results with size-bounded LRU eviction.
+
+    Entries are JSON documents named ``<sha256>-<version><suffix>`` and spread
+    over two-character subdirectories. Recency is the file's mtime, refreshed
+    on every hit. Entries written under a different parser version are never
+    returned and are removed when the cache is opened. max_bytes bounds the
+    directory as a whole, however many processes write to it: the running
+    total is shared through a size file under a file lock (on Windows, the
+    directory is re-read instead).
+    """
+
+    def __init__(self, directory, version, max_bytes=DEFAULT_MAX_BYTES, compression='zlib'):
+        if compression not in COMPRESSORS:
+            raise ValueError(f"Unknown cache compression: {compression!r}")
+        self.directory = directory
+        self.version = str(version)
+        self.max_bytes = max_bytes
+        self.compression = compression
+        self.suffix, self._compress, self._decompress = COMPRESSORS[compression]
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        with self._shared():
+            self.total_bytes = self._sweep()
+            self._write_total(self.total_bytes)
+
+    @contextmanager
+    def _shared(self):
+        """Hold the cache's lock against other threads and, where possible, other processes."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.directory, LOCK_NAME), 'ab') as fh:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _read_total(self):
+        """The total entry size recorded by whichever process wrote last (call under _shared)."""
+        if fcntl is not None:
+            try:
+                with open(os.path.join(self.directory, SIZE_NAME), 'rb') as fh:
+                    return int(fh.read())
+            except (OSError, ValueError):
+                pass
+        return sum(stat.st_size for _, stat in self._entries())
+
+    def _write_total(self, total):
+        path = os.path.join(self.directory, SIZE_NAME)
+        with open(path + '.tmp', 'wb') as fh:
+            fh.write(str(total).encode('ascii'))
+        os.replace(path + '.tmp', path)
+
+    def _entries(self, include_tmp=False):
+        """Yield (path, stat) for every cache file on disk."""
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if root == self.directory and name in (SIZE_NAME, LOCK_NAME, SIZE_NAME + '.tmp'):
+                    continue
+                if name.endswith('.tmp') and not include_tmp:
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    yield path, os.stat(path)
+                except FileNotFoundError:
+                    continue
+
+    def _sweep(self):
+        """Drop entries from other parser versions and return the size of the rest."""
+        total = 0
+        marker = f"-{self.version}."
+        now = time.time()
+        for path, stat in list(self._entries(include_tmp=True)):
+            name = os.path.basename(path)
+            if name.endswith('.tmp'):
+                if now - stat.st_mtime > STALE_TMP_SECONDS:
+                    self._remove(path)
+            elif marker not in name:
+                self._remove(path)
+            else:
+                total += stat.st_size
+        return total
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def path_for(self, digest):
+        return os.path.join(self.directory, digest[:2], f"{digest}-{self.version}{self.suffix}")
+
+    def get(self, digest):
+        """Return the cached entry for a PDF digest, or None on a miss."""
+        path = self.path_for(digest)
+        try:
+            with open(path, 'rb') as fh:
+                data = fh.read()
+            entry = json.loads(self._decompress(data).decode('utf-8'))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, zlib.error, lzma.LZMAError):
+            # A torn or corrupt entry is just a miss
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return entry
+
+    def put(self, digest, entry):
+        """Store an entry atomically, then evict least recently used files if over budget."""
+        path = self.path_for(digest)
+        data = self._compress(json.dumps(entry, ensure_ascii=False).encode('utf-8'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(data)
+        with self._shared():
+            total = self._read_total()
+            try:
+                total -= os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, path)
+            total += len(data)
+            if total > self.max_bytes:
+                total = self._evict()
+            self._write_total(total)
+            self.total_bytes = total
+
+    def _evict(self):
+        """Remove oldest entries until the cache fits in max_bytes; returns the size left."""
+        entries = sorted(self._entries(), key=lambda item: item[1].st_mtime)
+        total = sum(stat.st_size for _, stat in entries)
+        for path, stat in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= stat.st_size
+        return total
+
+    def clear(self):
+        with self._shared():
+            for path, _ in list(self._entries()):
+                self._remove(path)
+            self._write_total(0)
+            self.total_bytes = 0
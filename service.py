@@ -0,0 +1,568 @@
+"""Local HTTP service: submit judgment PDFs, fetch the formatted results.
+
+    python service.py --port 8080 -j 4 --queue-size 100
+
+    curl -H 'Content-Type: application/pdf' --data-binary @judgment.pdf localhost:8080/jobs
+        202 {"job": "<id>", "status": "queued", ...}; 503 with Retry-After when the queue is full
+    curl localhost:8080/jobs/<id>                   the job's status as JSON
+    curl localhost:8080/jobs/<id>/result            the formatted HTML (?format=json for the parsed judgment)
+    curl -X DELETE localhost:8080/jobs/<id>         cancel the job, or drop its finished result
+    curl localhost:8080/health                      queue depth and capacity
+
+Built on asyncio alone. The event loop only parses requests and moves
+bytes: uploads are spooled to disk as they arrive, and every PDF is
+processed in a worker process with the same functions the Streamlit app
+and batch.py use (tool.process_judgment, tool.write_judgment_html). At
+most --queue-size jobs wait for a worker; past that, submissions are
+refused with 503 and a Retry-After estimate instead of piling up.
+Uploads and results live in a SessionStore and expire with it.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import re
+import signal
+import sys
+import tempfile
+import time
+import traceback
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import tool
+from budgets import Budget
+from cancellation import Cancelled, CancellationToken
+from session_store import DEFAULT_TTL_SECONDS, SessionStore
+
+# Uploads and results; kept apart from the app's session artifacts
+SERVICE_DIR = os.environ.get(
+    "LEGAL_PARSER_SERVICE_DIR",
+    os.path.join(tempfile.gettempdir(), "legal-parser-jobs")
+)
+DEFAULT_QUEUE_SIZE = 100
+DEFAULT_MAX_UPLOAD_MB = 100
+# Artifacts kept per job in the store, next to tool.SESSION_HTML and tool.SESSION_JUDGMENT
+UPLOAD_NAME = 'upload.pdf'
+# Request line and headers larger than this are refused
+MAX_HEADER_BYTES = 64 * 1024
+# A client that sends nothing for this long is disconnected
+REQUEST_TIMEOUT_SECONDS = 60
+UPLOAD_CHUNK_BYTES = 256 * 1024
+# A worker process dying takes the PDFs in flight with it; each is tried this often
+MAX_ATTEMPTS = 2
+# Retry-After is estimated from recent job durations, starting from this guess
+INITIAL_JOB_SECONDS = 2.0
+MAX_RETRY_AFTER_SECONDS = 300
+JOB_PATH_RE = re.compile(r'^/jobs/([0-9a-f]{32})(/result)?$')
+
+# Per-process state for pool workers
+_worker_cache = None
+_worker_revisions = None
+_worker_store = None
+_worker_options = None
+_worker_cancel_events = None
+
+def _init_service_worker(options, cancel_events):
+    """Pool initializer: open the caches and the job store once per process.
+
+    Ctrl-C is left to the parent, which cancels the jobs in hand through their slot's event.
+    """
+    global _worker_cache, _worker_revisions, _worker_store, _worker_options, _worker_cancel_events
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_options = options
+    _worker_cancel_events = cancel_events
+    _worker_store = SessionStore(options['store_dir'], ttl_seconds=options['ttl_seconds'])
+    _worker_cache = tool.open_result_cache(options['cache_dir']) if options['cache_dir'] else None
+    _worker_revisions = tool.open_revision_cache(options['revision_dir']) if options['revision_dir'] else None
+
+def run_job(job_id, slot):
+    """Process one uploaded PDF inside a worker; never raises, the outcome is returned as a record.
+
+    The HTML is streamed into the store and the judgment written next to it
+    as JSON. `slot` names the cancel event the parent sets to stop this job.
+    """
+    options = _worker_options
+    store = _worker_store
+    cancellation = CancellationToken(_worker_cancel_events[slot])
+    record = {'status': 'done', 'pages': 0, 'digest': None, 'revision': None, 'degradations': [], 'error': None}
+    started = time.perf_counter()
+    try:
+        result = tool.process_judgment(store.path_for(job_id, UPLOAD_NAME), cache=_worker_cache, render=False,
+                                       revisions=_worker_revisions, budget=options['budget'],
+                                       cancellation=cancellation)
+        judgment = result['judgment']
+        revision = result['revision']
+        budget = result['budget']
+        record['digest'] = result['digest']
+        record['pages'] = result.get('page_count', 0)
+        if not result['text'].strip():
+            raise ValueError("no extractable text")
+        with store.writer(job_id, tool.SESSION_HTML) as fh:
+            tool.write_judgment_html(judgment, fh, None, options['minify'], revision, budget, cancellation)
+        if budget is not None and budget.degraded:
+            record['degradations'] = budget.summary()
+        elif revision is not None:
+            revision.save()
+            record['revision'] = revision.summary
+        document = dict(judgment.to_dict(), digest=result['digest'], parser_version=tool.PARSER_VERSION,
+                        revision=record['revision'], degradations=record['degradations'])
+        store.put(job_id, tool.SESSION_JUDGMENT, json.dumps(document, ensure_ascii=False))
+    except Cancelled:
+        record['status'] = 'cancelled'
+    except Exception as exc:
+        record['status'] = 'failed'
+        record['error'] = f"{type(exc).__name__}: {exc}"
+        record['traceback'] = traceback.format_exc()
+    record['seconds'] = time.perf_counter() - started
+    return record
+
+class Job:
+    """One submitted PDF: where it is in the queue and, once finished, what its worker reported."""
+
+    def __init__(self, job_id, name):
+        self.id = job_id
+        self.name = name
+        self.status = 'queued'
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.attempts = 0
+        self.slot = None
+        self.cancel_requested = False
+        self.record = {}
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed', 'cancelled')
+
+    def to_dict(self):
+        data = {
+            'job': self.id,
+            'name': self.name,
+            'status': self.status,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'status_url': f"/jobs/{self.id}",
+            'result_url': f"/jobs/{self.id}/result",
+        }
+        for key in ('pages', 'seconds', 'digest', 'revision', 'degradations', 'error'):
+            if key in self.record:
+                data[key] = self.record[key]
+        return data
+
+class JobService:
+    """The job table, the bounded queue in front of the process pool, and the tasks feeding the pool.
+
+    Everything here runs on the event loop thread; only run_job runs in the pool.
+    """
+
+    def __init__(self, options, workers, queue_size):
+        self.options = options
+        self.workers = workers
+        self.queue_size = queue_size
+        self.store = SessionStore(options['store_dir'], ttl_seconds=options['ttl_seconds'])
+        self.jobs = {}
+        # (finished_at, job id) in finishing order, so expired jobs are forgotten oldest first
+        self.finished = deque()
+        self.queue = asyncio.Queue()
+        # Submissions admitted but still uploading; they count against queue_size
+        self.reserved = 0
+        self.running = 0
+        self.job_seconds = INITIAL_JOB_SECONDS
+        # One cancel event per dispatcher: a worker only ever runs one dispatcher's job at a time
+        self.cancel_events = [multiprocessing.Event() for _ in range(workers)]
+        self.pool = self._new_pool()
+        self.dispatchers = []
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_service_worker,
+                                   initargs=(self.options, self.cancel_events))
+
+    def start(self):
+        self.dispatchers = [asyncio.create_task(self._dispatch(slot)) for slot in range(self.workers)]
+
+    async def close(self):
+        """Stop taking jobs off the queue and cancel those in hand."""
+        for event in self.cancel_events:
+            event.set()
+        for task in self.dispatchers:
+            task.cancel()
+        await asyncio.gather(*self.dispatchers, return_exceptions=True)
+        await asyncio.to_thread(self.pool.shutdown, wait=True, cancel_futures=True)
+
+    def depth(self):
+        return self.queue.qsize() + self.reserved
+
+    def admit(self):
+        """Reserve a queue place for a submission about to upload; False when the service is full."""
+        if self.depth() >= self.queue_size:
+            return False
+        self.reserved += 1
+        return True
+
+    def release(self):
+        self.reserved -= 1
+
+    def retry_after(self):
+        """Seconds until the next job is likely to finish, from recent job durations."""
+        return min(MAX_RETRY_AFTER_SECONDS, max(1, math.ceil(self.job_seconds / self.workers)))
+
+    def new_job(self, name):
+        self._forget_expired()
+        return Job(uuid.uuid4().hex, name)
+
+    def enqueue(self, job):
+        """Queue an uploaded job; its place was reserved by admit()."""
+        self.release()
+        self.jobs[job.id] = job
+        self.queue.put_nowait(job)
+
+    def cancel(self, job):
+        """Cancel a queued or running job, or forget a finished one.
+
+        Returns True when the job's files can be discarded now; a running
+        job stops at its next checkpoint and is then reported 'cancelled'.
+        """
+        if job.status == 'running':
+            job.cancel_requested = True
+            self.cancel_events[job.slot].set()
+            return False
+        if job.status == 'queued':
+            self._finish(job, 'cancelled')
+        else:
+            del self.jobs[job.id]
+        return True
+
+    def _finish(self, job, status, record=None):
+        job.status = status
+        job.finished_at = time.time()
+        if record is not None:
+            job.record = record
+        self.finished.append((job.finished_at, job.id))
+
+    def _forget_expired(self):
+        """Drop jobs that finished longer ago than the store keeps their results."""
+        horizon = time.time() - self.store.ttl_seconds
+        while self.finished and self.finished[0][0] < horizon:
+            _, job_id = self.finished.popleft()
+            self.jobs.pop(job_id, None)
+
+    async def _dispatch(self, slot):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            if job.status != 'queued':
+                continue
+            job.status = 'running'
+            job.slot = slot
+            job.started_at = time.time()
+            self.running += 1
+            try:
+                record = await self._run(loop, job, slot)
+            finally:
+                self.running -= 1
+            self.job_seconds += (record['seconds'] - self.job_seconds) / 5
+            if record.pop('traceback', None):
+                print(f"FAILED {job.id} ({job.name}): {record['error']}", file=sys.stderr)
+            self._finish(job, record['status'], record)
+            # The upload is no longer needed; results stay until the store expires them
+            await asyncio.to_thread(_remove, self.store.path_for(job.id, UPLOAD_NAME))
+
+    async def _run(self, loop, job, slot):
+        """run_job in the pool, restarting the pool if a worker process dies."""
+        while True:
+            if job.cancel_requested:
+                return {'status': 'cancelled', 'pages': 0, 'seconds': 0.0}
+            self.cancel_events[slot].clear()
+            pool = self.pool
+            job.attempts += 1
+            try:
+                return await loop.run_in_executor(pool, run_job, job.id, slot)
+            except BrokenProcessPool:
+                # Every job in flight sees the crash; the first to get here replaces the pool
+                if self.pool is pool:
+                    self.pool = self._new_pool()
+                    pool.shutdown(wait=False)
+                if job.attempts >= MAX_ATTEMPTS:
+                    return {'status': 'failed', 'pages': 0, 'seconds': 0.0,
+                            'error': "worker process died while processing this PDF"}
+
+    def health(self):
+        return {
+            'queued': self.queue.qsize(),
+            'uploading': self.reserved,
+            'running': self.running,
+            'queue_size': self.queue_size,
+            'workers': self.workers,
+            'jobs': len(self.jobs),
+            'parser_version': tool.PARSER_VERSION,
+        }
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+# =====================
+#  HTTP
+# =====================
+
+class HTTPError(Exception):
+    """Answer the request with this status and a JSON error body."""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+async def read_request(reader):
+    """(method, path, query, headers) of the next request; headers are keyed in lower case."""
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), REQUEST_TIMEOUT_SECONDS)
+    except asyncio.LimitOverrunError:
+        raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "request headers too large")
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, _ = lines[0].split(' ', 2)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        if name:
+            headers[name.strip().lower()] = value.strip()
+    url = urlsplit(target)
+    return method.upper(), url.path, parse_qs(url.query), headers
+
+def response_head(status, headers):
+    status = HTTPStatus(status)
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    lines += ["Connection: close", "", ""]
+    return '\r\n'.join(lines).encode('latin-1')
+
+async def send_json(writer, status, payload, headers=None):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    head = dict(headers or {}, **{'Content-Type': 'application/json; charset=utf-8',
+                                  'Content-Length': len(body)})
+    writer.write(response_head(status, head) + body)
+    await writer.drain()
+
+async def send_file(writer, path, content_type):
+    """Send a stored artifact; HTTPError 410 if the store has expired it."""
+    try:
+        fh = open(path, 'rb')
+    except FileNotFoundError:
+        raise HTTPError(HTTPStatus.GONE, "the result has expired")
+    with fh:
+        size = os.fstat(fh.fileno()).st_size
+        writer.write(response_head(HTTPStatus.OK, {'Content-Type': content_type, 'Content-Length': size}))
+        await writer.drain()
+        await asyncio.get_running_loop().sendfile(writer.transport, fh)
+
+def wants_json(query, headers):
+    """?format=json, or an Accept header asking for JSON rather than HTML."""
+    requested = query.get('format', [None])[0]
+    if requested is not None:
+        return requested == 'json'
+    accept = headers.get('accept', '')
+    return 'application/json' in accept and 'text/html' not in accept
+
+async def read_upload(reader, writer, headers, path, max_bytes):
+    """Spool the request body to path as it arrives, checking it is a PDF."""
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        raise HTTPError(HTTPStatus.LENGTH_REQUIRED, "send the PDF with a Content-Length")
+    try:
+        remaining = int(headers['content-length'])
+    except (KeyError, ValueError):
+        raise HTTPError(HTTPStatus.LENGTH_REQUIRED, "send the PDF with a Content-Length")
+    if remaining > max_bytes:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"uploads are limited to {max_bytes // 2**20} MB")
+    if headers.get('expect', '').lower() == '100-continue':
+        writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as fh:
+        first = True
+        while remaining:
+            chunk = await asyncio.wait_for(reader.read(min(remaining, UPLOAD_CHUNK_BYTES)), REQUEST_TIMEOUT_SECONDS)
+            if not chunk:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "upload ended early")
+            if first and not chunk.startswith(b'%PDF-'[:len(chunk)]):
+                raise HTTPError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, "the upload is not a PDF")
+            first = False
+            fh.write(chunk)
+            remaining -= len(chunk)
+    if first:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "empty upload")
+
+async def discard_body(reader, headers, max_bytes):
+    """Read and drop a refused upload, so the client sees the response instead of a reset connection."""
+    if headers.get('expect', '').lower() == '100-continue':
+        return
+    try:
+        remaining = min(int(headers.get('content-length', 0)), max_bytes)
+    except ValueError:
+        return
+    while remaining > 0:
+        chunk = await asyncio.wait_for(reader.read(min(remaining, UPLOAD_CHUNK_BYTES)), REQUEST_TIMEOUT_SECONDS)
+        if not chunk:
+            return
+        remaining -= len(chunk)
+
+async def submit(service, reader, writer, query, headers):
+    if not service.admit():
+        await discard_body(reader, headers, service.options['max_upload_bytes'])
+        retry_after = service.retry_after()
+        raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, f"queue is full; retry in {retry_after}s",
+                        {'Retry-After': retry_after})
+    job = service.new_job(query.get('name', ['judgment.pdf'])[0])
+    path = service.store.path_for(job.id, UPLOAD_NAME)
+    try:
+        await read_upload(reader, writer, headers, path, service.options['max_upload_bytes'])
+    except BaseException:
+        service.release()
+        await asyncio.to_thread(service.store.discard, job.id)
+        raise
+    service.enqueue(job)
+    await send_json(writer, HTTPStatus.ACCEPTED, job.to_dict(), {'Location': f"/jobs/{job.id}"})
+
+async def send_result(service, writer, job, query, headers):
+    if not job.finished:
+        await send_json(writer, HTTPStatus.ACCEPTED, job.to_dict(), {'Retry-After': service.retry_after()})
+    elif job.status != 'done':
+        await send_json(writer, HTTPStatus.CONFLICT, job.to_dict())
+    elif wants_json(query, headers):
+        await send_file(writer, service.store.path_for(job.id, tool.SESSION_JUDGMENT),
+                        'application/json; charset=utf-8')
+    else:
+        await send_file(writer, service.store.path_for(job.id, tool.SESSION_HTML), 'text/html; charset=utf-8')
+
+async def route(service, reader, writer):
+    method, path, query, headers = await read_request(reader)
+    if path == '/jobs':
+        if method != 'POST':
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "POST a PDF to /jobs", {'Allow': 'POST'})
+        return await submit(service, reader, writer, query, headers)
+    if path == '/health':
+        return await send_json(writer, HTTPStatus.OK, service.health())
+    match = JOB_PATH_RE.match(path)
+    job = service.jobs.get(match.group(1)) if match else None
+    if job is None:
+        raise HTTPError(HTTPStatus.NOT_FOUND, "no such job")
+    if match.group(2):
+        if method != 'GET':
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "GET the result", {'Allow': 'GET'})
+        return await send_result(service, writer, job, query, headers)
+    if method == 'GET':
+        return await send_json(writer, HTTPStatus.OK, job.to_dict())
+    if method == 'DELETE':
+        if service.cancel(job):
+            await asyncio.to_thread(service.store.discard, job.id)
+        return await send_json(writer, HTTPStatus.OK, job.to_dict())
+    raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "GET or DELETE a job", {'Allow': 'GET, DELETE'})
+
+async def handle_connection(service, reader, writer):
+    """One request per connection; every failure is answered with a JSON error."""
+    try:
+        await route(service, reader, writer)
+    except HTTPError as exc:
+        await _send_error(writer, exc.status, str(exc), exc.headers)
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+        pass
+    except Exception as exc:
+        traceback.print_exc()
+        await _send_error(writer, HTTPStatus.INTERNAL_SERVER_ERROR, f"{type(exc).__name__}: {exc}")
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+async def _send_error(writer, status, message, headers=None):
+    try:
+        await send_json(writer, status, {'error': message}, headers)
+    except ConnectionError:
+        pass
+
+async def serve(options, host, port, workers, queue_size, ready=None):
+    """Run the service until SIGINT or SIGTERM; `ready` is called with the bound (host, port)."""
+    service = JobService(options, workers, queue_size)
+    service.start()
+    server = await asyncio.start_server(lambda reader, writer: handle_connection(service, reader, writer),
+                                        host, port, limit=MAX_HEADER_BYTES, backlog=1024)
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stopping.set)
+        except (NotImplementedError, RuntimeError):  # Windows, or not the main thread
+            pass
+    address = server.sockets[0].getsockname()[:2]
+    if ready is not None:
+        ready(address)
+    try:
+        await stopping.wait()
+    finally:
+        server.close()
+        await server.wait_closed()
+        await service.close()
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Serve the judgment formatter over HTTP on this machine.")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on")
+    parser.add_argument('--port', type=int, default=8080, help="port to listen on (0 picks a free one)")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="jobs that may wait for a worker before submissions are refused with 503")
+    parser.add_argument('--max-upload-mb', type=int, default=DEFAULT_MAX_UPLOAD_MB, help="largest PDF accepted")
+    parser.add_argument('--store-dir', default=SERVICE_DIR, help="where uploads and results are kept")
+    parser.add_argument('--ttl-hours', type=float, default=DEFAULT_TTL_SECONDS / 3600,
+                        help="how long results are kept after their last use")
+    parser.add_argument('--minify', action='store_true', help="minify the HTML")
+    parser.add_argument('--cache-dir', default=tool.CACHE_DIR, help="result cache directory")
+    parser.add_argument('--no-cache', action='store_true', help="do not read or write the result cache")
+    parser.add_argument('--revision-dir', default=tool.REVISION_DIR,
+                        help="section HTML of earlier versions, reused for corrected judgments")
+    parser.add_argument('--no-revisions', action='store_true',
+                        help="always format every paragraph, recording no versions")
+    parser.add_argument('--max-pages', type=int, default=tool.APP_MAX_PAGES,
+                        help="process only the first N pages of longer PDFs")
+    parser.add_argument('--stage-seconds', type=float, default=tool.APP_STAGE_SECONDS,
+                        help="time allowed to extraction, parsing and rendering of one PDF; past it, "
+                             "formatting is simplified step by step")
+    parser.add_argument('--max-memory-mb', type=int, default=tool.APP_MAX_MEMORY_MB,
+                        help="memory a worker may grow by per PDF before formatting is simplified")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    options = {
+        'store_dir': args.store_dir,
+        'ttl_seconds': args.ttl_hours * 3600,
+        'cache_dir': None if args.no_cache else args.cache_dir,
+        'revision_dir': None if args.no_revisions else args.revision_dir,
+        'minify': args.minify,
+        'max_upload_bytes': args.max_upload_mb * 2**20,
+        'budget': Budget(args.max_pages, args.stage_seconds, args.max_memory_mb * 2**20),
+    }
+    workers = max(1, args.jobs)
+
+    def ready(address):
+        print(f"listening on http://{address[0]}:{address[1]} ({workers} workers, queue of {args.queue_size})",
+              flush=True)
+    asyncio.run(serve(options, args.host, args.port, workers, max(1, args.queue_size), ready))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""Local disk store for the heavy per-session artifacts of the Streamlit app.
+
+Session state keeps only a handle; the rendered HTML, the extracted text and
+the parsed model live here as files named ``<handle>/<artifact>``.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_TTL_SECONDS = 6 * 3600
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+# Expiry and size checks on reads are throttled to at most one walk per interval
+SWEEP_INTERVAL_SECONDS = 60
+
+class SessionStore:
+    """Artifacts grouped by handle, expired after ttl_seconds without access.
+
+    Every read refreshes the artifact's mtime. When the store grows past
+    max_bytes the least recently used handles are removed first, whole
+    handles at a time, so a session never sees half of its artifacts.
+    """
+
+    def __init__(self, directory, ttl_seconds=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        os.makedirs(directory, exist_ok=True)
+        self.sweep()
+
+    def _handle_dir(self, handle):
+        if not handle or os.sep in handle or handle.startswith('.'):
+            raise ValueError(f"Invalid session handle: {handle!r}")
+        return os.path.join(self.directory, handle)
+
+    def path_for(self, handle, name):
+        return os.path.join(self._handle_dir(handle), name)
+
+    def put(self, handle, name, data):
+        """Store one artifact (str or bytes) atomically."""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        with self.writer(handle, name) as fh:
+            fh.write(data)
+
+    @contextmanager
+    def writer(self, handle, name):
+        """Write one artifact through a binary file; it appears atomically when the block completes.
+
+        If the block raises, nothing is stored and the partial file is removed.
+        """
+        directory = self._handle_dir(handle)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                yield fh
+            os.replace(tmp_path, os.path.join(directory, name))
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        self.sweep(force=True)
+
+    def contains(self, handle, *names):
+        return all(os.path.exists(self.path_for(handle, name)) for name in names)
+
+    def open(self, handle, name):
+        """Open an artifact for binary reading (e.g. to stream it), or None if it has expired."""
+        path = self.path_for(handle, name)
+        try:
+            fh = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        self._touch(path)
+        return fh
+
+    def read_text(self, handle, name, limit=-1):
+        """Read an artifact as text (at most `limit` characters), or None if it has expired."""
+        fh = self.open(handle, name)
+        if fh is None:
+            return None
+        with fh:
+            if limit < 0:
+                return fh.read().decode('utf-8')
+            # UTF-8 needs at most 4 bytes per character
+            return fh.read(limit * 4).decode('utf-8', errors='ignore')[:limit]
+
+    def size(self, handle, name):
+        try:
+            return os.path.getsize(self.path_for(handle, name))
+        except FileNotFoundError:
+            return 0
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        self.sweep()
+
+    def discard(self, handle):
+        shutil.rmtree(self._handle_dir(handle), ignore_errors=True)
+
+    def _handles(self):
+        """Return [(last_used, bytes, handle)] for every handle directory."""
+        handles = []
+        for handle in os.listdir(self.directory):
+            directory = os.path.join(self.directory, handle)
+            last_used, total = 0.0, 0
+            try:
+                for name in os.listdir(directory):
+                    stat = os.stat(os.path.join(directory, name))
+                    last_used = max(last_used, stat.st_mtime)
+                    total += stat.st_size
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            handles.append((last_used, total, handle))
+        return handles
+
+    def sweep(self, force=False):
+        """Drop expired handles, then the least recently used ones until under max_bytes."""
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_sweep < SWEEP_INTERVAL_SECONDS:
+                return
+            self._last_sweep = now
+            handles = sorted(self._handles())
+            total = sum(size for _, size, _ in handles)
+            for last_used, size, handle in handles:
+                if now - last_used <= self.ttl_seconds and total <= self.max_bytes:
+                    break
+                self.discard(handle)
+                total -= size
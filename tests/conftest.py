@@ -0,0 +1,23 @@
+"""Make the repository's modules and the benchmark helpers importable from the tests."""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'benchmarks')]
+
+import synthetic
+
+@pytest.fixture(scope='session')
+def synthetic_judgment(tmp_path_factory):
+    """synthetic_judgment(pages) is the path of a synthetic judgment PDF, written once per page count."""
+    paths = {}
+
+    def judgment(pages):
+        if pages not in paths:
+            path = tmp_path_factory.mktemp('synthetic') / f'judgment-{pages}p.pdf'
+            paths[pages] = synthetic.write_judgment_pdf(str(path), pages)
+        return paths[pages]
+    return judgment
@@ -0,0 +1,42 @@
+"""batch.py end to end: a rerun redoes what an earlier run under other limits cut short."""
+
+import os
+import shutil
+
+import batch
+import tool
+from batch_manifest import MANIFEST_NAME, BatchManifest
+
+def run(pdf, output, *args):
+    return batch.main([pdf, '-o', output, '-j', '1', '-q', '--no-cache', '--no-index', '--no-revisions', *args])
+
+def manifest_entry(output, pdf):
+    with BatchManifest(os.path.join(output, MANIFEST_NAME), tool.PARSER_VERSION) as manifest:
+        return manifest.entries[pdf]
+
+def test_run_without_limits_redoes_a_page_limited_one(synthetic_judgment, tmp_path, capsys):
+    pdf = shutil.copy(synthetic_judgment(40), tmp_path / 'judgment.pdf')
+    output = str(tmp_path / 'out')
+    html = os.path.join(output, 'judgment.html')
+    assert run(str(pdf), output, '--max-pages', '5') == 0
+    with open(html, encoding='utf-8') as fh:
+        assert "Only the first 5 of 40 pages" in fh.read()
+    assert run(str(pdf), output) == 0
+    with open(html, encoding='utf-8') as fh:
+        assert "Only the first" not in fh.read()
+    assert "skipped" not in capsys.readouterr().out
+    assert run(str(pdf), output) == 0
+    assert "skipped 1 already done" in capsys.readouterr().out
+
+def test_output_simplified_under_time_pressure_is_retried(synthetic_judgment, tmp_path, capsys):
+    pdf = str(shutil.copy(synthetic_judgment(40), tmp_path / 'judgment.pdf'))
+    output = str(tmp_path / 'out')
+    # With no time at all every stage steps down as far as it can
+    limits = ('--stage-seconds', '0', '--max-attempts', '2')
+    assert run(pdf, output, *limits) == 0
+    assert manifest_entry(output, pdf)['status'] == 'degraded'
+    assert run(pdf, output, *limits) == 0
+    assert "skipped" not in capsys.readouterr().out
+    assert manifest_entry(output, pdf)['attempts'] == 2
+    assert run(pdf, output, *limits) == 0
+    assert "skipped 1 already done" in capsys.readouterr().out
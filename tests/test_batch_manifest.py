@@ -0,0 +1,105 @@
+"""Resume, skip and retry decisions of the batch manifest."""
+
+import os
+
+import pytest
+
+from batch_manifest import BatchManifest, file_signature
+
+MODE = 'html+json'
+
+@pytest.fixture
+def run(tmp_path):
+    """run(status=..., ...) records one finished input and reopens the manifest as the next run would."""
+    pdf = tmp_path / 'judgment.pdf'
+    pdf.write_bytes(b'%PDF-1.7 judgment')
+    output = tmp_path / 'out' / 'judgment.html'
+    output.parent.mkdir()
+    output.write_text('<html></html>')
+    path = str(tmp_path / 'manifest.sqlite3')
+
+    def record(status='ok', version='5', mode=MODE, output_path=str(output), max_attempts=3):
+        with BatchManifest(path, version, mode=mode, max_attempts=max_attempts) as manifest:
+            size, mtime_ns = file_signature(str(pdf))
+            manifest.record({'input': str(pdf), 'size': size, 'mtime_ns': mtime_ns, 'status': status,
+                             'output': output_path, 'error': None if status != 'error' else "ValueError"})
+        return BatchManifest(path, version, mode=mode, max_attempts=max_attempts)
+
+    record.open = lambda version='5', mode=MODE: BatchManifest(path, version, mode=mode)
+    record.pdf = str(pdf)
+    record.output = str(output)
+    return record
+
+def test_a_finished_input_is_skipped(run):
+    with run() as manifest:
+        assert manifest.skip_reason(run.pdf, run.output) == 'done'
+
+def test_an_input_that_was_never_recorded_is_processed(run, tmp_path):
+    with run() as manifest:
+        assert manifest.skip_reason(str(tmp_path / 'other.pdf'), run.output) is None
+
+@pytest.mark.parametrize('change', ['size', 'mtime'])
+def test_a_changed_input_is_processed_again(run, change):
+    with run() as manifest:
+        if change == 'size':
+            with open(run.pdf, 'ab') as fh:
+                fh.write(b' corrected')
+        else:
+            stat = os.stat(run.pdf)
+            os.utime(run.pdf, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert manifest.skip_reason(run.pdf, run.output) is None
+
+def test_a_new_parser_version_processes_everything_again(run):
+    run(version='5').close()
+    with run.open(version='6') as manifest:
+        assert manifest.skip_reason(run.pdf, run.output) is None
+
+def test_a_missing_output_is_written_again(run):
+    with run() as manifest:
+        os.remove(run.output)
+        assert manifest.skip_reason(run.pdf, run.output) is None
+
+def test_another_output_path_is_written(run, tmp_path):
+    with run() as manifest:
+        assert manifest.skip_reason(run.pdf, str(tmp_path / 'elsewhere' / 'judgment.html')) is None
+
+@pytest.mark.parametrize('mode', ['metadata', 'html', 'html+json+max_pages=5'])
+def test_another_mode_processes_the_input_again(run, mode):
+    run(mode=MODE).close()
+    with run.open(mode=mode) as manifest:
+        assert manifest.skip_reason(run.pdf, run.output) is None
+
+def test_a_failed_input_is_retried_until_it_runs_out_of_attempts(run):
+    for attempt in range(1, 3):
+        with run(status='error') as manifest:
+            assert manifest.entries[run.pdf]['attempts'] == attempt
+            assert manifest.skip_reason(run.pdf, run.output) is None
+    with run(status='error') as manifest:
+        assert manifest.skip_reason(run.pdf, run.output) == 'failed'
+    # A later success is final
+    with run(status='ok') as manifest:
+        assert manifest.skip_reason(run.pdf, run.output) == 'done'
+
+def test_attempts_restart_in_a_new_mode(run):
+    run(status='error').close()
+    run(status='error').close()
+    with run(status='error', mode='html') as manifest:
+        assert manifest.entries[run.pdf]['attempts'] == 1
+
+def test_degraded_output_is_redone_until_it_runs_out_of_attempts(run):
+    with run(status='degraded') as manifest:
+        assert manifest.skip_reason(run.pdf, run.output) is None
+    run(status='degraded').close()
+    with run(status='degraded') as manifest:
+        assert manifest.skip_reason(run.pdf, run.output) == 'done'
+
+def test_records_are_buffered_until_flushed(tmp_path):
+    path = str(tmp_path / 'manifest.sqlite3')
+    manifest = BatchManifest(path, '5', mode=MODE, flush_records=2, flush_seconds=3600)
+    manifest.record({'input': 'a.pdf', 'status': 'ok'})
+    with BatchManifest(path, '5') as reader:
+        assert reader.entries == {}
+    manifest.record({'input': 'b.pdf', 'status': 'ok'})
+    with BatchManifest(path, '5') as reader:
+        assert set(reader.entries) == {'a.pdf', 'b.pdf'}
+    manifest.close()
@@ -0,0 +1,38 @@
+"""Page limits and degraded results must never be served to a request with other limits."""
+
+import tool
+from budgets import Budget
+from judgment_cache import JudgmentCache
+from session_store import SessionStore
+
+TRUNCATED = "Only the first"
+
+def test_budget_key_names_the_limits():
+    assert Budget().key == ""
+    assert Budget(max_pages=5).key == "max_pages=5"
+    assert Budget(5, 30, 2**20).key == "max_pages=5,stage_seconds=30,max_memory=1048576"
+
+def test_truncated_session_result_is_not_served_to_an_unlimited_session(synthetic_judgment, tmp_path):
+    pdf = synthetic_judgment(40)
+    processor = tool.SharedProcessor(cache=JudgmentCache(str(tmp_path / 'cache'), tool.PARSER_VERSION))
+    store = SessionStore(str(tmp_path / 'sessions'))
+
+    limited = processor.process(pdf, budget=Budget(max_pages=5))
+    limited_handle = tool.store_session_result(store, limited)
+    full = processor.process(pdf)
+    full_handle = tool.store_session_result(store, full)
+
+    assert limited['degradations'] and not full['degradations']
+    assert full_handle != limited_handle
+    assert TRUNCATED in store.read_text(limited_handle, tool.SESSION_HTML)
+    assert TRUNCATED not in store.read_text(full_handle, tool.SESSION_HTML)
+    assert store.read_text(full_handle, tool.SESSION_HTML) == full['html']
+
+def test_degraded_results_get_handles_of_their_own(synthetic_judgment, tmp_path):
+    pdf = synthetic_judgment(40)
+    store = SessionStore(str(tmp_path / 'sessions'))
+    first = tool.process_judgment(pdf, budget=Budget(max_pages=5))
+    second = tool.process_judgment(pdf, budget=Budget(max_pages=5))
+    assert tool.store_session_result(store, first) != tool.store_session_result(store, second)
+    unlimited = tool.process_judgment(pdf)
+    assert tool.store_session_result(store, unlimited) == tool.store_session_result(store, dict(unlimited))
@@ -0,0 +1,87 @@
+"""A cancelled token stops extraction, parsing and rendering, and leaves no partial artifacts behind."""
+
+import os
+
+import pytest
+
+import batch
+import cancellation
+import tool
+from cancellation import Cancelled, CancellationToken, cancellable
+from judgment_cache import JudgmentCache, sha256_of
+from session_store import SessionStore
+
+@pytest.fixture
+def cancel_after(monkeypatch):
+    """cancel_after(n) is a token that cancels itself at the n-th pipeline checkpoint."""
+    monkeypatch.setattr(cancellation, 'POLL_SECONDS', 0)
+
+    def token_for(checkpoints):
+        token = CancellationToken(poll=lambda: count())
+        seen = [0]
+
+        def count():
+            seen[0] += 1
+            if seen[0] >= checkpoints:
+                token.cancel("test")
+        return token
+    return token_for
+
+def extract_until_cancelled(pdf, token, workers=1):
+    pages = []
+    with pytest.raises(Cancelled):
+        with cancellable(token):
+            for page in tool.iter_pdf_pages(pdf, workers):
+                pages.append(page)
+    return pages
+
+def test_a_cancelled_token_stops_work_before_it_starts(synthetic_judgment):
+    token = CancellationToken()
+    token.cancel()
+    with pytest.raises(Cancelled):
+        tool.process_judgment(synthetic_judgment(5), cancellation=token)
+
+def test_cancelling_stops_extraction_at_the_next_page(synthetic_judgment, cancel_after):
+    pages = extract_until_cancelled(synthetic_judgment(40), cancel_after(5))
+    assert 0 < len(pages) < 10
+
+def test_cancelling_stops_parallel_extraction(synthetic_judgment, cancel_after):
+    pages = extract_until_cancelled(synthetic_judgment(2 * tool.PARALLEL_MIN_PAGES), cancel_after(3), workers=2)
+    assert len(pages) < 2 * tool.PARALLEL_MIN_PAGES
+
+def test_cancelling_stops_parsing_at_the_next_paragraph(synthetic_judgment, cancel_after):
+    text, page_starts = tool.join_pages(list(tool.iter_pdf_pages(synthetic_judgment(40))))
+    table = tool.tokenize_judgment(text, page_starts)
+    with pytest.raises(Cancelled):
+        tool.parse_judgment_content_enhanced(table, cancel_after(10))
+    # The same table parses in full without a token
+    assert len(tool.parse_judgment_content_enhanced(table)) > 10
+
+def test_a_cancelled_run_caches_and_records_nothing(synthetic_judgment, cancel_after, tmp_path):
+    pdf = synthetic_judgment(40)
+    cache = JudgmentCache(str(tmp_path / 'cache'), tool.PARSER_VERSION)
+    revisions = JudgmentCache(str(tmp_path / 'revisions'), tool.PARSER_VERSION)
+    steps = []
+    with pytest.raises(Cancelled):
+        tool.process_judgment(pdf, cache=cache, revisions=revisions, cancellation=cancel_after(60),
+                              progress=lambda message, percent: steps.append(percent))
+    # Cancelled past extraction, while parsing
+    assert steps[-1] == 65
+    assert cache.get(sha256_of(pdf)) is None
+    metadata = tool.process_judgment(pdf, render=False)['judgment'].metadata
+    assert revisions.get(tool.revision_key(metadata)) is None
+
+def test_cancelled_rendering_leaves_no_partial_files(synthetic_judgment, cancel_after, tmp_path):
+    judgment = tool.process_judgment(synthetic_judgment(40), render=False)['judgment']
+    store = SessionStore(str(tmp_path / 'sessions'))
+    with pytest.raises(Cancelled):
+        with store.writer('handle', tool.SESSION_HTML) as fh:
+            tool.write_judgment_html(judgment, fh, cancellation=cancel_after(20))
+    assert not store.contains('handle', tool.SESSION_HTML)
+    assert os.listdir(os.path.join(store.directory, 'handle')) == []
+
+    output = tmp_path / 'out' / 'judgment.html'
+    with pytest.raises(Cancelled):
+        batch._write_file(str(output), lambda fh: tool.write_judgment_html(judgment, fh, cancellation=cancel_after(20)),
+                          gzip_copy=True)
+    assert os.listdir(output.parent) == []
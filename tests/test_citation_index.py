@@ -0,0 +1,74 @@
+"""Citation normalization and the cited_by / citations_in queries of the citation index."""
+
+import pytest
+
+import tool
+from citation_index import CitationIndex, citation_key, iter_citations, parse_citation
+
+@pytest.mark.parametrize('text, key', [
+    ("(2017) 10 SCC 1", "(2017) 10 SCC 1"),
+    ("[2017] 10 SCC 1", "(2017) 10 SCC 1"),
+    ("2017 10 SCC 1", "(2017) 10 SCC 1"),
+    ("(2017) (10) SCC 1", "(2017) 10 SCC 1"),
+    ("1991 Supp (1) SCC 600", "(1991) Supp (1) SCC 600"),
+    ("(1991) Supp. (1) SCC 600", "(1991) Supp (1) SCC 600"),
+    ("(1991) Supp. 1 SCC 600", "(1991) Supp (1) SCC 600"),
+    ("(1991) Supp SCC 600", "(1991) Supp SCC 600"),
+    ("2005 SCC OnLine SC 123", "2005 SCC OnLine SC 123"),
+    ("[1994] 3 SCR 1", "[1994] 3 SCR 1"),
+    ("(1994) 3 SCR 1", "[1994] 3 SCR 1"),
+    ("[1950] SCR 88", "[1950] SCR 88"),
+    ("AIR 1973 SC 1461", "AIR 1973 SC 1461"),
+    ("JT 2001 (4) SC 12", "JT 2001 (4) SC 12"),
+    ("JT 2001(4) SC 12", "JT 2001 (4) SC 12"),
+    ("MANU/SC/0445/1973", "MANU/SC/0445/1973"),
+    ("MANU/SC/445/1973", "MANU/SC/0445/1973"),
+    ("2023 INSC 712", "2023 INSC 712"),
+])
+def test_citation_spellings_normalize_to_one_key(text, key):
+    assert parse_citation(f"as held in {text}, the appeal") == key
+
+@pytest.mark.parametrize('text', [
+    "2019 SCC OnLine Del 1234",     # High Courts are out of scope
+    "Section 34 of the Act",
+    "para 14 supra",
+    "ABCMANU/SC/0445/1973",
+])
+def test_other_references_are_not_citations(text):
+    assert list(iter_citations(text)) == []
+
+def test_every_citation_in_a_paragraph_is_found_in_order():
+    text = "See (2017) 10 SCC 1, AIR 1950 SC 27 and 1991 Supp (1) SCC 600; also 2005 SCC OnLine SC 9."
+    assert [citation_key(*citation) for citation in iter_citations(text)] == [
+        "(2017) 10 SCC 1", "AIR 1950 SC 27", "(1991) Supp (1) SCC 600", "2005 SCC OnLine SC 9"]
+
+@pytest.fixture
+def index():
+    with CitationIndex(':memory:') as index:
+        citations = [tool.Citation('SCC', 2017, 10, 1, '4'), tool.Citation('AIR', 1973, None, 1461, '9')]
+        index.add_judgment('a' * 64, citations,
+                           {'citation_number': '2024 INSC 1', 'petitioner': 'A', 'respondent': 'State',
+                            'judgment_date': '2024-01-02'})
+        index.add_judgment('b' * 64, [tool.Citation('SCC', 2017, 10, 1, '12')],
+                           {'citation_number': '2024 INSC 2', 'petitioner': 'B', 'respondent': 'Union',
+                            'judgment_date': '2024-03-04'})
+        yield index
+
+def test_cited_by_accepts_any_spelling(index):
+    rows = index.cited_by("[2017] 10 SCC 1")
+    assert [(row['neutral_citation'], row['paragraph']) for row in rows] == [
+        ("2024 INSC 1", '4'), ("2024 INSC 2", '12')]
+    assert index.cited_by("AIR 1973 SC 1461")[0]['petitioner'] == 'A'
+    with pytest.raises(ValueError):
+        index.cited_by("not a citation")
+
+def test_citations_in_by_neutral_citation_or_digest(index):
+    assert [row['citation'] for row in index.citations_in("2024 INSC 1")] == ["(2017) 10 SCC 1", "AIR 1973 SC 1461"]
+    assert [row['citation'] for row in index.citations_in('b' * 64)] == ["(2017) 10 SCC 1"]
+    assert index.citations_in("2024 INSC 99") == []
+
+def test_reindexing_a_judgment_replaces_its_rows(index):
+    index.add_judgment('a' * 64, [tool.Citation('INSC', 2023, None, 712, '1')], {'citation_number': '2024 INSC 1'})
+    assert index.judgment_count() == 2
+    assert [row['citation'] for row in index.citations_in('a' * 64)] == ["2023 INSC 712"]
+    assert [row['paragraph'] for row in index.cited_by("(2017) 10 SCC 1")] == ['12']
@@ -0,0 +1,73 @@
+"""The on-disk result cache: hits, misses, versions, and one size bound shared by every writer."""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from judgment_cache import JudgmentCache
+
+ENTRY_BYTES = 1000
+# Room for about ten entries
+MAX_BYTES = 10 * ENTRY_BYTES + 500
+
+def entry(n):
+    return {'n': n, 'blob': 'x' * (ENTRY_BYTES - 20)}
+
+def digest(n):
+    return f"{n:064x}"
+
+def on_disk(cache):
+    return sum(stat.st_size for _, stat in cache._entries())
+
+def test_put_then_get(tmp_path):
+    cache = JudgmentCache(str(tmp_path), '5')
+    assert cache.get(digest(1)) is None
+    cache.put(digest(1), entry(1))
+    assert cache.get(digest(1)) == entry(1)
+
+def test_entries_of_other_versions_are_dropped_on_open(tmp_path):
+    JudgmentCache(str(tmp_path), '5').put(digest(1), entry(1))
+    assert JudgmentCache(str(tmp_path), '6').get(digest(1)) is None
+    assert JudgmentCache(str(tmp_path), '5').get(digest(1)) is None
+
+def test_a_corrupt_entry_is_a_miss(tmp_path):
+    cache = JudgmentCache(str(tmp_path), '5')
+    cache.put(digest(1), entry(1))
+    with open(cache.path_for(digest(1)), 'wb') as fh:
+        fh.write(b'torn')
+    assert cache.get(digest(1)) is None
+    assert not os.path.exists(cache.path_for(digest(1)))
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = JudgmentCache(str(tmp_path), '5', max_bytes=MAX_BYTES, compression=None)
+    for n in range(30):
+        cache.put(digest(n), entry(n))
+        assert on_disk(cache) <= MAX_BYTES
+    assert cache.get(digest(29)) == entry(29)
+    assert cache.get(digest(0)) is None
+
+def test_caches_sharing_a_directory_share_its_size_bound(tmp_path):
+    # As in batch.py -j N: each worker opens the cache on its own
+    caches = [JudgmentCache(str(tmp_path), '5', max_bytes=MAX_BYTES, compression=None) for _ in range(4)]
+    for n in range(40):
+        caches[n % 4].put(digest(n), entry(n))
+        assert on_disk(caches[0]) <= MAX_BYTES
+    assert caches[0].total_bytes == on_disk(caches[0])
+    # The size record survives reopening
+    assert JudgmentCache(str(tmp_path), '5', max_bytes=MAX_BYTES, compression=None).get(digest(39)) == entry(39)
+
+def _fill(directory, start, count):
+    """Put count entries from one process; returns the largest directory size seen between puts."""
+    cache = JudgmentCache(directory, '5', max_bytes=MAX_BYTES, compression=None)
+    largest = 0
+    for n in range(start, start + count):
+        cache.put(digest(n), entry(n))
+        with cache._shared():
+            largest = max(largest, on_disk(cache))
+    return largest
+
+def test_worker_processes_stay_within_one_bound(tmp_path):
+    with ProcessPoolExecutor(4) as pool:
+        largest = list(pool.map(_fill, [str(tmp_path)] * 4, range(0, 400, 100), [100] * 4))
+    assert max(largest) <= MAX_BYTES
+    cache = JudgmentCache(str(tmp_path), '5', max_bytes=MAX_BYTES, compression=None)
+    assert on_disk(cache) <= MAX_BYTES
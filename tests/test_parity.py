@@ -0,0 +1,129 @@
+"""Output parity of the rewritten pipeline with the parser it replaced, on a synthetic judgment.
+
+The baseline_* functions are the original implementations (a re.match per
+line and rule, and one re.search per citation indicator), reduced to the
+structure they produced instead of HTML.
+"""
+
+import random
+import re
+
+import pytest
+
+import synthetic
+import tool
+
+# Long enough for iter_pdf_pages to split the document across workers
+SYNTHETIC_PAGES = 2 * tool.PARALLEL_MIN_PAGES
+
+BASELINE_CITATION_INDICATORS = [
+    r'\b\d{4}\s+\d+\s+SCC\s+\d+\b',
+    r'\bMANU/SC/\d+/\d+\b',
+    r'\b\(\d{4}\)\s*\d+\s+SCC\s+\d+\b',
+    r'\bAIR\s+\d{4}\s+SC\s+\d+\b',
+    r'\b\d{4}\s+\d+\s+SCR\s+\d+\b',
+    r'\bJT\s+\d{4}\s+\(\d+\)\s+SC\s+\d+\b',
+    r'\b\d{4}\s+Supp\s+\(\d+\)\s+SCC\s+\d+\b',
+    r'\bvs?\.\s+[A-Z][a-zA-Z\s&]+\b',
+    r'\b[A-Z][a-zA-Z\s&]+ vs?\. [A-Z][a-zA-Z\s&]+\b',
+    r'\bsupra\b', r'\binfra\b', r'\bibid\b',
+    r'\bpara\s*\d+\b', r'\bparas?\.\s*\d+\b',
+    r'\bSee also\b', r'\bReferred to in\b',
+]
+# Sub-point rules in the order the baseline tried them ("i." is a letter)
+BASELINE_SUB_POINTS = (('roman', r'^([IVX]+)\.\s*(.*)'), ('letter', r'^([a-z])\.\s*(.*)'),
+                       ('small_roman', r'^([ivx]+)\.\s*(.*)'))
+# A sub-point runs on until the next numbered line of any kind (section headers included)
+BASELINE_SUB_POINT_END = (r'^[IVX]+\.\s*', r'^[a-z]\.\s*', r'^[ivx]+\.\s*', r'^\d+\.\s*')
+
+def baseline_is_citation(content):
+    count = sum(1 for pattern in BASELINE_CITATION_INDICATORS if re.search(pattern, content, re.IGNORECASE))
+    return count >= 2 or (count >= 1 and len(content) < 200)
+
+def baseline_parse(text):
+    """[('section', title) | ('paragraph', number, content, [(style, number, content)], is_citation)]"""
+    normalized = re.sub(r'^\s*Page\s+\d+\s+of\s+\d+\s*$', '', text, flags=re.MULTILINE)
+    lines = [line.strip() for line in normalized.split('\n') if line.strip()]
+    start = next((i for i, line in enumerate(lines) if re.match(r'^1\.\s*', line)), None)
+    if start is None:
+        start = next((i for i, line in enumerate(lines) if re.match(r'^\d+\.\s*', line)), 0)
+    sections = []
+    i = start
+    while i < len(lines):
+        line = lines[i]
+        if re.match(r'^[A-Z]\.\s*[A-Z]', line):
+            sections.append(('section', line))
+            i += 1
+            continue
+        para_match = re.match(r'^(\d+)\.\s*(.*)', line)
+        if not para_match:
+            i += 1
+            continue
+        content = para_match.group(2).strip()
+        sub_points = []
+        j = i + 1
+        while j < len(lines) and not (re.match(r'^\d+\.\s*', lines[j]) or re.match(r'^[A-Z]\.\s*[A-Z]', lines[j])):
+            sub_match = None
+            for style, pattern in BASELINE_SUB_POINTS:
+                sub_match = re.match(pattern, lines[j])
+                if sub_match:
+                    break
+            if sub_match is None:
+                content += " " + lines[j]
+                j += 1
+                continue
+            sub_content = sub_match.group(2).strip()
+            k = j + 1
+            while k < len(lines) and not any(re.match(pattern, lines[k]) for pattern in BASELINE_SUB_POINT_END):
+                sub_content += " " + lines[k]
+                k += 1
+            sub_points.append((style, sub_match.group(1) + '.', sub_content))
+            j = k
+        sections.append(('paragraph', para_match.group(1), content, sub_points, baseline_is_citation(content)))
+        i = j
+    return sections
+
+def model_structure(sections):
+    """The parsed model in baseline_parse's shape."""
+    structure = []
+    for section in sections:
+        if isinstance(section, tool.SectionHeader):
+            structure.append(('section', section.title))
+        else:
+            structure.append(('paragraph', section.number, section.content,
+                              [(sub.style, sub.number, sub.content) for sub in section.sub_points],
+                              section.is_citation))
+    return structure
+
+@pytest.fixture(scope='module')
+def judgment_pdf(tmp_path_factory):
+    path = tmp_path_factory.mktemp('synthetic') / 'judgment.pdf'
+    return synthetic.write_judgment_pdf(str(path), SYNTHETIC_PAGES)
+
+@pytest.fixture(scope='module')
+def judgment_text(judgment_pdf):
+    return tool.join_pages(list(tool.iter_pdf_pages(judgment_pdf)))
+
+def test_parallel_extraction_matches_serial(judgment_pdf):
+    serial = list(tool.iter_pdf_pages(judgment_pdf))
+    assert list(tool.iter_pdf_pages(judgment_pdf, workers=4)) == serial
+    assert tool.extract_text_from_pdf(judgment_pdf, workers=4) == tool.join_pages(serial)[0]
+
+def test_line_table_parse_matches_baseline(judgment_text):
+    text, page_starts = judgment_text
+    sections = tool.parse_judgment_content_enhanced(tool.tokenize_judgment(text, page_starts))
+    expected = baseline_parse(text)
+    assert any(entry[0] == 'section' for entry in expected)
+    assert any(entry[0] == 'paragraph' and entry[3] for entry in expected)
+    assert model_structure(sections) == expected
+
+def test_citation_scanner_matches_per_pattern_decision(judgment_text):
+    text, page_starts = judgment_text
+    judgment = tool.Judgment({}, [], tool.parse_judgment_content_enhanced(tool.tokenize_judgment(text, page_starts)))
+    contents = [paragraph.content for paragraph in judgment.paragraphs]
+    contents += [sub.content for paragraph in judgment.paragraphs for sub in paragraph.sub_points]
+    rng = random.Random(0)
+    contents += [synthetic.sentence(rng) for _ in range(2000)]
+    decisions = [baseline_is_citation(content) for content in contents]
+    assert True in decisions and False in decisions
+    assert [tool.is_citation_paragraph(content) for content in contents] == decisions
@@ -0,0 +1,21 @@
+"""benchmarks/regex_fuzz.py as a test: every parser pattern scans adversarial input in linear time."""
+
+import re
+
+import pytest
+
+import regex_fuzz
+
+PATTERNS = [(name, pattern) for name, pattern in regex_fuzz.collect_patterns()
+            if name not in regex_fuzz.TRUSTED_INPUT]
+
+@pytest.mark.parametrize('name, pattern', PATTERNS, ids=[name for name, _ in PATTERNS])
+def test_pattern_scans_in_linear_time(name, pattern):
+    findings, hung = regex_fuzz.fuzz_with_timeout(pattern, regex_fuzz.USAGE.get(name))
+    assert hung is None, f"{name} did not return within {regex_fuzz.CALL_TIMEOUT_SECONDS}s on {hung[:40]!r}..."
+    assert not findings, f"{name} grows super-linearly on {[unit[:40] for unit, _, _ in findings]}"
+
+@pytest.mark.parametrize('source', [r'a*b', r'(a+)+b'])
+def test_super_linear_patterns_are_caught(source):
+    findings, hung = regex_fuzz.fuzz_with_timeout(re.compile(source), timeout=2.0)
+    assert findings or hung
@@ -0,0 +1,52 @@
+"""Corrected judgments: the paragraph diff, and re-formatting only what changed."""
+
+import re
+
+import pytest
+
+import tool
+from judgment_cache import JudgmentCache
+
+def test_diff_paragraphs_lists_added_removed_and_changed_numbers():
+    old = [('1', 'a'), ('2', 'b'), ('3', 'c')]
+    new = [('1', 'a'), ('2', 'B'), ('4', 'd')]
+    assert tool.diff_paragraphs(old, new) == {'added': ['4'], 'removed': ['3'], 'changed': ['2']}
+    assert tool.diff_paragraphs(old, old) == {'added': [], 'removed': [], 'changed': []}
+
+def test_diff_paragraphs_keeps_repeated_numbers_apart():
+    # Numbering restarts, e.g. in an annexure: the second "1" is its own paragraph
+    old = [('1', 'a'), ('2', 'b'), ('1', 'x')]
+    new = [('1', 'a'), ('2', 'b'), ('1', 'y'), ('2', 'z')]
+    assert tool.diff_paragraphs(old, new) == {'added': ['2'], 'removed': [], 'changed': ['1']}
+
+@pytest.fixture
+def judgment_text(synthetic_judgment):
+    return tool.join_pages(list(tool.iter_pdf_pages(synthetic_judgment(8))))[0]
+
+def render_version(revisions, digest, text):
+    judgment = tool.parse_judgment(text)
+    revision = tool.JudgmentRevision(revisions, digest, judgment)
+    html = tool.render_judgment(judgment, revision=revision)
+    revision.save()
+    return judgment, revision, html
+
+def test_a_correction_reformats_only_changed_paragraphs(judgment_text, tmp_path):
+    revisions = JudgmentCache(str(tmp_path / 'revisions'), tool.PARSER_VERSION)
+    original, first, _ = render_version(revisions, 'v1', judgment_text)
+    assert first.summary is None and first.reused == 0
+
+    corrected_text = re.sub(r'^3\.\s*', '3. Corrected: ', judgment_text, count=1, flags=re.MULTILINE)
+    corrected, second, html = render_version(revisions, 'v2', corrected_text)
+    assert second.summary == {'added': [], 'removed': [], 'changed': ['3'], 'previous_digest': 'v1'}
+    assert second.reused == len(corrected.sections) - 1
+    # Reused fragments give exactly the HTML a full render would
+    assert html == tool.render_judgment(corrected)
+    assert 'Corrected:' in html
+
+def test_another_judgment_is_not_compared_with(judgment_text, tmp_path):
+    revisions = JudgmentCache(str(tmp_path / 'revisions'), tool.PARSER_VERSION)
+    render_version(revisions, 'v1', judgment_text)
+    # Another neutral citation makes it another judgment, however similar the text
+    other_text = re.sub(r'\d{4}\s+INSC\s+\d+', '1999 INSC 1', judgment_text)
+    _, revision, _ = render_version(revisions, 'other', other_text)
+    assert revision.summary is None and revision.reused == 0
@@ -0,0 +1,179 @@
+"""service.py over HTTP on an ephemeral localhost port: submit, queue limit, results, DELETE, health."""
+
+import asyncio
+import http.client
+import json
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+import service
+from judgment_cache import sha256_of
+
+# Longest any step here should take
+TIMEOUT = 30
+# Workers are forked after the service starts, so they share this event; clear it to hold jobs
+_worker_gate = None
+_run_job = service.run_job
+
+def gated_run_job(job_id, slot):
+    """service.run_job, once the test lets the worker go."""
+    _worker_gate.wait(TIMEOUT)
+    return _run_job(job_id, slot)
+
+class Client:
+    def __init__(self, address):
+        self.host, self.port = address
+
+    def request(self, method, path, body=None, headers=None):
+        """(status, headers, body bytes) of one request."""
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=TIMEOUT)
+        try:
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            return response.status, dict(response.getheaders()), response.read()
+        finally:
+            connection.close()
+
+    def submit(self, pdf):
+        with open(pdf, 'rb') as fh:
+            status, headers, body = self.request('POST', '/jobs', fh.read(), {'Content-Type': 'application/pdf'})
+        return status, headers, json.loads(body)
+
+    def job(self, job_id):
+        status, _, body = self.request('GET', f'/jobs/{job_id}')
+        return status, json.loads(body)
+
+    def wait(self, job_id, statuses=('done', 'failed', 'cancelled')):
+        """The job's status once it is one of `statuses`."""
+        deadline = time.monotonic() + TIMEOUT
+        while time.monotonic() < deadline:
+            _, job = self.job(job_id)
+            if job['status'] in statuses:
+                return job
+            time.sleep(0.05)
+        raise AssertionError(f"job {job_id} did not reach {statuses} within {TIMEOUT}s")
+
+@pytest.fixture
+def gate(monkeypatch):
+    """A multiprocessing.Event the service's worker waits on before each job; set to begin with."""
+    global _worker_gate
+    _worker_gate = multiprocessing.Event()
+    _worker_gate.set()
+    monkeypatch.setattr(service, 'run_job', gated_run_job)
+    yield _worker_gate
+    _worker_gate.set()
+
+@pytest.fixture
+def start_service(tmp_path, gate):
+    """start_service(queue_size) runs the service with one worker on a free port and returns a Client."""
+    running = []
+
+    def start(queue_size=10):
+        options = {
+            'store_dir': str(tmp_path / 'jobs'),
+            'ttl_seconds': 3600,
+            'cache_dir': None,
+            'revision_dir': None,
+            'minify': False,
+            'max_upload_bytes': 100 * 2**20,
+            'budget': None,
+        }
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        address = []
+
+        def on_ready(bound):
+            address.append(bound)
+            ready.set()
+        task = loop.create_task(service.serve(options, '127.0.0.1', 0, 1, queue_size, on_ready))
+
+        def run():
+            try:
+                loop.run_until_complete(task)
+            except asyncio.CancelledError:
+                pass
+            finally:
+                loop.close()
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        assert ready.wait(TIMEOUT), "the service did not start listening"
+        running.append((loop, task, thread))
+        return Client(address[0])
+
+    yield start
+    gate.set()
+    for loop, task, thread in running:
+        loop.call_soon_threadsafe(task.cancel)
+        thread.join(2 * TIMEOUT)
+
+def test_submit_then_fetch_the_result_as_html_and_json(start_service, synthetic_judgment):
+    client = start_service()
+    pdf = synthetic_judgment(5)
+    status, headers, job = client.submit(pdf)
+    assert status == 202
+    assert job['status'] == 'queued'
+    assert headers['Location'] == f"/jobs/{job['job']}"
+
+    assert client.wait(job['job'])['status'] == 'done'
+    status, headers, html = client.request('GET', f"/jobs/{job['job']}/result")
+    assert status == 200
+    assert headers['Content-Type'].startswith('text/html')
+    assert b'<html' in html
+    status, headers, body = client.request('GET', f"/jobs/{job['job']}/result?format=json")
+    assert status == 200
+    assert headers['Content-Type'].startswith('application/json')
+    assert json.loads(body)['digest'] == sha256_of(pdf)
+    status, _, body = client.request('GET', f"/jobs/{job['job']}/result", headers={'Accept': 'application/json'})
+    assert json.loads(body)['digest'] == sha256_of(pdf)
+
+def test_a_full_queue_refuses_with_503_and_retry_after(start_service, synthetic_judgment, gate):
+    client = start_service(queue_size=1)
+    pdf = synthetic_judgment(5)
+    gate.clear()
+    _, _, running = client.submit(pdf)
+    client.wait(running['job'], ('running',))
+    status, _, queued = client.submit(pdf)
+    assert status == 202
+    # One job runs and one waits: the queue is full
+    status, headers, body = client.submit(pdf)
+    assert status == 503
+    assert int(headers['Retry-After']) >= 1
+    assert 'queue is full' in body['error']
+    gate.set()
+    assert client.wait(queued['job'])['status'] == 'done'
+    assert client.submit(pdf)[0] == 202
+
+def test_delete_cancels_a_queued_job_and_forgets_a_finished_one(start_service, synthetic_judgment, gate):
+    client = start_service()
+    gate.clear()
+    _, _, running = client.submit(synthetic_judgment(5))
+    client.wait(running['job'], ('running',))
+    _, _, queued = client.submit(synthetic_judgment(5))
+    status, _, body = client.request('DELETE', f"/jobs/{queued['job']}")
+    assert status == 200
+    assert json.loads(body)['status'] == 'cancelled'
+    assert client.job(queued['job'])[1]['status'] == 'cancelled'
+    assert client.request('GET', f"/jobs/{queued['job']}/result")[0] == 409
+
+    gate.set()
+    assert client.wait(running['job'])['status'] == 'done'
+    assert client.request('DELETE', f"/jobs/{running['job']}")[0] == 200
+    assert client.job(running['job'])[0] == 404
+
+def test_health_reports_queue_depth_and_capacity(start_service):
+    client = start_service(queue_size=7)
+    status, _, body = client.request('GET', '/health')
+    assert status == 200
+    health = json.loads(body)
+    assert health['queue_size'] == 7
+    assert health['workers'] == 1
+    assert health['queued'] == health['running'] == 0
+
+def test_uploads_that_are_not_pdfs_are_refused(start_service):
+    client = start_service()
+    status, _, body = client.request('POST', '/jobs', b'hello', {'Content-Type': 'application/pdf'})
+    assert status == 415
+    assert client.request('GET', '/health')[0] == 200
@@ -0,0 +1,168 @@
+"""SingleFlight and SharedProcessor under concurrent sessions."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import tool
+from budgets import Budget
+from cancellation import Cancelled, CancellationToken
+
+# Long enough for any thread in these tests to reach its wait
+TIMEOUT = 10
+
+class Blocking:
+    """A func for SingleFlight.do that blocks until released, then returns or raises."""
+
+    def __init__(self, result='result'):
+        self.result = result
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        assert self.release.wait(TIMEOUT)
+        if isinstance(self.result, BaseException):
+            raise self.result
+        return self.result
+
+def waiting(count):
+    """An on_wait callback, and an event set once `count` callers are waiting for key."""
+    lock = threading.Lock()
+    waiters = [0]
+    all_waiting = threading.Event()
+
+    def on_wait():
+        with lock:
+            waiters[0] += 1
+            if waiters[0] == count:
+                all_waiting.set()
+    return on_wait, all_waiting
+
+def test_concurrent_calls_run_once_and_share_the_result():
+    flight = tool.SingleFlight()
+    func = Blocking()
+    on_wait, all_waiting = waiting(4)
+    with ThreadPoolExecutor(5) as pool:
+        owner = pool.submit(flight.do, 'pdf', func)
+        assert func.started.wait(TIMEOUT)
+        waiters = [pool.submit(flight.do, 'pdf', func, on_wait) for _ in range(4)]
+        assert all_waiting.wait(TIMEOUT)
+        func.release.set()
+        assert owner.result(TIMEOUT) == ('result', False)
+        assert [waiter.result(TIMEOUT) for waiter in waiters] == [('result', True)] * 4
+    assert func.calls == 1
+    assert not flight._calls
+
+def test_different_keys_do_not_wait_for_each_other():
+    flight = tool.SingleFlight()
+    first, second = Blocking('first'), Blocking('second')
+    with ThreadPoolExecutor(2) as pool:
+        a = pool.submit(flight.do, 'a', first)
+        b = pool.submit(flight.do, 'b', second)
+        assert first.started.wait(TIMEOUT) and second.started.wait(TIMEOUT)
+        first.release.set()
+        second.release.set()
+        assert (a.result(TIMEOUT), b.result(TIMEOUT)) == (('first', False), ('second', False))
+
+@pytest.mark.parametrize('interruption', [Cancelled("session moved on"), KeyboardInterrupt()],
+                         ids=['cancelled', 'interrupted'])
+def test_a_waiter_takes_over_when_the_owner_stops(interruption):
+    flight = tool.SingleFlight()
+    owner_func = Blocking(interruption)
+    waiter_func = Blocking('waiter result')
+    waiter_func.release.set()
+    on_wait, waiter_waiting = waiting(1)
+    with ThreadPoolExecutor(2) as pool:
+        owner = pool.submit(flight.do, 'pdf', owner_func)
+        assert owner_func.started.wait(TIMEOUT)
+        waiter = pool.submit(flight.do, 'pdf', waiter_func, on_wait)
+        assert waiter_waiting.wait(TIMEOUT)
+        owner_func.release.set()
+        with pytest.raises(type(interruption)):
+            owner.result(TIMEOUT)
+        # The waiter ran the work itself, so the result is its own
+        assert waiter.result(TIMEOUT) == ('waiter result', False)
+    assert waiter_func.calls == 1
+    assert not flight._calls
+
+def test_an_error_in_the_owner_reaches_its_waiters_and_releases_the_flight():
+    flight = tool.SingleFlight()
+    func = Blocking(ValueError("not a PDF"))
+    on_wait, waiter_waiting = waiting(1)
+    with ThreadPoolExecutor(2) as pool:
+        owner = pool.submit(flight.do, 'pdf', func)
+        assert func.started.wait(TIMEOUT)
+        waiter = pool.submit(flight.do, 'pdf', func, on_wait)
+        assert waiter_waiting.wait(TIMEOUT)
+        func.release.set()
+        for call in (owner, waiter):
+            with pytest.raises(ValueError):
+                call.result(TIMEOUT)
+    assert func.calls == 1
+    assert not flight._calls
+    # A later call starts afresh
+    assert flight.do('pdf', lambda: 'retried') == ('retried', False)
+
+def test_a_cancelled_waiter_stops_waiting_and_leaves_the_owner_running():
+    flight = tool.SingleFlight()
+    func = Blocking()
+    token = CancellationToken()
+    on_wait, waiter_waiting = waiting(1)
+    with ThreadPoolExecutor(2) as pool:
+        owner = pool.submit(flight.do, 'pdf', func)
+        assert func.started.wait(TIMEOUT)
+        waiter = pool.submit(flight.do, 'pdf', func, on_wait, token)
+        assert waiter_waiting.wait(TIMEOUT)
+        token.cancel()
+        with pytest.raises(Cancelled):
+            waiter.result(TIMEOUT)
+        assert not owner.done()
+        func.release.set()
+        assert owner.result(TIMEOUT) == ('result', False)
+    assert func.calls == 1
+    assert not flight._calls
+
+def shared_runs(monkeypatch, pdf, budgets):
+    """SharedProcessor.process for each budget at once, in one thread per session.
+
+    Each run waits in process_judgment until every session has either
+    started its own run or is waiting for another's, so runs that could be
+    shared are.
+    """
+    started = threading.Semaphore(0)
+    process_judgment = tool.process_judgment
+
+    def counted(*args, **kwargs):
+        started.release()
+        everyone_arrived.wait(TIMEOUT)
+        return process_judgment(*args, **kwargs)
+    monkeypatch.setattr(tool, 'process_judgment', counted)
+
+    def progress(message, percent):
+        if 'another session' in message:
+            started.release()
+
+    processor = tool.SharedProcessor()
+    everyone_arrived = threading.Event()
+    with ThreadPoolExecutor(len(budgets)) as pool:
+        runs = [pool.submit(processor.process, pdf, progress=progress, budget=budget) for budget in budgets]
+        for _ in budgets:
+            assert started.acquire(timeout=TIMEOUT)
+        everyone_arrived.set()
+        return [run.result(TIMEOUT * 6) for run in runs]
+
+def test_sessions_with_the_same_limits_share_one_run(monkeypatch, synthetic_judgment):
+    results = shared_runs(monkeypatch, synthetic_judgment(40), [Budget(max_pages=100), Budget(max_pages=100)])
+    assert sorted(result['cached'] for result in results) == [False, True]
+    assert results[0]['html'] == results[1]['html']
+
+def test_sessions_with_other_limits_do_not_share_a_run(monkeypatch, synthetic_judgment):
+    limited, unlimited = shared_runs(monkeypatch, synthetic_judgment(40), [Budget(max_pages=5), None])
+    assert not limited['cached'] and not unlimited['cached']
+    assert limited['budget'].truncation is not None
+    assert unlimited['page_count'] == 40 and not unlimited['degradations']
+    assert "Only the first" not in unlimited['html']
@@ -1,18 +1,50 @@
-import streamlit as st
 import fitz  # PyMuPDF
+import hashlib
 import re
-from jinja2 import Template
-import base64
+import os
+import tempfile
+import threading
+import uuid
+from array import array
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from jinja2 import Environment
+from judgment_cache import JudgmentCache, sha256_of
+from citation_index import INDEX_PATH, CitationIndex, citation_key, iter_citations
+from session_store import SessionStore
+from instrumentation import add_count, collect_report, current_report, stage_timer
+from budgets import (FULL, NO_CITATION_STYLING, NO_SUB_POINTS, PLAIN_PARAGRAPHS, Budget, budget_stage,
+                     current_budget, spending)
+from cancellation import Cancelled, CancellationToken, cancellable, check_cancelled, wait_result
+import json
 from datetime import datetime
 
-HTML_TEMPLATE = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-  <meta charset="UTF-8">
-  <meta name="viewport" content="width=device-width, initial-scale=1.0">
-  <title>{{ case_title }}</title>
-  <style>
+# Bump whenever parsing or rendering output changes; cached results from other versions are discarded
+PARSER_VERSION = "5"
+
+CACHE_DIR = os.environ.get(
+    "LEGAL_PARSER_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "legal-parser")
+)
+# Per-session artifacts of the Streamlit app; kept apart from the result cache,
+# which removes any file it does not recognise
+SESSION_DIR = os.environ.get(
+    "LEGAL_PARSER_SESSION_DIR",
+    os.path.join(tempfile.gettempdir(), "legal-parser-sessions")
+)
+# Section HTML of the last version seen of each judgment, for corrected re-issues
+REVISION_DIR = os.environ.get(
+    "LEGAL_PARSER_REVISION_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "legal-parser-revisions")
+)
+# Default per-document limits in the app, so one hostile PDF cannot tie up a server worker
+APP_MAX_PAGES = 2000
+APP_STAGE_SECONDS = 120
+APP_MAX_MEMORY_MB = 2048
+
+# Shared by every judgment; inlined in standalone documents, or written once and linked
+JUDGMENT_CSS = """
     * {
       margin: 0;
       padding: 0;
@@ -361,9 +393,21 @@ HTML_TEMPLATE = """
       font-style: italic;
       color: #388E3C;
     }
-  </style>
+  """
+
+HTML_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="UTF-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1.0">
+  <title>{{ case_title }}</title>
+  {% if stylesheet_href %}<link rel="stylesheet" href="{{ stylesheet_href }}">{% else %}<style>{{ css }}</style>{% endif %}
 </head>
-<body>
+<body>{% if truncation_note %}
+  <div class="truncation-note" style="border: 1px solid #c00; padding: 6px 10px; margin-bottom: 15px;">
+    {{ truncation_note }}
+  </div>{% endif %}
   <div class="header-section">
     {% if citation_number %}
     <div class="citation-line">{{ citation_number }}</div>
@@ -422,14 +466,14 @@ HTML_TEMPLATE = """
   <div class="index-section">
     <div class="index-title">INDEX</div>
     {% for item in index_items %}
-    <div class="index-item {{ item.class }}">{{ item.content | safe }}</div>
+    <div class="index-item {{ item.css_class }}">{{ item.content | safe }}</div>
     {% endfor %}
   </div>
   {% endif %}
   
   <div class="content">
-    {% for section in sections %}
-      {{ section.html | safe }}
+    {% for section_html in sections %}
+      {{ section_html | safe }}
     {% endfor %}
   </div>
   
@@ -444,154 +488,711 @@ HTML_TEMPLATE = """
 #  ENHANCED PARSING FUNCTIONS - FIXED SUB-NUMBERING AND CITATION DETECTION
 # =====================
 
-def extract_text_from_pdf(pdf_file):
-    """Extract full text from PDF with better formatting preservation."""
-    doc = fitz.open(stream=pdf_file.read(), filetype="pdf")
-    full_text = ""
+# Page cleanup patterns, compiled once and shared by the serial and parallel paths
+# The "Printed For: ... On: ..." line, through its newline. The gaps are bounded
+# so a page full of "Printed For:" or blank lines cannot make the scan
+# quadratic; real page furniture is far shorter than the bounds.
+PRINTED_FOR_RE = re.compile(r'Printed For:(?=.{0,500}?On:).{0,1000}\n')
+PAGE_OF_RE = re.compile(r'\(Page \d+ of \d+\)')                        # old pattern
+PAGE_MARKER_RE = re.compile(r'^\s{0,100}Page\s+\d+\s+of\s+\d+\s*$', re.MULTILINE)  # new pattern
+
+# Below this many pages the process pool start-up costs more than it saves
+PARALLEL_MIN_PAGES = 32
+# Page ranges handed out per worker, so a slow range does not stall the pool
+CHUNKS_PER_WORKER = 4
+# Upper bound on a single range, which also bounds how many pages sit in memory
+MAX_CHUNK_PAGES = 16
+
+# Per-process state for pool workers (the PDF source and its open document)
+_worker_source = None
+_worker_doc = None
+
+def open_pdf(source):
+    """Open a PDF from a path, raw bytes or an uploaded file object."""
+    if isinstance(source, (str, os.PathLike)):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype="pdf")
+
+def read_pdf_source(pdf_file):
+    """Return something every worker can reopen: a path as-is, otherwise the raw bytes.
+
+    Paths are never read into memory here; PyMuPDF loads pages from disk on demand.
+    In-memory uploads are read without consuming them, so they can be read again.
+    """
+    if isinstance(pdf_file, (str, os.PathLike, bytes)):
+        return pdf_file
+    if hasattr(pdf_file, 'getvalue'):
+        return pdf_file.getvalue()
+    return pdf_file.read()
 
-    for page_num in range(doc.page_count):
-        page = doc[page_num]
-        text = page.get_text()
+def clean_page_text(text):
+    """Clean up the text of a single page while preserving structure."""
+    text = PRINTED_FOR_RE.sub('', text)
 
-        # Clean up the text while preserving structure
-        text = re.sub(r'Printed For:.*?On:.*?\n', '', text)
+    # Remove BOTH styles of page markers
+    text = PAGE_OF_RE.sub('', text)
+    text = PAGE_MARKER_RE.sub('', text)
+    add_count('regex_calls', 3)
+    return text
+
+def _init_extraction_worker(source):
+    """Pool initializer: remember the PDF source so tasks only carry page ranges."""
+    global _worker_source, _worker_doc
+    _worker_source = source
+    _worker_doc = None
+
+def _extract_page_range(start, stop):
+    """Extract and clean pages [start, stop) inside a pool worker."""
+    global _worker_doc
+    if _worker_doc is None:
+        _worker_doc = open_pdf(_worker_source)
+    return [clean_page_text(_worker_doc[page_num].get_text()) for page_num in range(start, stop)]
 
-        # Remove BOTH styles of page markers
-        text = re.sub(r'\(Page \d+ of \d+\)', '', text)           # old pattern
-        text = re.sub(r'^\s*Page\s+\d+\s+of\s+\d+\s*$', '', text, flags=re.MULTILINE)  # new pattern
+def page_ranges(page_count, chunks):
+    """Split page_count pages into at most `chunks` contiguous (start, stop) ranges."""
+    chunks = max(1, min(chunks, page_count))
+    size, extra = divmod(page_count, chunks)
+    ranges = []
+    start = 0
+    for chunk in range(chunks):
+        stop = start + size + (1 if chunk < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
 
-        full_text += text + "\n"
+def iter_pdf_pages(pdf_file, workers=1):
+    """Yield the cleaned text of each page, in page order, as it is extracted.
+
+    With workers > 1, long documents are split into page ranges that are
+    extracted in a process pool (each worker opens its own document). Only a
+    bounded window of ranges is in flight, so pages are not piled up in memory
+    ahead of the consumer. Under a document budget only the first max_pages
+    pages are read; running out of time or memory never drops pages, it
+    steps formatting down a level (DocumentBudget.checkpoint) instead.
+    The current cancellation token is checked before every page (or range);
+    a cancelled run does not wait for the ranges still being extracted.
+    """
+    source = read_pdf_source(pdf_file)
+    doc = open_pdf(source)
+    page_count = doc.page_count
+    budget = current_budget()
+    if budget is not None:
+        page_count = budget.page_limit(page_count)
+
+    if workers <= 1 or page_count < PARALLEL_MIN_PAGES:
+        try:
+            for page_num in range(page_count):
+                check_cancelled()
+                if budget is not None:
+                    budget.checkpoint()
+                with stage_timer('pymupdf'):
+                    page_text = doc[page_num].get_text()
+                with stage_timer('cleanup'):
+                    page_text = clean_page_text(page_text)
+                yield page_text
+        finally:
+            doc.close()
+        return
 
     doc.close()
-    return full_text.strip()
+    chunks = max(workers * CHUNKS_PER_WORKER, -(-page_count // MAX_CHUNK_PAGES))
+    pending = deque()
+    pool = ProcessPoolExecutor(max_workers=workers,
+                               initializer=_init_extraction_worker,
+                               initargs=(source,))
+    # Unless every range is consumed (cancelled, or the consumer went away),
+    # the workers are left to wind down on their own
+    abandoned = True
+    try:
+        for start, stop in page_ranges(page_count, chunks):
+            pending.append(pool.submit(_extract_page_range, start, stop))
+            if len(pending) >= workers * 2:
+                if budget is not None:
+                    budget.checkpoint()
+                yield from wait_result(pending.popleft())
+        while pending:
+            if budget is not None:
+                budget.checkpoint()
+            yield from wait_result(pending.popleft())
+        abandoned = False
+    finally:
+        pool.shutdown(wait=not abandoned, cancel_futures=True)
 
-def extract_comprehensive_metadata(text):
-    """Extract comprehensive metadata from judgment text with improved header parsing."""
-    lines = [line.strip() for line in text.split("\n") if line.strip()]
-    
-    metadata = {
-        "citation_number": "",
-        "reportable": "",
-        "court_name": "",
-        "jurisdiction": "",
-        "case_number": "",
-        "judgment_date": "",
-        "petitioner": "",
-        "respondent": "",
-        "bench_info": "",
-        "judge": "",
-        "convenience_note": "",
-        "show_judgment_header": True
-    }
-    
-    # Extract citation number from first few lines
-    for i, line in enumerate(lines[:5]):
-        if re.match(r'\d{4}\s+INSC\s+\d+', line):
-            metadata["citation_number"] = line
-            break
-    
-    # Extract REPORTABLE status
-    for line in lines[:10]:
-        if "REPORTABLE" in line.upper():
-            metadata["reportable"] = line
-            break
-    
-    # Extract court name - look for "Supreme Court" or similar
-    for line in lines[:15]:
-        if "SUPREME COURT OF INDIA" in line.upper():
-            metadata["court_name"] = "Supreme Court of India"
-            break
-        elif "Supreme Court" in line:
-            metadata["court_name"] = line.strip()
-            break
-        elif "High Court" in line:
-            metadata["court_name"] = line.strip()
-            break
-    
-    # Extract jurisdiction
-    for line in lines[:20]:
-        if "CIVIL APPELLATE JURISDICTION" in line.upper():
-            metadata["jurisdiction"] = line.strip()
-            break
-        elif "CRIMINAL APPELLATE JURISDICTION" in line.upper():
-            metadata["jurisdiction"] = line.strip()
-            break
-        elif "JURISDICTION" in line.upper() and len(line) < 50:
-            metadata["jurisdiction"] = line.strip()
-            break
-    
-    # Extract case number with better pattern matching
-    for line in lines[:25]:
-        case_patterns = [
-            r'(SPECIAL LEAVE PETITION.*?No\..*?\d+.*?of.*?\d+)',
-            r'(Civil Appeal.*?No\..*?\d+.*?of.*?\d+)',
-            r'(Criminal Appeal.*?No\..*?\d+.*?of.*?\d+)',
-            r'(W\.P\..*?No\..*?\d+.*?of.*?\d+)',
-            r'(TRANSFER PETITION.*?No\..*?\d+.*?of.*?\d+)'
-        ]
-        
-        for pattern in case_patterns:
-            case_match = re.search(pattern, line, re.IGNORECASE)
-            if case_match:
-                metadata["case_number"] = case_match.group(1).strip()
+def join_pages(pages):
+    """Join cleaned page texts into the document text, noting where each page starts.
+
+    Returns (text, page_starts): page_starts[i] is the character offset in the
+    (stripped) text at which page i + 1 begins.
+    """
+    text = "".join(page + "\n" for page in pages)
+    offset = len(text.lstrip()) - len(text)
+    page_starts = []
+    for page in pages:
+        page_starts.append(max(offset, 0))
+        offset += len(page) + 1
+    return text.strip(), page_starts
+
+def extract_text_from_pdf(pdf_file, workers=1, cancellation=None):
+    """Extract full text from PDF with better formatting preservation.
+
+    The result is identical whether pages are extracted serially or in parallel.
+    With a CancellationToken, raises Cancelled at the first page after it is cancelled.
+    """
+    with cancellable(cancellation):
+        return join_pages(list(iter_pdf_pages(pdf_file, workers)))[0]
+
+def iter_text_lines(chunks):
+    """Yield the stripped, non-empty lines of a sequence of text chunks (e.g. pages)."""
+    for chunk in chunks:
+        for line in chunk.split("\n"):
+            line = line.strip()
+            if line:
+                yield line
+
+# =====================
+#  LINE TOKENIZER - EVERY LINE IS CLASSIFIED EXACTLY ONCE
+# =====================
+
+# Line kinds (low bits) shared by the metadata, index and body parsers
+LINE_TEXT = 0
+LINE_PARAGRAPH = 1       # 12. ...
+LINE_SECTION = 2         # B. ANALYSIS
+LINE_ROMAN = 3           # IV. ...
+LINE_LETTER = 4          # b. ...
+LINE_SMALL_ROMAN = 5     # iii. ...
+LINE_PAGE_MARKER = 6     # Page 3 of 40
+LINE_KIND_MASK = 0x0F
+# Flag bit: the line carries a …PETITIONER / …RESPONDENT designation
+LINE_PARTY = 0x10
+
+# One anchored pattern; alternatives are tried in the parser's precedence order,
+# so e.g. "I. INTRODUCTION" is a section header and "i." is a letter
+LINE_CLASS_RE = re.compile(
+    r'(?P<page>Page\s+\d+\s+of\s+\d+$)'
+    r'|(?P<section>[A-Z]\.\s*[A-Z])'
+    r'|(?P<paragraph>\d+\.)'
+    r'|(?P<roman>[IVX]+\.)'
+    r'|(?P<letter>[a-z]\.)'
+    r'|(?P<small_roman>[ivx]+\.)'
+)
+LINE_KINDS = {
+    'page': LINE_PAGE_MARKER,
+    'section': LINE_SECTION,
+    'paragraph': LINE_PARAGRAPH,
+    'roman': LINE_ROMAN,
+    'letter': LINE_LETTER,
+    'small_roman': LINE_SMALL_ROMAN
+}
+SUB_POINT_TYPES = {
+    LINE_ROMAN: 'roman',
+    LINE_LETTER: 'letter',
+    LINE_SMALL_ROMAN: 'small_roman'
+}
+
+def classify_line(line):
+    """Classify a stripped line into a LINE_* kind, with LINE_PARTY or-ed in."""
+    match = LINE_CLASS_RE.match(line)
+    kind = LINE_KINDS[match.lastgroup] if match else LINE_TEXT
+    if '…' in line:
+        line_upper = line.upper()
+        if "…PETITIONER" in line_upper or "…RESPONDENT" in line_upper:
+            kind |= LINE_PARTY
+    return kind
+
+def split_numbered(line):
+    """Split "12. Some text" into ("12", "Some text")."""
+    dot = line.index('.')
+    return line[:dot], line[dot + 1:].strip()
+
+def iter_tokens(lines):
+    """Yield (kind, line) for each stripped, non-empty line."""
+    for line in lines:
+        yield classify_line(line), line
+
+# A stripped, non-empty line: from its first to its last non-space character
+LINE_SPAN_RE = re.compile(r'\S(?:[^\n]*\S)?')
+
+class LineTable:
+    """The judgment text, kept once, with compact arrays of line offsets and kinds.
+
+    Line i is text[starts[i]:ends[i]], already stripped; blank lines are not
+    recorded. Lines are only sliced out of the text as they are read, so a
+    table costs the text itself plus nine bytes per line. Given the character
+    offset of each page (see join_pages), page_lines holds the number of the
+    first line of each page; otherwise it is None.
+    """
+
+    def __init__(self, text, page_starts=None):
+        self.text = text
+        offset_type = 'I' if len(text) <= 0xFFFFFFFF else 'Q'
+        self.starts = starts = array(offset_type)
+        self.ends = ends = array(offset_type)
+        self.kinds = kinds = array('B')
+        self.page_lines = page_lines = None if page_starts is None else array(offset_type)
+        pages = iter(page_starts or ())
+        next_page = next(pages, None)
+        for match in LINE_SPAN_RE.finditer(text):
+            start, end = match.span()
+            while next_page is not None and next_page <= start:
+                page_lines.append(len(kinds))
+                next_page = next(pages, None)
+            starts.append(start)
+            ends.append(end)
+            kinds.append(classify_line(match.group()))
+        while next_page is not None:
+            page_lines.append(len(kinds))
+            next_page = next(pages, None)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def line(self, line_no):
+        return self.text[self.starts[line_no]:self.ends[line_no]]
+
+    def __iter__(self):
+        text = self.text
+        for kind, start, end in zip(self.kinds, self.starts, self.ends):
+            yield kind, text[start:end]
+
+def tokenize_judgment(text, page_starts=None):
+    """Find and classify every line of judgment text once (mapping lines to pages when page_starts is given)."""
+    return LineTable(text, page_starts)
+
+def as_line_table(text):
+    """Accept either raw text or an already tokenized LineTable."""
+    if isinstance(text, LineTable):
+        return text
+    return tokenize_judgment(text)
+
+# =====================
+#  JUDGMENT MODEL - PARSED ONCE, RENDERED ONCE
+# =====================
+
+class ModelNode:
+    """Base for the compact judgment model; fields are declared in __slots__."""
+    __slots__ = ()
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+def _fingerprint(*fields):
+    return hashlib.blake2b(json.dumps(fields, ensure_ascii=False).encode('utf-8'), digest_size=16).hexdigest()
+
+def page_of(page_lines, line_no):
+    """1-based page of a line, given the number of the first line of each page."""
+    return bisect_right(page_lines, line_no)
+
+def locate_pages(nodes, page_lines):
+    """Fill in the pages of sections or index entries (no-op without a page map); returns nodes."""
+    if page_lines is not None:
+        for node in nodes:
+            node.locate(page_lines)
+    return nodes
+
+class LineSpanNode(ModelNode):
+    """A node covering lines [line_start, line_end) of the line table, and the pages they are on."""
+    __slots__ = ()
+
+    def locate(self, page_lines):
+        """Set page_start and page_end from the line offsets."""
+        self.page_start = page_of(page_lines, self.line_start)
+        self.page_end = page_of(page_lines, self.line_end - 1)
+
+class SubPoint(LineSpanNode):
+    """An I./a./i. sub-point of a numbered paragraph; style is roman, letter or small_roman."""
+    __slots__ = ('style', 'number', 'content', 'line_start', 'line_end', 'page_start', 'page_end')
+
+    def __init__(self, style, number, content, line_start=0, line_end=0, page_start=None, page_end=None):
+        self.style = style
+        self.number = number
+        self.content = content
+        self.line_start = line_start
+        self.line_end = line_end
+        self.page_start = page_start
+        self.page_end = page_end
+
+class Paragraph(LineSpanNode):
+    """A numbered paragraph with its sub-points; line offsets are [start, end) into the line table."""
+    __slots__ = ('number', 'content', 'sub_points', 'is_citation', 'line_start', 'line_end',
+                 'page_start', 'page_end')
+    tag = 'paragraph'
+
+    def __init__(self, number, content, sub_points=(), is_citation=False, line_start=0, line_end=0,
+                 page_start=None, page_end=None):
+        self.number = number
+        self.content = content
+        self.sub_points = list(sub_points)
+        self.is_citation = is_citation
+        self.line_start = line_start
+        self.line_end = line_end
+        self.page_start = page_start
+        self.page_end = page_end
+
+    def locate(self, page_lines):
+        super().locate(page_lines)
+        for sub in self.sub_points:
+            sub.locate(page_lines)
+
+    def fingerprint(self):
+        """Digest of everything the paragraph's HTML depends on, sub-points included."""
+        return _fingerprint(self.tag, self.number, self.content, self.is_citation,
+                            [(sub.style, sub.number, sub.content) for sub in self.sub_points])
+
+    def plain_text(self):
+        """The paragraph and its sub-points as unformatted text."""
+        parts = [f"{self.number}. {self.content}"]
+        parts.extend(f"{sub.number} {sub.content}" for sub in self.sub_points)
+        return " ".join(parts)
+
+    def to_dict(self):
+        data = super().to_dict()
+        data['sub_points'] = [sub.to_dict() for sub in self.sub_points]
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        data['sub_points'] = [SubPoint.from_dict(sub) for sub in data['sub_points']]
+        return cls(**data)
+
+class SectionHeader(LineSpanNode):
+    """A lettered section header such as "B. ANALYSIS"."""
+    __slots__ = ('title', 'line_start', 'line_end', 'page_start', 'page_end')
+    tag = 'section_header'
+
+    def __init__(self, title, line_start=0, line_end=0, page_start=None, page_end=None):
+        self.title = title
+        self.line_start = line_start
+        self.line_end = line_end
+        self.page_start = page_start
+        self.page_end = page_end
+
+    def fingerprint(self):
+        return _fingerprint(self.tag, self.title)
+
+class IndexEntry(ModelNode):
+    """One line of the judgment's INDEX block; css_class gives its nesting level."""
+    __slots__ = ('content', 'css_class', 'line', 'page_start', 'page_end')
+
+    def __init__(self, content, css_class, line=0, page_start=None, page_end=None):
+        self.content = content
+        self.css_class = css_class
+        self.line = line
+        self.page_start = page_start
+        self.page_end = page_end
+
+    def locate(self, page_lines):
+        self.page_start = self.page_end = page_of(page_lines, self.line)
+
+class Citation(ModelNode):
+    """A normalized law-report citation and the number of the paragraph citing it."""
+    __slots__ = ('reporter', 'year', 'volume', 'page', 'paragraph')
+
+    def __init__(self, reporter, year, volume, page, paragraph=''):
+        self.reporter = reporter
+        self.year = year
+        self.volume = volume
+        self.page = page
+        self.paragraph = paragraph
+
+    @property
+    def key(self):
+        """Canonical spelling, e.g. "(2017) 10 SCC 1"."""
+        return citation_key(self.reporter, self.year, self.volume, self.page)
+
+def extract_citations(paragraphs):
+    """Citation records for each paragraph (sub-points included), once per paragraph and citation."""
+    citations = []
+    for paragraph in paragraphs:
+        seen = set()
+        for text in [paragraph.content] + [sub.content for sub in paragraph.sub_points]:
+            for citation in iter_citations(text):
+                if citation not in seen:
+                    seen.add(citation)
+                    citations.append(Citation(*citation, paragraph=paragraph.number))
+    return citations
+
+SECTION_TYPES = {cls.tag: cls for cls in (Paragraph, SectionHeader)}
+
+class Judgment(ModelNode):
+    """A parsed judgment: metadata dict, index entries and body sections in order."""
+    __slots__ = ('metadata', 'index_items', 'sections')
+
+    def __init__(self, metadata, index_items, sections):
+        self.metadata = metadata
+        self.index_items = list(index_items)
+        self.sections = list(sections)
+
+    @property
+    def paragraphs(self):
+        return [section for section in self.sections if isinstance(section, Paragraph)]
+
+    @property
+    def citation_count(self):
+        return sum(1 for paragraph in self.paragraphs if paragraph.is_citation)
+
+    @property
+    def sub_point_count(self):
+        return sum(len(paragraph.sub_points) for paragraph in self.paragraphs)
+
+    @property
+    def citations(self):
+        return extract_citations(self.paragraphs)
+
+    def to_dict(self):
+        return {
+            'metadata': self.metadata,
+            'index_items': [item.to_dict() for item in self.index_items],
+            'sections': [dict(section.to_dict(), type=section.tag) for section in self.sections]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sections = []
+        for section in data['sections']:
+            section = dict(section)
+            sections.append(SECTION_TYPES[section.pop('type')].from_dict(section))
+        return cls(
+            data['metadata'],
+            [IndexEntry.from_dict(item) for item in data['index_items']],
+            sections
+        )
+
+# Metadata lives in the first and last few lines, plus a handful of markers anywhere
+HEAD_LINES = 25
+TAIL_LINES = 20
+SIGNATURE_LINES = 10
+PARTY_LOOKBACK = 4
+MAX_BENCH_JUDGES = 3
+
+CITATION_NUMBER_RE = re.compile(r'\d{4}\s+INSC\s+\d+')
+# "<kind> ... No. ... 123 ... of ... 2024", tried kind by kind. Rather than one
+# regex of lazy gaps (which backtracks quadratically on long lines that almost
+# match), each step is searched for after the end of the previous one.
+CASE_NUMBER_KINDS = [
+    re.compile(r'SPECIAL LEAVE PETITION', re.IGNORECASE),
+    re.compile(r'Civil Appeal', re.IGNORECASE),
+    re.compile(r'Criminal Appeal', re.IGNORECASE),
+    re.compile(r'W\.P\.', re.IGNORECASE),
+    re.compile(r'TRANSFER PETITION', re.IGNORECASE)
+]
+CASE_NUMBER_STEPS = [
+    re.compile(r'No\.', re.IGNORECASE),
+    re.compile(r'\d+'),
+    re.compile(r'of', re.IGNORECASE),
+    re.compile(r'\d+')
+]
+FORBIDDEN_PARTY_KEYWORDS = ['COURT', 'JUDGMENT', 'DATE', 'BENCH', 'CITATION', 'VERSUS', 'JURISDICTION', 'PETITION']
+PETITIONER_MARK_RE = re.compile(r'…PETITIONER', re.I)
+RESPONDENT_MARK_RE = re.compile(r'…RESPONDENT', re.I)
+JUDGMENT_DATE_RE = re.compile(r'(\d{1,2})(?:st|nd|rd|th)\s+([A-Za-z]+)\s*,\s*(\d{4})')
+# Bench and author are only looked for in the header (up to the first numbered
+# paragraph after the parties, at most BENCH_HEADER_LINES lines, including any
+# CORAM block) and in the signature block; never in the body
+BENCH_HEADER_LINES = 60
+# "HON'BLE ... JUSTICE ... J." is found with three forward searches, not a lazy regex
+HONBLE_RE = re.compile(r"HON'BLE", re.IGNORECASE)
+JUSTICE_RE = re.compile(r'JUSTICE', re.IGNORECASE)
+JUDGE_SUFFIX_RE = re.compile(r'J\.', re.IGNORECASE)
+CORAM_RE = re.compile(r'CORAM\b\s*:?\s*', re.IGNORECASE)
+SIGNATURE_RE = re.compile(r'\(([A-Z\.\s]+)\)')
+# The author line ends in "J." ("J.B. PARDIWALA, J.")
+JUDGE_NAME_RE = re.compile(r'([A-Z][A-Z\.\s]+,?\s*J\.)$')
+
+def find_bench_mentions(line):
+    """Every "HON'BLE ... JUSTICE ... J." in a line, shortest first match, in linear time."""
+    mentions = []
+    pos = 0
+    while True:
+        start = HONBLE_RE.search(line, pos)
+        justice = start and JUSTICE_RE.search(line, start.end())
+        end = justice and JUDGE_SUFFIX_RE.search(line, justice.end())
+        if not end:
+            return mentions
+        mentions.append(line[start.start():end.end()])
+        pos = end.end()
+
+class MetadataScanner:
+    """Incremental metadata extraction over stripped, non-empty lines.
+
+    Only the header and tail windows plus a few look-back lines are kept, so
+    the scanner can sit on a page stream without holding the whole judgment.
+    """
+
+    def __init__(self):
+        self.head = []
+        self.tail = deque(maxlen=TAIL_LINES)
+        self.recent = deque(maxlen=PARTY_LOOKBACK)
+        self.line_count = 0
+        self.petitioner = ""
+        self.respondent = ""
+        self.petitioner_found = False
+        self.respondent_found = False
+        self.bench_judges = []
+        self.in_header = True
+        self.in_coram = False
+        self.judge = ""
+        self.convenience_note = ""
+
+    def feed(self, line, kind=LINE_TEXT):
+        """Consume the next line of the judgment and its classification."""
+        if self.line_count < HEAD_LINES:
+            self.head.append(line)
+        self.tail.append(line)
+
+        if kind & LINE_PARTY and not (self.petitioner_found and self.respondent_found):
+            self._scan_parties(line)
+
+        if self.in_header:
+            # The body starts at the first numbered paragraph after the parties
+            if (self.line_count >= BENCH_HEADER_LINES
+                    or (kind & LINE_KIND_MASK == LINE_PARAGRAPH and self.respondent_found)):
+                self.in_header = False
+            else:
+                self._scan_bench(line)
+
+        if not self.convenience_note and "convenience of exposition" in line.lower():
+            self.convenience_note = line
+
+        self.recent.append(line)
+        self.line_count += 1
+
+    def _scan_bench(self, line):
+        """Collect bench judges and the author judge from one header line."""
+        coram = CORAM_RE.match(line)
+        if coram:
+            self.in_coram = True
+            line = line[coram.end():]
+
+        if len(self.bench_judges) < MAX_BENCH_JUDGES:
+            mentions = find_bench_mentions(line)
+            # A CORAM block may list judges without the HON'BLE prefix
+            if not mentions and self.in_coram and "JUSTICE" in line.upper():
+                mentions = [line]
+            elif not mentions and not coram:
+                self.in_coram = False
+            for mention in mentions:
+                if mention not in self.bench_judges:
+                    self.bench_judges.append(mention)
+
+        # Main judge name (usually the first one or the one writing the judgment)
+        if not self.judge and not self.in_coram and len(line) < 50 and "HON" not in line:
+            judge_match = JUDGE_NAME_RE.search(line)
+            if judge_match:
+                self.judge = judge_match.group(0).strip()
+
+    def _look_back(self):
+        """Collect preceding party-name lines, oldest first."""
+        names = []
+        # The very first line of the document is never treated as a party name
+        for _, potential in zip(range(self.line_count - 1, 0, -1), reversed(self.recent)):
+            if any(x in potential.upper() for x in FORBIDDEN_PARTY_KEYWORDS):
                 break
-        if metadata["case_number"]:
-            break
-    
-    # Extract parties with improved logic
-    petitioner_found = False
-    respondent_found = False
-    forbidden_keywords = ['COURT', 'JUDGMENT', 'DATE', 'BENCH', 'CITATION', 'VERSUS', 'JURISDICTION', 'PETITION']
-    
-    for i, line in enumerate(lines):
+            names.insert(0, potential)
+        return names
+
+    def _scan_parties(self, line):
         line_upper = line.upper()
-        
+
         # Look for petitioner
         if "…PETITIONER" in line_upper:
-            petitioner_lines = []
+            petitioner_lines = self._look_back()
             # Extract from current line before designation
-            parts = re.split(r'\s*…PETITIONER', line, flags=re.I)
-            if parts[0].strip():
-                petitioner_lines.append(parts[0].strip())
-            # Look backwards for additional name parts
-            for j in range(i-1, max(0, i-5), -1):
-                potential = lines[j].strip()
-                if not potential:
-                    break
-                if any(x in potential.upper() for x in forbidden_keywords):
-                    break
-                petitioner_lines.insert(0, potential)
+            name = text_before(PETITIONER_MARK_RE, line)
+            if name:
+                petitioner_lines.append(name)
             if petitioner_lines:
-                metadata["petitioner"] = clean_party_name(' '.join(petitioner_lines))
-                petitioner_found = True
-        
+                self.petitioner = clean_party_name(' '.join(petitioner_lines))
+                self.petitioner_found = True
+
         # Look for respondent
         if "…RESPONDENT" in line_upper:
-            respondent_lines = []
-            # Extract from current line before designation
-            parts = re.split(r'\s*…RESPONDENT\(?S\)?', line, flags=re.I)
-            if parts[0].strip():
-                respondent_lines.append(parts[0].strip())
-            # Look backwards for additional name parts
-            for j in range(i-1, max(0, i-5), -1):
-                potential = lines[j].strip()
-                if not potential:
-                    break
-                if any(x in potential.upper() for x in forbidden_keywords):
-                    break
-                respondent_lines.insert(0, potential)
+            respondent_lines = self._look_back()
+            name = text_before(RESPONDENT_MARK_RE, line)
+            if name:
+                respondent_lines.append(name)
             if respondent_lines:
-                metadata["respondent"] = clean_party_name(' '.join(respondent_lines))
-                respondent_found = True
-        
-        if petitioner_found and respondent_found:
-            break
-    
-    # Extract judgment date from the end if not found in beginning
-    if not metadata["judgment_date"]:
-        for line in lines[-20:]:
+                self.respondent = clean_party_name(' '.join(respondent_lines))
+                self.respondent_found = True
+
+    def result(self):
+        """Return the metadata dict for everything fed so far."""
+        lines = self.head
+        tail = list(self.tail)
+
+        metadata = {
+            "citation_number": "",
+            "reportable": "",
+            "court_name": "",
+            "jurisdiction": "",
+            "case_number": "",
+            "judgment_date": "",
+            "petitioner": self.petitioner,
+            "respondent": self.respondent,
+            "bench_info": "",
+            "judge": self.judge,
+            "convenience_note": self.convenience_note,
+            "show_judgment_header": True
+        }
+
+        # Extract citation number from first few lines
+        for line in lines[:5]:
+            if CITATION_NUMBER_RE.match(line):
+                metadata["citation_number"] = line
+                break
+
+        # Extract REPORTABLE status
+        for line in lines[:10]:
+            if "REPORTABLE" in line.upper():
+                metadata["reportable"] = line
+                break
+
+        # Extract court name - look for "Supreme Court" or similar
+        for line in lines[:15]:
+            if "SUPREME COURT OF INDIA" in line.upper():
+                metadata["court_name"] = "Supreme Court of India"
+                break
+            elif "Supreme Court" in line:
+                metadata["court_name"] = line.strip()
+                break
+            elif "High Court" in line:
+                metadata["court_name"] = line.strip()
+                break
+
+        # Extract jurisdiction
+        for line in lines[:20]:
+            if "CIVIL APPELLATE JURISDICTION" in line.upper():
+                metadata["jurisdiction"] = line.strip()
+                break
+            elif "CRIMINAL APPELLATE JURISDICTION" in line.upper():
+                metadata["jurisdiction"] = line.strip()
+                break
+            elif "JURISDICTION" in line.upper() and len(line) < 50:
+                metadata["jurisdiction"] = line.strip()
+                break
+
+        # Extract case number with better pattern matching
+        for line in lines[:HEAD_LINES]:
+            case_number = find_case_number(line)
+            if case_number:
+                metadata["case_number"] = case_number
+                break
+
+        # Extract judgment date from the end
+        for line in tail:
             # Look for patterns like "14th August, 2025"
-            date_match = re.search(r'(\d{1,2})(?:st|nd|rd|th)\s+([A-Za-z]+)\s*,\s*(\d{4})', line)
+            date_match = JUDGMENT_DATE_RE.search(line)
             if date_match:
                 day = date_match.group(1).zfill(2)
                 month_str = date_match.group(2)
@@ -602,298 +1203,448 @@ def extract_comprehensive_metadata(text):
                     break
                 except ValueError:
                     pass
-    
-    # Extract bench information - improved to look for judge names at end
-    bench_judges = []
-    judge_patterns = [
-        r'HON\'BLE.*?JUSTICE.*?J\.',
-        r'HON\'BLE MR\. JUSTICE.*?J\.',
-        r'HON\'BLE MS\. JUSTICE.*?J\.'
-    ]
-    for line in lines:
-        for pattern in judge_patterns:
-            matches = re.findall(pattern, line, re.IGNORECASE)
-            bench_judges.extend(matches)
-    
-    # If not found, look at signatures
-    if not bench_judges:
-        last_text = ' '.join(lines[-10:])
-        judge_matches = re.findall(r'\(\s*([A-Z\.\s]+)\s*\)', last_text)
-        for match in judge_matches:
-            full_name = match.strip().replace('.', '. ').strip()
-            bench_judges.append(f"HON'BLE MR. JUSTICE {full_name}")
-    
-    if bench_judges:
-        metadata["bench_info"] = "<br>".join(bench_judges[:3])  # Limit to 3 judges
-    
-    # Extract main judge name (usually the first one or the one writing the judgment)
-    for line in lines:
-        judge_match = re.search(r'([A-Z][A-Z\.\s]+J\.)', line)
-        if judge_match and len(line) < 50 and "HON" not in line:
-            metadata["judge"] = judge_match.group(0).strip()
-            break
-    
-    # Extract convenience note
-    for line in lines:
-        if "convenience of exposition" in line.lower():
-            metadata["convenience_note"] = line.strip()
-            break
-    
-    return metadata
+
+        # Bench information - if no HON'BLE lines were seen, look at signatures
+        bench_judges = list(self.bench_judges)
+        if not bench_judges:
+            last_text = ' '.join(tail[-SIGNATURE_LINES:])
+            for match in SIGNATURE_RE.findall(last_text):
+                full_name = match.strip().replace('.', '. ').strip()
+                bench_judges.append(f"HON'BLE MR. JUSTICE {full_name}")
+
+        if bench_judges:
+            metadata["bench_info"] = "<br>".join(bench_judges[:MAX_BENCH_JUDGES])  # Limit to 3 judges
+
+        return metadata
+
+def extract_comprehensive_metadata(text):
+    """Extract comprehensive metadata from judgment text (or a LineTable) with improved header parsing."""
+    scanner = MetadataScanner()
+    for kind, line in as_line_table(text):
+        scanner.feed(line, kind)
+    return scanner.result()
+
+# Metadata-only reads start with this many pages from each end of the PDF
+METADATA_HEAD_PAGES = 2
+METADATA_TAIL_PAGES = 2
+# ...and never read more than this many from either end, whatever is still missing
+METADATA_MAX_PAGES = 16
+# Fields a catalogue entry needs, and those that come from the header
+CATALOGUE_FIELDS = ('court_name', 'case_number', 'petitioner', 'respondent', 'bench_info', 'judgment_date')
+HEAD_FIELDS = ('court_name', 'case_number', 'petitioner', 'respondent', 'bench_info')
+
+def _page_tokens(doc, page_num):
+    return list(iter_tokens(iter_text_lines((clean_page_text(doc[page_num].get_text()),))))
+
+def extract_pdf_metadata(pdf_file, head_pages=METADATA_HEAD_PAGES, tail_pages=METADATA_TAIL_PAGES,
+                         required=CATALOGUE_FIELDS, max_pages=METADATA_MAX_PAGES):
+    """Extract the metadata dict from the first and last pages of a PDF, without parsing the body.
+
+    Like the full-text extraction, only the header lines and the last
+    TAIL_LINES lines are looked at. While a required header field is still
+    empty and more pages could supply it (the header is short of lines or
+    the parties have not been found), the head window is doubled and only
+    the new pages are scanned. The tail is read backwards until it holds
+    TAIL_LINES lines. Neither end grows past max_pages; a field not found
+    by then is left empty.
+    """
+    doc = open_pdf(read_pdf_source(pdf_file))
+    try:
+        page_count = doc.page_count
+        max_pages = min(max_pages, page_count)
+        scanner = MetadataScanner()
+        head_end = 0
+        while True:
+            for page_num in range(head_end, min(head_pages, max_pages)):
+                for kind, line in _page_tokens(doc, page_num):
+                    scanner.feed(line, kind)
+                head_end = page_num + 1
+            metadata = scanner.result()
+            missing = [field for field in required if field in HEAD_FIELDS and not metadata.get(field)]
+            header_read = scanner.line_count >= BENCH_HEADER_LINES
+            parties_found = scanner.petitioner_found and scanner.respondent_found
+            if not missing or head_end >= max_pages or (header_read and parties_found):
+                break
+            head_pages *= 2
+
+        # Fed after the header, in document order, so the scanner's tail window is the document's
+        tail = deque()
+        tail_lines = 0
+        tail_start = page_count
+        while (tail_start > head_end and page_count - tail_start < max_pages
+               and (page_count - tail_start < tail_pages or tail_lines < TAIL_LINES)):
+            tail_start -= 1
+            tokens = _page_tokens(doc, tail_start)
+            tail.appendleft(tokens)
+            tail_lines += len(tokens)
+        for tokens in tail:
+            for kind, line in tokens:
+                scanner.feed(line, kind)
+        return scanner.result()
+    finally:
+        doc.close()
+
+def find_case_number(line):
+    """The first "<kind> ... No. ... N ... of ... YYYY" span of a line, or None.
+
+    Same result as the lazy regexes it replaces: the kinds are tried in order,
+    and for the first occurrence of a kind every later step takes the earliest
+    match after the previous one.
+    """
+    for kind in CASE_NUMBER_KINDS:
+        match = kind.search(line)
+        if not match:
+            continue
+        end = match.end()
+        for step in CASE_NUMBER_STEPS:
+            step_match = step.search(line, end)
+            if not step_match:
+                break
+            end = step_match.end()
+        else:
+            return line[match.start():end].strip()
+    return None
+
+def text_before(pattern, line):
+    """The stripped part of line before the first match of pattern (all of it without one)."""
+    match = pattern.search(line)
+    return (line[:match.start()] if match else line).strip()
+
+PARTY_PREFIX_RE = re.compile(r'^M/s\s*', re.IGNORECASE)
 
 def clean_party_name(name):
     """Clean party names more effectively."""
     # Remove common prefixes and suffixes
-    name = re.sub(r'^M/s\s*', 'M/s ', name, flags=re.IGNORECASE)
-    name = re.sub(r'^M/S\s*', 'M/s ', name, flags=re.IGNORECASE)
-    name = re.sub(r'\s*….*$', '', name)  # Remove …PETITIONER etc
+    name = PARTY_PREFIX_RE.sub('M/s ', name)
+    # Remove …PETITIONER etc
+    designation = name.find('…')
+    if designation != -1:
+        name = name[:designation]
     return name.strip()
 
-def extract_enhanced_index_items(text):
-    """Extract index items with proper hierarchical structure."""
-    lines = text.split('\n')
-    index_items = []
-    
-    in_index = False
-    for i, line in enumerate(lines):
-        line = line.strip()
-        
+def strip_index_page_suffix(line):
+    r"""Drop a trailing "..... 2" page reference from an index line.
+
+    Same result as re.sub(r'\s*\.{2,}\s*\d+$', '', line) on a stripped line, but
+    scanned once from the end: the regex retries a long dot run from every dot.
+    """
+    end = len(line)
+    while end and line[end - 1].isdecimal():
+        end -= 1
+    if end == len(line):
+        return line
+    end = len(line[:end].rstrip())
+    dots = end
+    while dots and line[dots - 1] == '.':
+        dots -= 1
+    if end - dots < 2:
+        return line
+    return line[:dots].rstrip()
+
+MAX_INDEX_ITEMS = 25
+
+class IndexScanner:
+    """Incremental index extraction; stops consuming once the index block has ended."""
+
+    def __init__(self):
+        self.items = []
+        self.in_index = False
+        self.done = False
+
+    def feed(self, line, kind=LINE_TEXT, line_no=0):
+        """Consume the next stripped line of the judgment and its classification."""
+        if self.done:
+            return
+
         if 'INDEX' in line.upper() and len(line) < 25:
-            in_index = True
-            continue
-        
-        if in_index:
+            self.in_index = True
+            return
+
+        if self.in_index and line:
             # Stop when we hit the first numbered paragraph
-            if re.match(r'^\d+\.', line):
-                break
-                
-            if line:
-                cleaned_line = re.sub(r'\s*\.{2,}\s*\d+$', '', line).strip()  # Remove ..... 2
-                
-                # Main sections (A., B., C., etc.)
-                if re.match(r'^[A-Z]\.', cleaned_line):
-                    index_items.append({
-                        'content': cleaned_line,
-                        'class': 'index-main'
-                    })
-                # Roman numerals (I., II., III., etc.)
-                elif re.match(r'^[IVX]+\.', cleaned_line):
-                    index_items.append({
-                        'content': cleaned_line,
-                        'class': 'index-sub'
-                    })
-                # Letter sub-points (a., b., c., etc.)
-                elif re.match(r'^[a-z]\.', cleaned_line):
-                    index_items.append({
-                        'content': cleaned_line,
-                        'class': 'index-sub-sub'
-                    })
-                # Small roman sub-points (i., ii., iii., etc.)
-                elif re.match(r'^[ivx]+\.', cleaned_line):
-                    index_items.append({
-                        'content': cleaned_line,
-                        'class': 'index-sub-sub-sub'
-                    })
-                # Any other meaningful line
-                elif len(cleaned_line) > 5 and not cleaned_line.startswith('For the'):
-                    index_items.append({
-                        'content': cleaned_line,
-                        'class': 'index-item'
-                    })
-        
-        if len(index_items) > 30:  # Prevent too many items
+            if kind & LINE_KIND_MASK == LINE_PARAGRAPH:
+                self.done = True
+                return
+
+            cleaned_line = strip_index_page_suffix(line).strip()
+            if cleaned_line != line:
+                kind = classify_line(cleaned_line)
+            kind &= LINE_KIND_MASK
+
+            # Main sections (A., B., C., etc.)
+            if len(cleaned_line) > 1 and cleaned_line[1] == '.' and 'A' <= cleaned_line[0] <= 'Z':
+                self.items.append(IndexEntry(cleaned_line, 'index-main', line_no))
+            # Roman numerals (I., II., III., etc.)
+            elif kind == LINE_ROMAN:
+                self.items.append(IndexEntry(cleaned_line, 'index-sub', line_no))
+            # Letter sub-points (a., b., c., etc.)
+            elif kind == LINE_LETTER:
+                self.items.append(IndexEntry(cleaned_line, 'index-sub-sub', line_no))
+            # Small roman sub-points (i., ii., iii., etc.)
+            elif kind == LINE_SMALL_ROMAN:
+                self.items.append(IndexEntry(cleaned_line, 'index-sub-sub-sub', line_no))
+            # Any other meaningful line
+            elif len(cleaned_line) > 5 and not cleaned_line.startswith('For the'):
+                self.items.append(IndexEntry(cleaned_line, 'index-item', line_no))
+
+        if len(self.items) > 30:  # Prevent too many items
+            self.done = True
+
+    def result(self):
+        return self.items[:MAX_INDEX_ITEMS]
+
+def extract_enhanced_index_items(text):
+    """Extract index items (from text or a LineTable) with proper hierarchical structure."""
+    table = as_line_table(text)
+    scanner = IndexScanner()
+    for line_no, (kind, line) in enumerate(table):
+        scanner.feed(line, kind, line_no)
+        if scanner.done:
             break
-    
-    return index_items[:25]
+    return locate_pages(scanner.result(), table.page_lines)
+
+# Citation indicators, scanned together in one case-insensitive pass.
+# Every indicator starts at a word boundary, so the leading \b is factored out
+# and a lookahead on the possible first characters skips all other positions.
+# The two case-name indicators share the "v." / "vs." anchor and are
+# confirmed by linear scans around it (see _case_name_indicators).
+CITATION_INDICATOR_PATTERNS = [
+    ('scc', r'\d{4}\s+\d+\s+SCC\s+\d+\b'),                  # SCC citations
+    ('manu', r'MANU/SC/\d+/\d+\b'),                        # MANU citations
+    ('scc_year', r'\(\d{4}\)\s*\d+\s+SCC\s+\d+\b'),        # Year SCC format
+    ('air', r'AIR\s+\d{4}\s+SC\s+\d+\b'),                  # AIR citations
+    ('scr', r'\d{4}\s+\d+\s+SCR\s+\d+\b'),                 # SCR citations
+    ('jt', r'JT\s+\d{4}\s+\(\d+\)\s+SC\s+\d+\b'),          # JT citations
+    ('scc_supp', r'\d{4}\s+Supp\s+\(\d+\)\s+SCC\s+\d+\b'),   # Supplement SCC
+    ('versus', r'vs?\.\s+'),                               # Case names with vs.
+    ('supra', r'supra\b'),                                 # Legal references
+    ('infra', r'infra\b'),
+    ('ibid', r'ibid\b'),
+    ('para', r'para\s*\d+\b'),                             # Paragraph references
+    ('paras', r'paras?\.\s*\d+\b'),
+    ('see_also', r'See also\b'),                           # Reference indicators
+    ('referred_to', r'Referred to in\b'),
+]
+CITATION_INDICATORS_RE = re.compile(
+    r'\b(?=[\d(ajmprsvi])(?:'
+    + '|'.join(f'(?P<{name}>{pattern})' for name, pattern in CITATION_INDICATOR_PATTERNS)
+    + ')',
+    re.IGNORECASE
+)
+# Paragraphs shorter than this need only one indicator to count as citations
+SHORT_CITATION_PARAGRAPH = 200
+
+# Characters of [a-zA-Z\s&] under IGNORECASE, minus whitespace (tested separately)
+CASE_NAME_LETTERS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZİıſK')
+
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+def _name_follows(text, start):
+    r"""True if `[A-Z][a-zA-Z\s&]+\b` (IGNORECASE) matches at `start`.
+
+    Scans forward only until the first usable word boundary, so the cost is
+    bounded by the name itself rather than by the rest of the paragraph.
+    """
+    n = len(text)
+    if start >= n or text[start] not in CASE_NAME_LETTERS:
+        return False
+    pos = start + 1
+    while pos < n and (text[pos] in CASE_NAME_LETTERS or text[pos] == '&' or text[pos].isspace()):
+        pos += 1
+        # Word boundary after at least one character of the run
+        after = _is_word_char(text[pos]) if pos < n else False
+        if _is_word_char(text[pos - 1]) != after:
+            return True
+    return False
+
+def _name_precedes(text, end):
+    r"""True if `\b[A-Z][a-zA-Z\s&]+` (IGNORECASE) can end exactly at `end`.
+
+    Scans backward only through the run of name characters before `end`.
+    """
+    pos = end - 1
+    while pos >= 0 and (text[pos] in CASE_NAME_LETTERS or text[pos] == '&' or text[pos].isspace()):
+        # A name can start at pos - 1 if that is a letter at a word boundary
+        start = pos - 1
+        if start >= 0 and text[start] in CASE_NAME_LETTERS and (start == 0 or not _is_word_char(text[start - 1])):
+            return True
+        pos -= 1
+    return False
+
+def _case_name_indicators(text, match):
+    r"""Indicators confirmed by a "v." / "vs." anchor: 'versus' and, with a name before it, 'case_name'.
+
+    Equivalent to `\bvs?\.\s+[A-Z][a-zA-Z\s&]+\b` and
+    `\b[A-Z][a-zA-Z\s&]+ vs?\. [A-Z][a-zA-Z\s&]+\b`, without their backtracking.
+    """
+    found = set()
+    if not _name_follows(text, match.end()):
+        return found
+    found.add('versus')
+    start = match.start()
+    # The full case name needs exactly one space on either side of the anchor
+    if (text[match.end() - 2:match.end()] == '. ' and start > 0 and text[start - 1] == ' ' and _name_precedes(text, start - 1)):
+        found.add('case_name')
+    return found
+
+def find_citation_indicators(content, needed=None):
+    """Return the set of citation indicator names that occur in content.
+
+    One combined scan; with `needed`, it stops as soon as that many distinct
+    indicators have been found. Each search resumes one character after the
+    previous match start so overlapping indicators are still seen.
+    """
+    found = set()
+    pos = 0
+    searches = 0
+    while needed is None or len(found) < needed:
+        match = CITATION_INDICATORS_RE.search(content, pos)
+        searches += 1
+        if match is None:
+            break
+        if match.lastgroup == 'versus':
+            found |= _case_name_indicators(content, match)
+        else:
+            found.add(match.lastgroup)
+        pos = match.start() + 1
+    add_count('regex_calls', searches)
+    return found
 
 def is_citation_paragraph(content):
     """Determine if a paragraph contains legal citations."""
-    citation_indicators = [
-        r'\b\d{4}\s+\d+\s+SCC\s+\d+\b',  # SCC citations
-        r'\bMANU/SC/\d+/\d+\b',  # MANU citations
-        r'\b\(\d{4}\)\s*\d+\s+SCC\s+\d+\b',  # Year SCC format
-        r'\bAIR\s+\d{4}\s+SC\s+\d+\b',  # AIR citations
-        r'\b\d{4}\s+\d+\s+SCR\s+\d+\b',  # SCR citations
-        r'\bJT\s+\d{4}\s+\(\d+\)\s+SC\s+\d+\b',  # JT citations
-        r'\b\d{4}\s+Supp\s+\(\d+\)\s+SCC\s+\d+\b',  # Supplement SCC
-        r'\bvs?\.\s+[A-Z][a-zA-Z\s&]+\b',  # Case names with vs.
-        r'\b[A-Z][a-zA-Z\s&]+ vs?\. [A-Z][a-zA-Z\s&]+\b',  # Full case names
-        r'\bsupra\b', r'\binfra\b', r'\bibid\b',  # Legal references
-        r'\bpara\s*\d+\b', r'\bparas?\.\s*\d+\b',  # Paragraph references
-        r'\bSee also\b', r'\bReferred to in\b',  # Reference indicators
-    ]
-    
-    citation_count = sum(1 for pattern in citation_indicators if re.search(pattern, content, re.IGNORECASE))
-    
-    # If multiple citation patterns found, likely a citation paragraph
-    return citation_count >= 2 or (citation_count >= 1 and len(content) < 200)
-
-def parse_judgment_content_enhanced(text):
-    """Enhanced parsing with proper sub-numbering preservation and citation detection."""
-    # Normalize text and split into lines
-    normalized = re.sub(r'^\s*Page\s+\d+\s+of\s+\d+\s*$', '', text, flags=re.MULTILINE)
-    lines = [line.strip() for line in normalized.split('\n') if line.strip()]
-    sections = []
-
-    # Find the first numbered paragraph as starting point
-    start_idx = None
-    for i, line in enumerate(lines):
-        if re.match(r'^1\.\s*', line):
+    # If multiple citation patterns found, likely a citation paragraph;
+    # a short paragraph needs only one
+    needed = 1 if len(content) < SHORT_CITATION_PARAGRAPH else 2
+    return len(find_citation_indicators(content, needed)) >= needed
+
+def _skip_preamble(tokens):
+    """Yield (line_no, kind, line) tokens starting at the first numbered paragraph.
+
+    Only the preamble (header and index) is buffered while looking for "1.";
+    a document without a "1." falls back to its first numbered line, or the start.
+    """
+    preamble = []
+    for token in tokens:
+        if token[1] == LINE_PARAGRAPH and token[2].startswith('1.'):
+            yield token
+            yield from tokens
+            return
+        preamble.append(token)
+
+    start_idx = 0
+    for i, (_, kind, _) in enumerate(preamble):
+        if kind == LINE_PARAGRAPH:
             start_idx = i
             break
+    yield from preamble[start_idx:]
 
-    if start_idx is None:
-        for i, line in enumerate(lines):
-            if re.match(r'^\d+\.\s*', line):
-                start_idx = i
-                break
+def _close_paragraph(paragraph, para_parts, level=FULL):
+    """Finish a paragraph once its last line has been seen."""
+    paragraph.content = " ".join(para_parts)
 
-    if start_idx is None:
-        start_idx = 0
+    # Determine if this is a citation paragraph (skipped once the budget has run short)
+    if level < NO_CITATION_STYLING:
+        with stage_timer('citation_detection'):
+            paragraph.is_citation = is_citation_paragraph(paragraph.content)
+    return paragraph
 
-    i = start_idx
-    while i < len(lines):
-        line = lines[i].strip()
+def _close_sub_point(paragraph, sub, sub_parts):
+    sub.content = " ".join(sub_parts)
+    paragraph.sub_points.append(sub)
 
-        # Main section headers (A., B., C., etc.)
-        if re.match(r'^[A-Z]\.\s*[A-Z]', line):
-            sections.append({'html': f'<div class="section-header">{escape_html(line)}</div>'})
-            i += 1
-            continue
+def iter_judgment_sections(tokens):
+    """Yield Paragraph and SectionHeader objects from (kind, line) tokens as soon as each one closes.
 
-        # Numbered paragraph
-        para_match = re.match(r'^(\d+)\.\s*(.*)', line)
-        if para_match:
-            para_num = para_match.group(1)
-            para_content = para_match.group(2).strip()
-
-            # Collect the full paragraph content
-            full_content = para_content
-            sub_content = []
-            j = i + 1
-
-            # Continue collecting content until next numbered paragraph or section
-            while j < len(lines):
-                next_line = lines[j].strip()
-                if not next_line:
-                    j += 1
-                    continue
-
-                # Stop at next main paragraph or section header
-                if re.match(r'^\d+\.\s*', next_line) or re.match(r'^[A-Z]\.\s*[A-Z]', next_line):
-                    break
+    A paragraph is emitted when the next numbered paragraph or section header
+    arrives, so only the paragraph being collected is held in memory. Every
+    decision reads the line kind computed once by classify_line. Line offsets
+    count every token, page markers included, so they index the LineTable.
+    Under a document budget that has run short, citation detection and then
+    sub-point detection are dropped for the paragraphs that follow.
+    """
+    budget = current_budget()
+    level = budget.level if budget is not None else FULL
+    tokens = iter((line_no, kind & LINE_KIND_MASK, line)
+                  for line_no, (kind, line) in enumerate(tokens)
+                  if kind & LINE_KIND_MASK != LINE_PAGE_MARKER)
 
-                # IMPROVED SUB-NUMBERING DETECTION WITH FULL CONTENT PRESERVATION
-                # Roman numerals (I., II., III., IV., V., VI., etc.)
-                roman_match = re.match(r'^([IVX]+)\.\s*(.*)', next_line)
-                if roman_match:
-                    roman_num = roman_match.group(1) + '.'
-                    roman_content = roman_match.group(2).strip()
-                    
-                    # Collect continuation lines for this sub-point
-                    k = j + 1
-                    while k < len(lines):
-                        continuation_line = lines[k].strip()
-                        if not continuation_line:
-                            k += 1
-                            continue
-                        # Stop if we hit another numbering or main paragraph
-                        if (re.match(r'^[IVX]+\.\s*', continuation_line) or 
-                            re.match(r'^[a-z]\.\s*', continuation_line) or 
-                            re.match(r'^[ivx]+\.\s*', continuation_line) or 
-                            re.match(r'^\d+\.\s*', continuation_line)):
-                            break
-                        roman_content += " " + continuation_line
-                        k += 1
-                    
-                    sub_content.append({
-                        'type': 'roman', 
-                        'number': roman_num, 
-                        'content': roman_content
-                    })
-                    j = k
-                    continue
-
-                # Letter sub-points (a., b., c., etc.)
-                letter_match = re.match(r'^([a-z])\.\s*(.*)', next_line)
-                if letter_match:
-                    letter_num = letter_match.group(1) + '.'
-                    letter_content = letter_match.group(2).strip()
-                    
-                    # Collect continuation lines
-                    k = j + 1
-                    while k < len(lines):
-                        continuation_line = lines[k].strip()
-                        if not continuation_line:
-                            k += 1
-                            continue
-                        if (re.match(r'^[a-z]\.\s*', continuation_line) or 
-                            re.match(r'^[ivx]+\.\s*', continuation_line) or 
-                            re.match(r'^[IVX]+\.\s*', continuation_line) or 
-                            re.match(r'^\d+\.\s*', continuation_line)):
-                            break
-                        letter_content += " " + continuation_line
-                        k += 1
-                    
-                    sub_content.append({
-                        'type': 'letter', 
-                        'number': letter_num, 
-                        'content': letter_content
-                    })
-                    j = k
-                    continue
-
-                # Small roman numerals (i., ii., iii., iv., v., etc.)
-                small_roman_match = re.match(r'^([ivx]+)\.\s*(.*)', next_line)
-                if small_roman_match:
-                    small_roman_num = small_roman_match.group(1) + '.'
-                    small_roman_content = small_roman_match.group(2).strip()
-                    
-                    # Collect continuation lines
-                    k = j + 1
-                    while k < len(lines):
-                        continuation_line = lines[k].strip()
-                        if not continuation_line:
-                            k += 1
-                            continue
-                        if (re.match(r'^[ivx]+\.\s*', continuation_line) or 
-                            re.match(r'^[a-z]\.\s*', continuation_line) or 
-                            re.match(r'^[IVX]+\.\s*', continuation_line) or 
-                            re.match(r'^\d+\.\s*', continuation_line)):
-                            break
-                        small_roman_content += " " + continuation_line
-                        k += 1
-                    
-                    sub_content.append({
-                        'type': 'small_roman', 
-                        'number': small_roman_num, 
-                        'content': small_roman_content
-                    })
-                    j = k
-                    continue
+    paragraph = None
+    para_parts = []
+    sub = None
+    sub_parts = []
+
+    for line_no, kind, line in _skip_preamble(tokens):
+        # Continuation of a sub-point until another numbering or main paragraph
+        # (a section header starting with I./V./X. also reads as a roman numeral here)
+        if sub is not None:
+            if not (kind in SUB_POINT_TYPES or kind == LINE_PARAGRAPH
+                    or (kind == LINE_SECTION and line[0] in 'IVX')):
+                sub_parts.append(line)
+                sub.line_end = paragraph.line_end = line_no + 1
+                continue
+            _close_sub_point(paragraph, sub, sub_parts)
+            sub = None
 
+        if paragraph is not None:
+            # Stop at next main paragraph or section header
+            if kind == LINE_PARAGRAPH or kind == LINE_SECTION:
+                yield _close_paragraph(paragraph, para_parts, level)
+                paragraph = None
+                check_cancelled()
+                if budget is not None:
+                    level = budget.checkpoint()
+            elif kind in SUB_POINT_TYPES and level < NO_SUB_POINTS:
+                # Sub-numbering: I., II. / a., b. / i., ii. with full content preserved
+                number, content = split_numbered(line)
+                sub = SubPoint(SUB_POINT_TYPES[kind], number + '.', '', line_no, line_no + 1)
+                sub_parts = [content]
+                paragraph.line_end = line_no + 1
+                continue
+            else:
                 # Regular continuation of main paragraph
-                full_content += " " + next_line
-                j += 1
+                para_parts.append(line)
+                paragraph.line_end = line_no + 1
+                continue
 
-            # Determine if this is a citation paragraph
-            is_citation = is_citation_paragraph(full_content)
-            
-            # Generate HTML for the paragraph
-            html_content = generate_paragraph_html(para_num, full_content, sub_content, is_citation)
-            sections.append({'html': html_content})
-            i = j
+        # Main section headers (A., B., C., etc.)
+        if kind == LINE_SECTION:
+            yield SectionHeader(line, line_no, line_no + 1)
             continue
 
-        i += 1
+        # Numbered paragraph
+        if kind == LINE_PARAGRAPH:
+            number, content = split_numbered(line)
+            paragraph = Paragraph(number, '', line_start=line_no, line_end=line_no + 1)
+            para_parts = [content]
+
+    if sub is not None:
+        _close_sub_point(paragraph, sub, sub_parts)
+    if paragraph is not None:
+        yield _close_paragraph(paragraph, para_parts, level)
 
-    return sections
+def parse_judgment_content_enhanced(text, cancellation=None):
+    """Enhanced parsing (from text or a LineTable) with proper sub-numbering preservation and citation detection.
 
-def generate_paragraph_html(para_num, content, sub_content, is_citation=False):
-    """Generate HTML for a paragraph with proper sub-numbering and citation styling."""
+    With a CancellationToken, raises Cancelled at the first paragraph after it is cancelled.
+    """
+    table = as_line_table(text)
+    with cancellable(cancellation):
+        return locate_pages(list(iter_judgment_sections(table)), table.page_lines)
+
+def parse_judgment(text):
+    """Parse judgment text (or a LineTable) into a Judgment model."""
+    table = as_line_table(text)
+    return Judgment(
+        extract_comprehensive_metadata(table),
+        extract_enhanced_index_items(table),
+        parse_judgment_content_enhanced(table)
+    )
+
+def generate_paragraph_html(para_num, content, sub_content, is_citation=False, highlight=True):
+    """Generate HTML for a paragraph (and its SubPoints) with proper sub-numbering and citation styling."""
     # Clean and format the main content
-    content = clean_and_format_text(content)
-    content = format_quoted_text(content)
+    content = clean_and_format_text(content, highlight)
     
     # Choose paragraph style based on content type
     if is_citation:
@@ -908,82 +1659,171 @@ def generate_paragraph_html(para_num, content, sub_content, is_citation=False):
     
     # Add sub-content with improved formatting
     for sub in sub_content:
-        sub_content_formatted = clean_and_format_text(sub['content'])
-        sub_content_formatted = format_quoted_text(sub_content_formatted)
+        sub_content_formatted = clean_and_format_text(sub.content, highlight)
         
-        if sub['type'] == 'roman':
+        if sub.style == 'roman':
             html += f'<div class="sub-point-roman">'
-            html += f'<span class="sub-point-number">{sub["number"]}</span>'
+            html += f'<span class="sub-point-number">{sub.number}</span>'
             html += f'<span class="sub-point-content">{sub_content_formatted}</span>'
             html += '</div>'
-        elif sub['type'] == 'letter':
+        elif sub.style == 'letter':
             html += f'<div class="sub-point-letter">'
-            html += f'<span class="sub-point-number">{sub["number"]}</span>'
+            html += f'<span class="sub-point-number">{sub.number}</span>'
             html += f'<span class="sub-point-content">{sub_content_formatted}</span>'
             html += '</div>'
-        elif sub['type'] == 'small_roman':
+        elif sub.style == 'small_roman':
             html += f'<div class="sub-point-small-roman">'
-            html += f'<span class="sub-point-number">{sub["number"]}</span>'
+            html += f'<span class="sub-point-number">{sub.number}</span>'
             html += f'<span class="sub-point-content">{sub_content_formatted}</span>'
             html += '</div>'
     
     return html
 
-def clean_and_format_text(text):
-    """Clean and format text while preserving important elements."""
-    # Replace multiple spaces with single space
-    text = re.sub(r'\s+', ' ', text)
-    # Remove leading/trailing whitespace
-    text = text.strip()
-    # Fix common formatting issues
-    text = re.sub(r'\s+([,.;:])', r'\1', text)  # Remove space before punctuation
-    text = re.sub(r'([,.;:])\s+', r'\1 ', text)  # Ensure single space after punctuation
-    
-    # Handle emphasis - make legal citations and references bold/italic
-    text = re.sub(r'\b(MANU/SC/\d+/\d+)\b', r'<span class="case-citation">\1</span>', text)
-    text = re.sub(r'\b(\(\d+\)\s*\d+\s*SCC\s*\d+)\b', r'<span class="case-citation">\1</span>', text)
-    text = re.sub(r'\b(\d{4}\s+\d+\s+SCC\s+\d+)\b', r'<span class="case-citation">\1</span>', text)
-    text = re.sub(r'\b(AIR\s+\d{4}\s+SC\s+\d+)\b', r'<span class="case-citation">\1</span>', text)
-    
-    # Handle law references
-    text = re.sub(r'\b(Section\s+\d+[A-Za-z]*(?:\(\d+\))?)\b', r'<span class="law-reference">\1</span>', text, flags=re.IGNORECASE)
-    text = re.sub(r'\b(Article\s+\d+[A-Za-z]*(?:\(\d+\))?)\b', r'<span class="law-reference">\1</span>', text, flags=re.IGNORECASE)
-    
-    # Escape HTML entities after formatting
-    text = escape_html_selective(text)
-    
-    return text
+def flattened_content(paragraph):
+    """A paragraph's text with its sub-points run on, numbers included, as if none had been detected."""
+    return " ".join([paragraph.content] + [f"{sub.number} {sub.content}" for sub in paragraph.sub_points])
 
-def escape_html_selective(text):
-    """Escape HTML special characters while preserving our formatting spans."""
-    # First, protect our formatting spans
-    protected_spans = []
-    span_pattern = r'<span class="[^"]*">[^<]*</span>'
-    
-    def protect_span(match):
-        protected_spans.append(match.group(0))
-        return f"__PROTECTED_SPAN_{len(protected_spans)-1}__"
-    
-    text = re.sub(span_pattern, protect_span, text)
-    
-    # Now escape HTML entities
-    text = text.replace('&', '&amp;')
-    text = text.replace('<', '&lt;')
-    text = text.replace('>', '&gt;')
-    
-    # Restore protected spans
-    for i, span in enumerate(protected_spans):
-        text = text.replace(f"__PROTECTED_SPAN_{i}__", span)
-    
-    return text
+def generate_plain_paragraph_html(paragraph):
+    """A paragraph as escaped plain text: no sub-points, quotes or highlighting."""
+    content = escape_html(' '.join(flattened_content(paragraph).split()))
+    return ('<div class="main-paragraph">'
+            f'<span class="paragraph-number">{paragraph.number}.</span>'
+            f'<span class="paragraph-content">{content}</span>'
+            '</div>')
 
-def format_quoted_text(text):
-    """Format quoted text with proper styling."""
-    # Handle quoted passages - look for text within quotes
-    quote_pattern = r'"([^"]{10,})"'  # Only format longer quotes
-    text = re.sub(quote_pattern, r'<span class="quoted-text">"\1"</span>', text)
-    
-    return text
+def generate_section_html(section):
+    """Render one model section (Paragraph or SectionHeader) to HTML.
+
+    Under a document budget that has run short, citation styling, then
+    sub-points, then all formatting are dropped for the sections that follow.
+    """
+    check_cancelled()
+    budget = current_budget()
+    level = budget.checkpoint() if budget is not None else FULL
+    with stage_timer('format'):
+        if isinstance(section, SectionHeader):
+            return f'<div class="section-header">{escape_html(section.title)}</div>'
+        if level == FULL:
+            return generate_paragraph_html(section.number, section.content, section.sub_points, section.is_citation)
+        if level >= PLAIN_PARAGRAPHS:
+            return generate_plain_paragraph_html(section)
+        if level >= NO_SUB_POINTS:
+            return generate_paragraph_html(section.number, flattened_content(section), (), highlight=False)
+        return generate_paragraph_html(section.number, section.content, section.sub_points, highlight=False)
+
+# Inline highlighting: legal citations in bold blue, law references in green italics.
+# Citations used to be wrapped before law references, so they still win an overlap.
+CITATION_HIGHLIGHT_RE = re.compile(
+    r'\b(?:MANU/SC/\d+/\d+'
+    r'|\(\d+\)\s*\d+\s*SCC\s*\d+'
+    r'|\d{4}\s+\d+\s+SCC\s+\d+'
+    r'|AIR\s+\d{4}\s+SC\s+\d+)\b'
+)
+LAW_REFERENCE_RE = re.compile(r'\b(?:Section|Article)\s+\d+[A-Za-z]*(?:\(\d+\))?\b', re.IGNORECASE)
+# Applied after whitespace runs are collapsed, so a single space is all there is
+SPACE_BEFORE_PUNCTUATION_RE = re.compile(r' ([,.;:])')
+# Only format longer quotes (measured on the escaped text, as before)
+MIN_QUOTE_LENGTH = 10
+
+def _escaped_length(text, start, end):
+    """Length of text[start:end] once &, < and > have been escaped."""
+    segment = text[start:end]
+    return len(segment) + 4 * segment.count('&') + 3 * (segment.count('<') + segment.count('>'))
+
+def find_quote_spans(text):
+    """Return (start, end, 'quoted-text') for each "..." passage, quotes included."""
+    spans = []
+    quotes = [i for i, char in enumerate(text) if char == '"']
+    k = 0
+    while k + 1 < len(quotes):
+        start, end = quotes[k], quotes[k + 1]
+        if _escaped_length(text, start + 1, end) >= MIN_QUOTE_LENGTH:
+            spans.append((start, end + 1, 'quoted-text'))
+            k += 2
+        else:
+            k += 1
+    return spans
+
+def _crosses(start, end, spans, k):
+    """Advance k past spans ending before `start`; report whether [start, end) partially overlaps spans[k]."""
+    while k < len(spans) and spans[k][1] <= start:
+        k += 1
+    if k < len(spans):
+        span_start, span_end = spans[k][0], spans[k][1]
+        inside = span_start <= start and end <= span_end
+        if not (inside or end <= span_start):
+            return True, k
+    return False, k
+
+def find_highlight_spans(text, quotes=()):
+    """Return non-overlapping (start, end, css_class) citation and law-reference spans.
+
+    Law references overlapping a citation are dropped, as is any span that
+    straddles a quote boundary, so quotes can nest whole citations without
+    producing crossed tags.
+    """
+    citations = []
+    q = 0
+    for match in CITATION_HIGHLIGHT_RE.finditer(text):
+        crossed, q = _crosses(match.start(), match.end(), quotes, q)
+        if not crossed:
+            citations.append((match.start(), match.end(), 'case-citation'))
+
+    references = []
+    q = c = 0
+    for match in LAW_REFERENCE_RE.finditer(text):
+        start, end = match.span()
+        crossed, q = _crosses(start, end, quotes, q)
+        while c < len(citations) and citations[c][1] <= start:
+            c += 1
+        if crossed or (c < len(citations) and citations[c][0] < end):
+            continue
+        references.append((start, end, 'law-reference'))
+
+    return citations + references
+
+def render_spans(text, spans):
+    """Emit escaped HTML for text with properly nested (start, end, css_class) spans, left to right."""
+    out = []
+    pos = 0
+    open_ends = []
+    # Outer spans first when two start at the same place
+    for start, end, css_class in sorted(spans, key=lambda span: (span[0], -span[1])):
+        while open_ends and open_ends[-1] <= start:
+            close_at = open_ends.pop()
+            out.append(escape_html(text[pos:close_at]))
+            out.append('</span>')
+            pos = close_at
+        out.append(escape_html(text[pos:start]))
+        out.append(f'<span class="{css_class}">')
+        pos = start
+        open_ends.append(end)
+    while open_ends:
+        close_at = open_ends.pop()
+        out.append(escape_html(text[pos:close_at]))
+        out.append('</span>')
+        pos = close_at
+    out.append(escape_html(text[pos:]))
+    return ''.join(out)
+
+def clean_and_format_text(text, highlight=True):
+    """Clean and format text while preserving important elements.
+
+    Citations, law references and long quotes are located on the plain text in
+    one scan each, then the escaped HTML is produced in a single pass. With
+    highlight=False only quotes are formatted.
+    """
+    # Replace whitespace runs with a single space and trim
+    text = ' '.join(text.split())
+    # Remove space before punctuation (there is already exactly one after it)
+    text = SPACE_BEFORE_PUNCTUATION_RE.sub(r'\1', text)
+    add_count('regex_calls', 3)
+
+    quotes = find_quote_spans(text)
+    if not highlight:
+        return render_spans(text, quotes)
+    spans = find_highlight_spans(text, quotes)
+    return render_spans(text, quotes + spans)
 
 def escape_html(text):
     """Escape HTML special characters."""
@@ -992,11 +1832,64 @@ def escape_html(text):
     text = text.replace('>', '&gt;')
     return text
 
-def render_enhanced_html(metadata, sections, index_items):
-    """Render enhanced HTML with improved Supreme Court formatting."""
-    template = Template(HTML_TEMPLATE)
-    
-    return template.render(
+# Minified output drops every line break of the template layout together with its
+# indentation; rendered sections contain no line breaks of their own
+LAYOUT_WHITESPACE_RE = re.compile(r'\s*\n\s*')
+CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+CSS_PUNCTUATION_RE = re.compile(r'\s*([{};,>])\s*')
+CSS_COLON_RE = re.compile(r':\s+')
+
+def minify_template(source):
+    return LAYOUT_WHITESPACE_RE.sub('', source)
+
+def minify_css(css):
+    css = ' '.join(CSS_COMMENT_RE.sub('', css).split())
+    css = CSS_COLON_RE.sub(':', CSS_PUNCTUATION_RE.sub(r'\1', css))
+    return css.replace(';}', '}')
+
+# The document template is compiled once per process, not on every render
+JINJA_ENV = Environment()
+JUDGMENT_TEMPLATE = JINJA_ENV.from_string(HTML_TEMPLATE)
+JUDGMENT_TEMPLATE_MIN = JINJA_ENV.from_string(minify_template(HTML_TEMPLATE))
+JUDGMENT_CSS_MIN = minify_css(JUDGMENT_CSS)
+# Rendered pieces are joined into writes of this many template chunks
+STREAM_BUFFER_CHUNKS = 64
+
+def stylesheet_text(minify=False):
+    return JUDGMENT_CSS_MIN if minify else JUDGMENT_CSS
+
+def stylesheet_name(minify=False):
+    """Versioned file name of the shared stylesheet; it changes whenever the CSS does."""
+    version = hashlib.sha256(stylesheet_text(minify).encode('utf-8')).hexdigest()[:12]
+    return f"judgment-{version}.css"
+
+def write_stylesheet(directory, minify=False):
+    """Write the shared stylesheet into directory (once) and return its path."""
+    path = os.path.join(directory, stylesheet_name(minify))
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            fh.write(stylesheet_text(minify))
+        os.replace(tmp_path, path)
+    return path
+
+def truncation_note(budget):
+    """The notice shown above a judgment whose budget cut its pages short, or ""."""
+    truncation = budget.truncation if budget is not None else None
+    if truncation is None:
+        return ""
+    return (f"Only the first {truncation['pages']} of {truncation['page_count']} pages of this judgment "
+            f"were processed; the rest are not included.")
+
+def _template_context(metadata, sections, index_items, stylesheet_href=None, minify=False, revision=None,
+                      budget=None):
+    """Template variables for one judgment; sections are formatted lazily as the template asks for them."""
+    section_html = revision.section_html if revision is not None else generate_section_html
+    return dict(
+        truncation_note=truncation_note(budget),
+        stylesheet_href=stylesheet_href,
+        css=stylesheet_text(minify),
         citation_number=metadata.get('citation_number', ''),
         reportable=metadata.get('reportable', ''),
         court_name=metadata.get('court_name', 'Supreme Court of India'),
@@ -1008,22 +1901,430 @@ def render_enhanced_html(metadata, sections, index_items):
         bench_info=metadata.get('bench_info', ''),
         judge=metadata.get('judge', ''),
         convenience_note=metadata.get('convenience_note', ''),
-        sections=sections,
+        sections=(section_html(section) for section in sections),
         index_items=index_items,
         generation_date=datetime.now().strftime('%d-%m-%Y %H:%M')
     )
 
-def download_button(html_content, filename):
-    """Generate a download link for HTML file."""
-    b64 = base64.b64encode(html_content.encode('utf-8')).decode()
-    href = f'<a href="data:text/html;charset=utf-8;base64,{b64}" download="{filename}" style="display: inline-block; padding: 12px 24px; background-color: #2E7D32; color: white; text-decoration: none; border-radius: 6px; font-weight: bold; font-size: 14px; box-shadow: 0 2px 4px rgba(0,0,0,0.2);">Download Formatted Judgment</a>'
-    return href
+def render_enhanced_html(metadata, sections, index_items, stylesheet_href=None, minify=False, revision=None,
+                         budget=None):
+    """Render enhanced HTML with improved Supreme Court formatting.
+
+    Sections are model objects; each one is formatted exactly once, here,
+    unless a JudgmentRevision already holds its HTML from an earlier version.
+    By default the document is standalone with the CSS inlined; with
+    `stylesheet_href` it links to the shared stylesheet instead. With a
+    DocumentBudget that left pages out, the document starts with a notice.
+    """
+    template = JUDGMENT_TEMPLATE_MIN if minify else JUDGMENT_TEMPLATE
+    return template.render(**_template_context(metadata, sections, index_items, stylesheet_href, minify,
+                                               revision, budget))
+
+def stream_enhanced_html(metadata, sections, index_items, stylesheet_href=None, minify=False, revision=None,
+                         budget=None):
+    """Yield the same document as render_enhanced_html in buffered text chunks.
+
+    Only the chunk being written and the section being formatted are held in
+    memory, whatever the length of the judgment.
+    """
+    template = JUDGMENT_TEMPLATE_MIN if minify else JUDGMENT_TEMPLATE
+    stream = template.stream(**_template_context(metadata, sections, index_items, stylesheet_href, minify,
+                                                 revision, budget))
+    stream.enable_buffering(STREAM_BUFFER_CHUNKS)
+    return iter(stream)
+
+def render_judgment(judgment, stylesheet_href=None, minify=False, revision=None, budget=None, cancellation=None):
+    """Render a Judgment model to an HTML document (standalone unless a stylesheet is linked).
+
+    `budget` is the document's DocumentBudget (result['budget'] of process_judgment), if any.
+    With a CancellationToken, raises Cancelled at the first section after it is cancelled.
+    """
+    with stage_timer('render'), spending(budget), budget_stage('render'), cancellable(cancellation):
+        html = render_enhanced_html(judgment.metadata, judgment.sections, judgment.index_items,
+                                    stylesheet_href, minify, revision, budget)
+    if current_report() is not None:
+        add_count('bytes_out', len(html.encode('utf-8')))
+    return html
+
+def write_judgment_html(judgment, fh, stylesheet_href=None, minify=False, revision=None, budget=None,
+                        cancellation=None):
+    """Stream a Judgment's HTML as UTF-8 into a binary file object or socket file; returns bytes written."""
+    written = 0
+    with stage_timer('render'), spending(budget), budget_stage('render'), cancellable(cancellation):
+        for chunk in stream_enhanced_html(judgment.metadata, judgment.sections, judgment.index_items,
+                                          stylesheet_href, minify, revision, budget):
+            data = chunk.encode('utf-8')
+            fh.write(data)
+            written += len(data)
+    add_count('bytes_out', written)
+    return written
+
+# =====================
+#  REVISIONS - ONLY CHANGED PARAGRAPHS ARE RE-FORMATTED
+# =====================
+
+# Metadata fields that stay the same across corrected versions of a judgment
+REVISION_FIELDS = ('citation_number', 'case_number')
+
+def revision_key(metadata):
+    """Key shared by every version of a judgment (from its neutral citation and case number), or None."""
+    identity = [' '.join(metadata.get(field, '').split()).upper() for field in REVISION_FIELDS]
+    if not any(identity):
+        return None
+    return hashlib.sha256('|'.join(identity).encode('utf-8')).hexdigest()
+
+def _numbered(paragraphs):
+    """{(number, occurrence): fingerprint}, keeping repeated paragraph numbers apart."""
+    seen = {}
+    keyed = {}
+    for number, fingerprint in paragraphs:
+        occurrence = seen[number] = seen.get(number, -1) + 1
+        keyed[number, occurrence] = fingerprint
+    return keyed
+
+def diff_paragraphs(old, new):
+    """Paragraph numbers added, removed and changed between two [(number, fingerprint)] lists."""
+    old, new = _numbered(old), _numbered(new)
+    return {
+        'added': [number for number, occurrence in new if (number, occurrence) not in old],
+        'removed': [number for number, occurrence in old if (number, occurrence) not in new],
+        'changed': [number for (number, occurrence), fingerprint in new.items()
+                    if old.get((number, occurrence), fingerprint) != fingerprint]
+    }
+
+class JudgmentRevision:
+    """One version of a judgment, compared with the last version seen with the same revision_key.
+
+    Rendering through section_html reuses the HTML of every section whose
+    fingerprint is unchanged and formats only the rest; save() then records
+    this version as the one the next correction is compared with. `summary`
+    lists the added, removed and changed paragraph numbers (None when no
+    earlier version is known).
+    """
+
+    def __init__(self, revisions, digest, judgment):
+        self.revisions = revisions
+        self.digest = digest
+        self.key = revision_key(judgment.metadata)
+        previous = revisions.get(self.key) if self.key is not None else None
+        self.previous_fragments = previous['fragments'] if previous else {}
+        self.fragments = {}
+        self.reused = 0
+        self.paragraphs = [(paragraph.number, paragraph.fingerprint()) for paragraph in judgment.paragraphs]
+        self.summary = None
+        if previous:
+            self.summary = dict(diff_paragraphs(previous['paragraphs'], self.paragraphs),
+                                previous_digest=previous['digest'])
+
+    def section_html(self, section):
+        fingerprint = section.fingerprint()
+        html = self.previous_fragments.get(fingerprint)
+        if html is None:
+            html = generate_section_html(section)
+        else:
+            self.reused += 1
+        self.fragments[fingerprint] = html
+        return html
+
+    def save(self):
+        """Store the section HTML rendered for this version (call after rendering)."""
+        if self.key is not None:
+            self.revisions.put(self.key, {
+                'digest': self.digest,
+                'paragraphs': self.paragraphs,
+                'fragments': self.fragments
+            })
+
+def open_revision_cache(directory=REVISION_DIR, compression='zlib'):
+    """Open the store of section HTML from the last version of each judgment."""
+    return JudgmentCache(directory, PARSER_VERSION, compression=compression)
+
+def _report(progress, message, percent):
+    if progress is not None:
+        progress(message, percent)
+
+def source_name(pdf_file):
+    """A display name for a PDF given as a path or an uploaded file."""
+    if isinstance(pdf_file, (str, os.PathLike)):
+        return os.fspath(pdf_file)
+    return getattr(pdf_file, 'name', None)
+
+def index_citations(citation_index, result, source=None):
+    """Record the citations made by a processed judgment in a CitationIndex."""
+    judgment = result['judgment']
+    citation_index.add_judgment(result['digest'], judgment.citations, judgment.metadata,
+                                source=source, version=PARSER_VERSION)
+
+def process_judgment(pdf_file, workers=1, cache=None, progress=None, citation_index=None, digest=None,
+                     render=True, revisions=None, budget=None, cancellation=None):
+    """Run extract → metadata → index → parse → render for one PDF.
+
+    Returns a dict with the PDF digest, page count, extracted text, the
+    Judgment model and the rendered HTML. With a JudgmentCache, a PDF seen before (same bytes,
+    same PARSER_VERSION) is served from disk without opening it in PyMuPDF.
+    With a CitationIndex, the judgment's citations are (re-)indexed as well.
+    With a revision cache (open_revision_cache), a corrected version of a
+    known judgment re-formats only its changed paragraphs; `revision` is then
+    the JudgmentRevision, whose summary lists what changed.
+    `progress` is an optional callback taking (message, percent); `digest`
+    skips re-hashing when the caller already knows it. With render=False the
+    HTML is left to the caller (html is None), e.g. to stream it with
+    write_judgment_html and the revision, then call revision.save().
+    With a Budget (budgets.py), pages past its max_pages are left out (the
+    HTML says so), and a document that runs past its time or memory limits
+    is formatted more simply instead of tying up the worker; `degradations`
+    lists what was given up, and `budget` is the DocumentBudget to hand on
+    to write_judgment_html. Degraded results are neither cached nor kept as
+    revisions, and a cached result is not used when it has more pages than
+    max_pages. With a CancellationToken, the run
+    raises Cancelled at the next page, paragraph or section once it is
+    cancelled, leaving nothing cached.
+    """
+    source = read_pdf_source(pdf_file)
+    document_budget = budget.start() if budget is not None else None
+    if digest is None:
+        with stage_timer('hash'):
+            digest = sha256_of(source)
+
+    if cache is not None:
+        with stage_timer('cache_lookup'):
+            cached = cache.get(digest)
+        # A cached result holds every page; past the page limit it is extracted again, within the limit
+        if (cached is not None and document_budget is not None
+                and document_budget.over_page_limit(cached['page_count'])):
+            cached = None
+        if cached is not None:
+            add_count('cache_hits')
+            cached['judgment'] = Judgment.from_dict(cached['judgment'])
+            cached['cached'] = True
+            cached['revision'] = None
+            cached['budget'] = document_budget
+            cached['degradations'] = document_budget.degradations if document_budget is not None else []
+            if render and cached['html'] is None:
+                cached['html'] = render_judgment(cached['judgment'], budget=document_budget,
+                                                 cancellation=cancellation)
+            if citation_index is not None:
+                index_citations(citation_index, cached, source_name(pdf_file))
+            return cached
+
+    # Step 1: Extract text
+    _report(progress, "📖 Extracting text from PDF...", 10)
+    with stage_timer('extract'), spending(document_budget), budget_stage('extract'), cancellable(cancellation):
+        pages = list(iter_pdf_pages(source, workers=workers))
+        text, page_starts = join_pages(pages)
+    page_count = len(pages)
+    # The text holds every page; the page list would be a second copy for the rest of the run
+    del pages
+    add_count('pages', page_count)
+    result = {
+        'digest': digest,
+        'page_count': page_count,
+        'text': text,
+        'judgment': Judgment({}, [], []),
+        'html': '',
+        'cached': False,
+        'degradations': document_budget.degradations if document_budget is not None else []
+    }
+    if not text.strip():
+        result['revision'] = None
+        result['budget'] = document_budget
+        return result
+
+    # Lines are split, classified and mapped to pages once, then shared by the next three steps
+    with stage_timer('tokenize'), cancellable(cancellation):
+        table = tokenize_judgment(text, page_starts)
+    add_count('lines', len(table))
+    # classify_line matches each line once
+    add_count('regex_calls', len(table))
+
+    # Step 2: Extract metadata
+    _report(progress, "🏛️ Extracting case metadata...", 25)
+    with stage_timer('metadata'), cancellable(cancellation):
+        metadata = extract_comprehensive_metadata(table)
+
+    # Step 3: Extract index
+    _report(progress, "📑 Processing index structure...", 40)
+    with stage_timer('index'), cancellable(cancellation):
+        index_items = extract_enhanced_index_items(table)
+
+    # Step 4: Parse content with fixes
+    _report(progress, "🔧 Parsing with citation detection & sub-numbering fixes...", 65)
+    with stage_timer('parse'), spending(document_budget), budget_stage('parse'):
+        sections = parse_judgment_content_enhanced(table, cancellation)
+    result['judgment'] = judgment = Judgment(metadata, index_items, sections)
+    if current_report() is not None:
+        add_count('sections', len(sections))
+        add_count('paragraphs', len(judgment.paragraphs))
+        add_count('sub_points', judgment.sub_point_count)
+        add_count('citation_paragraphs', judgment.citation_count)
+        add_count('index_items', len(index_items))
+    revision = None
+    if revisions is not None and not result['degradations']:
+        revision = JudgmentRevision(revisions, digest, judgment)
+
+    # Step 5: Generate HTML
+    if render:
+        _report(progress, "🎨 Generating enhanced HTML...", 85)
+        result['html'] = render_judgment(judgment, revision=revision, budget=document_budget,
+                                         cancellation=cancellation)
+        if revision is not None and not result['degradations']:
+            revision.save()
+    else:
+        result['html'] = None
+
+    if cache is not None and not result['degradations']:
+        with stage_timer('cache_store'):
+            cache.put(digest, dict(result, judgment=judgment.to_dict(), cached=False))
+    if citation_index is not None:
+        with stage_timer('citation_index'):
+            index_citations(citation_index, result, source_name(pdf_file))
+    result['revision'] = revision
+    result['budget'] = document_budget
+    return result
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key: one caller runs, the others wait for its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, on_wait=None, cancellation=None):
+        """Return (func(), shared), where shared is True if another caller's run was reused.
+
+        If the running caller is cancelled or interrupted, a waiting caller
+        runs func itself; a waiting caller's own `cancellation` stops its wait.
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                owner = call is None
+                if owner:
+                    call = self._calls[key] = Future()
+            if owner:
+                break
+            if on_wait is not None:
+                on_wait()
+            try:
+                return wait_result(call, cancellation), True
+            except Cancelled:
+                if cancellation is not None and cancellation.cancelled:
+                    raise
+        # The call is forgotten before waiters are woken, so a retry starts a fresh one
+        try:
+            result = func()
+        except BaseException as exc:
+            self._forget(key)
+            call.set_exception(exc if isinstance(exc, Exception) else Cancelled(type(exc).__name__))
+            raise
+        self._forget(key)
+        call.set_result(result)
+        return result, False
+
+    def _forget(self, key):
+        with self._lock:
+            del self._calls[key]
+
+class SharedProcessor:
+    """process_judgment shared by every session of one server process.
+
+    Results are looked up by the PDF's content hash in the disk cache, and
+    concurrent requests for the same PDF run the pipeline only once.
+    """
+
+    def __init__(self, cache=None, citation_index=None, revisions=None):
+        self.cache = cache
+        self.citation_index = citation_index
+        self.revisions = revisions
+        self.flight = SingleFlight()
+
+    def process(self, pdf_file, workers=1, progress=None, budget=None, cancellation=None):
+        """process_judgment for one PDF; only sessions with the same budget limits share a run.
+
+        Cancelling a run another session is waiting for hands the work over to that session.
+        """
+        digest = sha256_of(read_pdf_source(pdf_file))
+        result, shared = self.flight.do(
+            (digest, budget.key if budget is not None else ""),
+            lambda: process_judgment(pdf_file, workers=workers, cache=self.cache, progress=progress,
+                                     citation_index=self.citation_index, digest=digest,
+                                     revisions=self.revisions, budget=budget, cancellation=cancellation),
+            on_wait=lambda: _report(progress, "⏳ Same PDF is being processed in another session...", 10),
+            cancellation=cancellation
+        )
+        return dict(result, cached=True) if shared else result
+
+def open_result_cache(directory=CACHE_DIR, compression='zlib'):
+    """Open the shared on-disk result cache for the current parser version."""
+    return JudgmentCache(directory, PARSER_VERSION, compression=compression)
+
+def open_citation_index(path=INDEX_PATH):
+    """Open the corpus-wide citation index."""
+    return CitationIndex(path)
+
+# Artifacts kept per processed document in the SessionStore
+SESSION_HTML = 'judgment.html'
+SESSION_TEXT = 'text.txt'
+SESSION_JUDGMENT = 'judgment.json'
+# Characters dropped from the suggested download file name
+UNSAFE_FILENAME_RE = re.compile(r'[^\w\-_\.]')
+
+def open_session_store(directory=SESSION_DIR):
+    """Open the disk store backing the Streamlit sessions."""
+    return SessionStore(directory)
+
+def store_session_result(store, result):
+    """Write a processed result's heavy artifacts to the store and return its handle.
+
+    Handles are content hashes, so sessions working on the same PDF share one
+    copy. A result cut short by its budget gets a handle of its own, so it
+    is never served to a session that asked for the whole document.
+    """
+    handle = f"{result['digest']}-{PARSER_VERSION}"
+    if result['degradations']:
+        handle = f"{handle}-{uuid.uuid4().hex}"
+    if not store.contains(handle, SESSION_HTML, SESSION_TEXT, SESSION_JUDGMENT):
+        store.put(handle, SESSION_TEXT, result['text'])
+        store.put(handle, SESSION_JUDGMENT, json.dumps(result['judgment'].to_dict(), ensure_ascii=False))
+        store.put(handle, SESSION_HTML, result['html'])
+    return handle
+
+def read_session_bytes(store, handle, name):
+    """An artifact's bytes, or b"" once it has expired; the file is closed before this returns."""
+    fh = store.open(handle, name)
+    if fh is None:
+        return b""
+    with fh:
+        return fh.read()
+
+def load_session_judgment(store, handle):
+    """The Judgment model stored under a handle, or None once it has expired."""
+    data = store.read_text(handle, SESSION_JUDGMENT)
+    return Judgment.from_dict(json.loads(data)) if data is not None else None
 
 # =====================
 #  STREAMLIT UI - ENHANCED WITH DEBUGGING FEATURES
 # =====================
 
 def main():
+    # Imported here so batch and library use of this module never loads Streamlit
+    import streamlit as st
+
+    @st.cache_resource
+    def shared_processor(use_cache, index_citations):
+        """One SharedProcessor per settings combination, shared by every session."""
+        return SharedProcessor(
+            cache=open_result_cache() if use_cache else None,
+            citation_index=open_citation_index() if index_citations else None,
+            revisions=open_revision_cache() if use_cache else None
+        )
+
+    @st.cache_resource
+    def session_store():
+        return open_session_store()
+
+    store = session_store()
+
     st.set_page_config(
         page_title="Supreme Court Judgment Formatter - FIXED", 
         layout="wide",
@@ -1040,6 +2341,26 @@ def main():
         show_stats = st.checkbox("Show Processing Statistics", value=True)
         show_preview = st.checkbox("Show Full Preview", value=True)
         show_debug = st.checkbox("🔍 Debug Mode", value=False, help="Show detailed parsing information")
+        extraction_workers = st.number_input(
+            "PDF Extraction Workers",
+            min_value=1,
+            max_value=os.cpu_count() or 1,
+            value=1,
+            help="Extract long judgments page-parallel across this many processes"
+        )
+        use_cache = st.checkbox("Reuse Cached Results", value=True,
+                                help="Serve previously processed PDFs (same file, same parser version) from disk, "
+                                     "and re-format only the changed paragraphs of corrected versions")
+        index_citations_enabled = st.checkbox("Index Citations", value=True,
+                                              help="Record this judgment's citations in the corpus-wide citation index")
+        show_performance = st.checkbox("Performance Report", value=False,
+                                       help="Time each pipeline stage and count pages, lines and paragraphs")
+        max_pages = st.number_input("Max Pages", min_value=1, value=APP_MAX_PAGES,
+                                    help="Only the first pages of longer PDFs are processed")
+        stage_seconds = st.number_input("Time Limit per Stage (s)", min_value=1, value=APP_STAGE_SECONDS,
+                                        help="Past this, formatting is simplified step by step instead of waiting")
+        max_memory_mb = st.number_input("Memory Limit (MB)", min_value=64, value=APP_MAX_MEMORY_MB,
+                                        help="Past this much growth, formatting is simplified step by step")
         
         st.markdown("---")
         st.markdown("### 🛠️ Key Fixes Applied")
@@ -1087,6 +2408,12 @@ def main():
                        full text preserved
         """, language="text")
     
+    # Artifacts past the store's TTL are gone; the session has to process again
+    if 'result_handle' in st.session_state and not store.contains(
+            st.session_state.result_handle, SESSION_HTML, SESSION_TEXT, SESSION_JUDGMENT):
+        del st.session_state['result_handle']
+        st.warning("⌛ This result has expired. Please process the document again.")
+    
     # File uploader
     pdf_file = st.file_uploader(
         "Upload Judgment PDF", 
@@ -1103,55 +2430,60 @@ def main():
                 progress_bar = st.progress(0)
                 status_text = st.empty()
                 
+                status = {'message': ''}
+                
+                def show_progress(message, percent):
+                    status['message'] = message
+                    status_text.text(message)
+                    progress_bar.progress(percent)
+                
+                # Streamlit stops or reruns a script only at its next UI call. Redrawing the
+                # status line from the pipeline's checkpoints lets "Process Another Document"
+                # or a new upload stop this run within a page or paragraph.
+                cancellation = CancellationToken(poll=lambda: status_text.text(status['message']))
+                
                 try:
-                    # Step 1: Extract text
-                    status_text.text("📖 Extracting text from PDF...")
-                    progress_bar.progress(10)
-                    text = extract_text_from_pdf(pdf_file)
+                    # Steps 1-5: Extract, metadata, index, parse and render (or load from cache)
+                    processor = shared_processor(use_cache, index_citations_enabled)
+                    budget = Budget(max_pages=max_pages, stage_seconds=stage_seconds,
+                                    max_memory=max_memory_mb * 2**20)
+                    if show_performance:
+                        with collect_report() as report:
+                            result = processor.process(pdf_file, workers=extraction_workers, progress=show_progress,
+                                                       budget=budget, cancellation=cancellation)
+                        st.session_state.performance_report = report.format()
+                    else:
+                        result = processor.process(pdf_file, workers=extraction_workers, progress=show_progress,
+                                                   budget=budget, cancellation=cancellation)
+                        st.session_state.pop('performance_report', None)
+                    text = result['text']
                     
                     if not text.strip():
                         st.error("❌ Unable to extract text from PDF. Please ensure the PDF contains readable text.")
                         return
                     
-                    # Step 2: Extract metadata
-                    status_text.text("🏛️ Extracting case metadata...")
-                    progress_bar.progress(25)
-                    metadata = extract_comprehensive_metadata(text)
-                    
-                    # Step 3: Extract index
-                    status_text.text("📑 Processing index structure...")
-                    progress_bar.progress(40)
-                    index_items = extract_enhanced_index_items(text)
-                    
-                    # Step 4: Parse content with fixes
-                    status_text.text("🔧 Parsing with citation detection & sub-numbering fixes...")
-                    progress_bar.progress(65)
-                    sections = parse_judgment_content_enhanced(text)
-                    
-                    # Step 5: Generate HTML
-                    status_text.text("🎨 Generating enhanced HTML...")
-                    progress_bar.progress(85)
-                    html_content = render_enhanced_html(metadata, sections, index_items)
+                    judgment = result['judgment']
                     
                     # Step 6: Store results with debug info
                     progress_bar.progress(100)
-                    status_text.text("✅ Processing complete !")
+                    status_text.text("⚡ Loaded from cache !" if result['cached'] else "✅ Processing complete !")
                     
-                    # Store in session state
-                    st.session_state.html_content = html_content
-                    st.session_state.metadata = metadata
-                    st.session_state.sections_count = len(sections)
-                    st.session_state.index_count = len(index_items)
+                    # Session state keeps a handle; HTML, text and sections stay on disk
+                    st.session_state.result_handle = store_session_result(store, result)
+                    st.session_state.metadata = judgment.metadata
+                    st.session_state.sections_count = len(judgment.sections)
+                    st.session_state.index_count = len(judgment.index_items)
                     st.session_state.text_length = len(text)
+                    st.session_state.html_size = len(result['html'].encode('utf-8'))
                     st.session_state.processing_complete = True
-                    st.session_state.sections = sections  # For debugging
-                    st.session_state.raw_text = text  # For debugging
                     
-                    # Count citations and sub-points for stats
-                    citation_count = sum(1 for section in sections if 'citation-paragraph' in section['html'])
-                    sub_points_count = sum(section['html'].count('sub-point-') for section in sections)
-                    st.session_state.citation_count = citation_count
-                    st.session_state.sub_points_count = sub_points_count
+                    # Stats come straight from the model
+                    st.session_state.citation_count = judgment.citation_count
+                    st.session_state.sub_points_count = judgment.sub_point_count
+                    revision = result['revision']
+                    st.session_state.revision_summary = revision.summary if revision is not None else None
+                    document_budget = result['budget']
+                    st.session_state.degradations = document_budget.summary() if document_budget is not None else []
                     
                     st.success("🎉 Document processed successfully !")
                     
@@ -1163,26 +2495,39 @@ def main():
                     status_text.empty()
         
         with col2:
-            if 'html_content' in st.session_state:
+            if 'result_handle' in st.session_state:
                 # Generate filename
                 petitioner = st.session_state.metadata.get('petitioner', 'judgment')
                 respondent = st.session_state.metadata.get('respondent', 'case')
                 filename = f"{petitioner}_v_{respondent}".replace(' ', '_').replace('/', '_')
-                filename = re.sub(r'[^\w\-_\.]', '', filename)[:50] + "_FIXED.html"
+                filename = UNSAFE_FILENAME_RE.sub('', filename)[:50] + "_FIXED.html"
                 
                 st.markdown("### 📥 Download")
-                st.markdown(download_button(st.session_state.html_content, filename), unsafe_allow_html=True)
+                # Read from the session store when clicked, never embedded in the page
+                handle = st.session_state.result_handle
+                st.download_button(
+                    "Download Formatted Judgment",
+                    data=lambda: read_session_bytes(store, handle, SESSION_HTML),
+                    file_name=filename,
+                    mime="text/html",
+                    on_click="ignore",
+                    type="primary"
+                )
                 
                 st.markdown("### 📊 Fix Statistics")
                 if hasattr(st.session_state, 'citation_count'):
                     st.info(f"""
                     **Citations Detected**: {st.session_state.citation_count}
                     **Sub-points Preserved**: {st.session_state.sub_points_count}
-                    **File Size**: {len(st.session_state.html_content.encode('utf-8')) / 1024:.1f} KB
+                    **File Size**: {st.session_state.html_size / 1024:.1f} KB
                     """)
+                
+                if 'performance_report' in st.session_state:
+                    st.markdown("### ⏱️ Performance")
+                    st.text(st.session_state.performance_report)
         
         with col3:
-            if 'html_content' in st.session_state:
+            if 'result_handle' in st.session_state:
                 st.markdown("### ✅ Status")
                 st.success("Document ready with all fixes")
                 
@@ -1194,14 +2539,30 @@ def main():
                 ✓ Enhanced legal reference highlighting
                 """)
                 
+                # A corrected version of a judgment processed before
+                summary = st.session_state.get('revision_summary')
+                if summary:
+                    st.info(f"""
+                    **Revision of a known judgment:**
+                    Changed: {', '.join(summary['changed']) or 'none'}
+                    Added: {', '.join(summary['added']) or 'none'}
+                    Removed: {', '.join(summary['removed']) or 'none'}
+                    """)
+                
+                # Limits this document ran into, and what was given up for them
+                if st.session_state.get('degradations'):
+                    st.warning("**Simplified to stay within limits:**\n" +
+                               "\n".join(f"- {line}" for line in st.session_state.degradations))
+                
                 if st.button("🔄 Process Another Document"):
                     for key in list(st.session_state.keys()):
-                        if key.startswith(('html_content', 'metadata', 'sections', 'index', 'processing', 'citation', 'sub_points', 'raw_text')):
+                        if key.startswith(('result_handle', 'html_size', 'text_length', 'metadata', 'sections', 'index', 'processing', 'citation', 'sub_points', 'revision', 'performance', 'degradations')):
                             del st.session_state[key]
                     st.rerun()
     
     # Enhanced results display
-    if 'html_content' in st.session_state:
+    if 'result_handle' in st.session_state:
+        handle = st.session_state.result_handle
         st.markdown("---")
         
         # Debug information
@@ -1209,31 +2570,42 @@ def main():
             st.subheader("🔍 Debug Information")
             
             tab1, tab2, tab3 = st.tabs(["Citation Analysis", "Sub-numbering Analysis", "Raw Content Sample"])
+            # Loaded from the store only while debug mode is on
+            judgment = load_session_judgment(store, handle)
+            sections = judgment.sections if judgment is not None else []
             
             with tab1:
                 st.markdown("**Citations Found in Document:**")
-                citation_sections = [s for s in st.session_state.sections if 'citation-paragraph' in s['html']]
+                citation_sections = [s for s in sections
+                                     if isinstance(s, Paragraph) and s.is_citation]
                 if citation_sections:
                     for i, section in enumerate(citation_sections[:5]):  # Show first 5
-                        clean_text = re.sub(r'<[^>]+>', '', section['html'])
-                        st.text(f"Citation {i+1}: {clean_text[:200]}...")
+                        st.text(f"Citation {i+1}: {section.plain_text()[:200]}...")
                 else:
                     st.text("No citation paragraphs detected")
+                
+                st.markdown("**Normalized Citations:**")
+                records = judgment.citations if judgment is not None else []
+                if records:
+                    st.text("\n".join(f"para {c.paragraph}: {c.key}" for c in records[:50]))
+                else:
+                    st.text("No reporter citations recognised")
             
             with tab2:
                 st.markdown("**Sub-numbering Patterns Found:**")
-                sub_sections = [s for s in st.session_state.sections if 'sub-point-' in s['html']]
+                sub_sections = [s for s in sections
+                                if isinstance(s, Paragraph) and s.sub_points]
                 if sub_sections:
                     for i, section in enumerate(sub_sections[:5]):
-                        clean_text = re.sub(r'<[^>]+>', '', section['html'])
-                        st.text(f"Sub-point {i+1}: {clean_text[:150]}...")
+                        st.text(f"Sub-point {i+1}: {section.plain_text()[:150]}...")
                 else:
                     st.text("No sub-numbering detected")
             
             with tab3:
                 st.markdown("**Raw Text Sample (First 2000 chars):**")
-                if hasattr(st.session_state, 'raw_text'):
-                    st.text_area("Raw extracted text:", st.session_state.raw_text[:2000], height=200)
+                raw_sample = store.read_text(handle, SESSION_TEXT, limit=2000)
+                if raw_sample is not None:
+                    st.text_area("Raw extracted text:", raw_sample, height=200)
         
         # Metadata display
         if show_metadata:
@@ -1289,7 +2661,7 @@ def main():
                 else:
                     st.metric("Sub-points", "N/A")
             with col6:
-                file_size = len(st.session_state.html_content.encode('utf-8')) / 1024
+                file_size = st.session_state.html_size / 1024
                 st.metric("Output Size", f"{file_size:.1f} KB")
         
         # Document preview
@@ -1318,7 +2690,7 @@ def main():
             
             # HTML preview
             st.components.v1.html(
-                st.session_state.html_content, 
+                store.read_text(handle, SESSION_HTML) or "", 
                 height=preview_height, 
                 scrolling=True
             )